@@ -0,0 +1,60 @@
+""" benchmark finding the lockup output in large multi-output lockup transactions """
+
+import os
+import timeit
+
+from embit import script
+from embit.transaction import Transaction, TransactionInput, TransactionOutput
+
+from boltz_client.onchain import find_lockup_output
+
+lockup_address = "bcrt1qky0es27zfejlr3grpfl4pj47w7yfm0atwqdf3y"
+
+
+def create_lockup_rawtx(num_outputs: int) -> str:
+    vin = TransactionInput(os.urandom(32), 0)
+    vin.witness = script.Witness(items=[os.urandom(72), os.urandom(33)])
+    vout = [
+        TransactionOutput(1000, script.Script(bytes([0, 32]) + os.urandom(32)))
+        for _ in range(num_outputs)
+    ]
+    # lockup in the middle of the batch
+    vout[num_outputs // 2] = TransactionOutput(
+        50000, script.address_to_scriptpubkey(lockup_address)
+    )
+    return Transaction(vin=[vin], vout=vout).serialize().hex()
+
+
+def embit_decode(lockup_rawtx: str) -> tuple[bytes, int, int]:
+    """the lookup create_onchain_tx used to do"""
+    tx = Transaction.from_string(lockup_rawtx)
+    txid = tx.txid()
+    for index, vout in enumerate(tx.vout):
+        if vout.script_pubkey == script.address_to_scriptpubkey(lockup_address):
+            return txid, index, vout.value
+    raise ValueError("not found")
+
+
+def lean_scan(lockup_rawtx: str) -> tuple[bytes, int, int]:
+    script_pubkey = script.address_to_scriptpubkey(lockup_address).data
+    return find_lockup_output(lockup_rawtx, script_pubkey)
+
+
+def main():
+    print(f"{'outputs':>8} {'embit decode us':>16} {'lean scan us':>13} {'speedup':>8}")
+    for num_outputs in (1, 10, 100, 1000, 5000):
+        rawtx = create_lockup_rawtx(num_outputs)
+        assert embit_decode(rawtx) == lean_scan(rawtx)
+        number = max(1, 2000 // num_outputs)
+        results = []
+        for func in (embit_decode, lean_scan):
+            seconds = min(timeit.repeat(lambda: func(rawtx), number=number, repeat=3))
+            results.append(seconds / number * 1e6)
+        print(
+            f"{num_outputs:>8} {results[0]:>16.1f} {results[1]:>13.1f} "
+            f"{results[0] / results[1]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+""" benchmark decoding of api responses, slotted models vs plain dataclasses """
+
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+from boltz_client.boltz import BoltzSwapStatusResponse
+
+status_json = {
+    "status": "transaction.mempool",
+    "zeroConfRejected": None,
+    "transaction": {"id": "00" * 32, "hex": "00" * 200},
+}
+
+
+@dataclass
+class PlainSwapStatusResponse:
+    status: str
+    failureReason: Optional[str] = None
+    zeroConfRejected: Optional[str] = None
+    transaction: Optional[dict] = None
+    failureDetails: Optional[str] = None
+
+
+def memory_per_object(factory, count: int = 100_000) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory() for _ in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(objects) == count
+    return (after - before) / count
+
+
+def main():
+    number = 200_000
+    cases = {
+        "dataclass(**data)": lambda: PlainSwapStatusResponse(**status_json),
+        "slotted from_dict": lambda: BoltzSwapStatusResponse.from_dict(status_json),
+    }
+    print(f"{'case':<20} {'ns/parse':>10} {'bytes/object':>14}")
+    for name, factory in cases.items():
+        seconds = min(timeit.repeat(factory, number=number, repeat=5))
+        print(
+            f"{name:<20} {seconds / number * 1e9:>10.0f} "
+            f"{memory_per_object(factory):>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+""" benchmark hashing every input of large transactions, per input and with shared midstates """
+
+import os
+import timeit
+
+import wallycore as wally
+from embit import script
+from embit.transaction import Transaction, TransactionInput, TransactionOutput
+
+from boltz_client.signing import Bip143Sighasher, WallyBackend
+
+script_code = os.urandom(107)
+
+
+def create_tx(num_inputs: int) -> Transaction:
+    return Transaction(
+        vin=[TransactionInput(os.urandom(32), 0) for _ in range(num_inputs)],
+        vout=[TransactionOutput(1000, script.Script(bytes([0, 20]) + os.urandom(20)))],
+    )
+
+
+def embit_all(num_inputs: int) -> None:
+    # a new transaction, embit caches its hashes on the instance
+    tx = create_tx(num_inputs)
+    for index in range(num_inputs):
+        tx.sighash_segwit(index, script.Script(script_code), 50000)
+
+
+def wally_all(num_inputs: int) -> None:
+    tx = create_tx(num_inputs)
+    for index in range(num_inputs):
+        # libwally needs the transaction in its own format for every input
+        wally_tx = wally.tx_from_bytes(tx.serialize(), wally.WALLY_TX_FLAG_USE_WITNESS)
+        wally.tx_get_btc_signature_hash(
+            wally_tx,
+            index,
+            script_code,
+            50000,
+            wally.WALLY_SIGHASH_ALL,
+            wally.WALLY_TX_FLAG_USE_WITNESS,
+        )
+
+
+def wally_sighasher_all(num_inputs: int) -> None:
+    tx = create_tx(num_inputs)
+    sighasher = WallyBackend().sighasher(tx)
+    for index in range(num_inputs):
+        sighasher.sighash(index, script_code, 50000)
+
+
+def midstate_all(num_inputs: int) -> None:
+    tx = create_tx(num_inputs)
+    sighasher = Bip143Sighasher(tx)
+    for index in range(num_inputs):
+        sighasher.sighash(index, script_code, 50000)
+
+
+def main():
+    funcs = (embit_all, wally_all, wally_sighasher_all, midstate_all)
+    print(
+        f"{'inputs':>7} " + " ".join(f"{func.__name__ + ' us':>16}" for func in funcs)
+    )
+    for num_inputs in (1, 10, 100, 500):
+        number = max(1, 200 // num_inputs)
+        results = []
+        for func in funcs:
+            seconds = min(
+                timeit.repeat(lambda: func(num_inputs), number=number, repeat=3)
+            )
+            results.append(seconds / number * 1e6)
+        print(f"{num_inputs:>7} " + " ".join(f"{result:>16.1f}" for result in results))
+
+
+if __name__ == "__main__":
+    main()
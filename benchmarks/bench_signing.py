@@ -0,0 +1,96 @@
+""" benchmark the signing backends, per claim and for whole claim transactions """
+
+import hashlib
+import os
+import timeit
+
+from embit import ec, script
+from embit.networks import NETWORKS
+from embit.transaction import Transaction, TransactionInput, TransactionOutput
+
+from boltz_client import signing
+from boltz_client.onchain import ClaimInput, create_batch_claim_tx
+
+net = NETWORKS["regtest"]
+receive_address = "bcrt1q0xcqpzrky6eff2g52qdye53xkk9jxkvrl4xfg5"
+
+
+def create_reverse_swap_claim(amount: int = 50000) -> ClaimInput:
+    """a lockup paying to a reverse swap script, like boltz would send it"""
+    claim_key = ec.PrivateKey(os.urandom(32))
+    refund_key = ec.PrivateKey(os.urandom(32))
+    preimage = os.urandom(32)
+    preimage_hash160 = hashlib.new(
+        "ripemd160", hashlib.sha256(preimage).digest()
+    ).digest()
+    redeem_script = (
+        bytes([0x82, 0x01, 0x20, 0x87, 0x63, 0xA9, 0x14])
+        + preimage_hash160
+        + bytes([0x88, 0x21])
+        + claim_key.sec()
+        + bytes([0x67, 0x75, 0x03])
+        + (500).to_bytes(3, "little")
+        + bytes([0xB1, 0x75, 0x21])
+        + refund_key.sec()
+        + bytes([0x68, 0xAC])
+    )
+    lockup_script = script.p2wsh(script.Script(redeem_script))
+    lockup_tx = Transaction(
+        vin=[TransactionInput(os.urandom(32), 0)],
+        vout=[TransactionOutput(amount, lockup_script)],
+    )
+    return ClaimInput(
+        lockup_address=lockup_script.address(net),
+        lockup_rawtx=lockup_tx.serialize().hex(),
+        privkey_wif=claim_key.wif(net),
+        preimage_hex=preimage.hex(),
+        redeem_script_hex=redeem_script.hex(),
+    )
+
+
+def measure_claim_cost(backend: signing.SigningBackend, number: int) -> float:
+    """seconds to hash and sign one claim input"""
+    secret = os.urandom(32)
+    script_code = bytes(ec.PrivateKey(secret).sec()) + bytes([0xAC])
+    tx = Transaction(
+        vin=[TransactionInput(os.urandom(32), 0)],
+        vout=[TransactionOutput(49000, script.Script(bytes([0, 20]) + os.urandom(20)))],
+    )
+    timer = timeit.Timer(
+        lambda: backend.sign(
+            secret, backend.sighasher(tx).sighash(0, script_code, 50000)
+        )
+    )
+    # the best of a few rounds, the first one also warms up the libraries
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main():
+    backends = signing.available_backends()
+    print(
+        f"{'backend':>8} {'hash+sign us':>13} {'1 claim tx us':>14} {'10 claim tx us':>15}"
+    )
+    claims = [create_reverse_swap_claim() for _ in range(10)]
+    for backend in backends:
+        per_input = measure_claim_cost(backend, number=2000) * 1e6
+        signing.set_backend(backend.name)
+        results = []
+        for num_claims in (1, 10):
+            batch = claims[:num_claims]
+            number = 2000 // num_claims
+            seconds = min(
+                timeit.repeat(
+                    lambda: create_batch_claim_tx(batch, receive_address, 1000),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            results.append(seconds / number * 1e6)
+        print(
+            f"{backend.name:>8} {per_input:>13.1f} {results[0]:>14.1f} {results[1]:>15.1f}"
+        )
+    print(f"preferred backend: {backends[0].name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+""" boltz_client claim batching, several reverse swap claims in one transaction """
+
+import asyncio
+from dataclasses import dataclass
+from math import ceil
+from typing import Optional
+
+from embit import script
+
+from .boltz import BoltzClient
+from .onchain import (
+    ClaimInput,
+    check_claim_input,
+    create_batch_claim_tx,
+    estimate_claim_vsize,
+)
+
+
+@dataclass
+class ClaimBatch:
+    transaction: str
+    claims: int
+    vsize: int
+    fee: int
+    # what the claims would have cost as single transactions
+    individual_fees: int
+    txid: Optional[str] = None
+
+    @property
+    def fees_saved(self) -> int:
+        return self.individual_fees - self.fee
+
+
+class ClaimBatcher:
+    """
+    collects ready BTC claims and settles them in one transaction when
+    `window` seconds passed since the first one, `max_claims` are queued or a
+    claim is within `urgent_blocks` of its timeout. the timeout check needs a
+    chain source of the pair to know the block height. liquid claims are not
+    batched, their outputs would have to be blinded together.
+    """
+
+    def __init__(
+        self,
+        client: BoltzClient,
+        receive_address: str,
+        window: float = 60,
+        max_claims: int = 20,
+        urgent_blocks: int = 6,
+        pair: Optional[str] = None,
+    ):
+        info = client.pair_info(pair)
+        if info.liquid:
+            raise ValueError("claim batching is only available for BTC")
+        client.validate_address(receive_address, info.pair)
+        self.client = client
+        self.pair = info.pair
+        self.receive_address = receive_address
+        self.window = window
+        self.max_claims = max_claims
+        self.urgent_blocks = urgent_blocks
+        self.batches: list[ClaimBatch] = []
+        self.fees_saved = 0
+        self._pending: list[tuple[ClaimInput, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+
+    async def claim(
+        self,
+        boltz_id: str,
+        lockup_address: str,
+        privkey_wif: str,
+        preimage_hex: str,
+        redeem_script_hex: str,
+        timeout_block_height: int,
+        zeroconf: bool = True,
+    ) -> str:
+        """wait for the lockup of a reverse swap and claim it with the next batch"""
+        self.client.validate_address(lockup_address, self.pair)
+        lockup_rawtx = await self.client.wait_for_lockup_tx(
+            boltz_id, lockup_address, zeroconf, self.pair
+        )
+        return await self.add(
+            ClaimInput(
+                lockup_address=lockup_address,
+                lockup_rawtx=lockup_rawtx,
+                privkey_wif=privkey_wif,
+                preimage_hex=preimage_hex,
+                redeem_script_hex=redeem_script_hex,
+            ),
+            timeout_block_height,
+        )
+
+    async def add(self, claim: ClaimInput, timeout_block_height: int) -> str:
+        """queue a claim and return the txid of the batch it was settled in"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((claim, future))
+        if len(self._pending) >= self.max_claims or await self._is_urgent(
+            timeout_block_height
+        ):
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def _is_urgent(self, timeout_block_height: int) -> bool:
+        chain_source = self.client.get_chain_source(self.pair)
+        if not chain_source:
+            return False
+        try:
+            block_height = await chain_source.get_block_height()
+        except Exception:
+            return False
+        return timeout_block_height - block_height <= self.urgent_blocks
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window)
+        await self.flush()
+
+    async def flush(self) -> Optional[ClaimBatch]:
+        """
+        settle all queued claims now, errors are passed on to the claims
+        of the batch instead of being raised here. claims that cannot be
+        spent fail on their own, the others are batched without them
+        """
+        if self._timer and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        pending, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        errors = await loop.run_in_executor(
+            None, self._check, [claim for claim, _ in pending]
+        )
+        for (_, future), error in zip(pending, errors):
+            if error and not future.done():
+                future.set_exception(error)
+        pending = [item for item, error in zip(pending, errors) if not error]
+        if not pending:
+            return None
+        try:
+            batch = await loop.run_in_executor(
+                None, self.build, [claim for claim, _ in pending]
+            )
+            result = await loop.run_in_executor(
+                None, self.client.broadcast_tx, batch.transaction, self.pair
+            )
+        except Exception as exc:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(exc)
+            return None
+        batch.txid = result.txid
+        self.batches.append(batch)
+        self.fees_saved += batch.fees_saved
+        for _, future in pending:
+            if not future.done():
+                future.set_result(result.txid)
+        return batch
+
+    @staticmethod
+    def _check(claims: list[ClaimInput]) -> list[Optional[ValueError]]:
+        errors: list[Optional[ValueError]] = []
+        for claim in claims:
+            try:
+                check_claim_input(claim)
+                errors.append(None)
+            except ValueError as exc:
+                errors.append(exc)
+        return errors
+
+    async def close(self) -> None:
+        await self.flush()
+
+    def build(self, claims: list[ClaimInput]) -> ClaimBatch:
+        """
+        the batch pays the fee rate boltz estimates for a single claim, the
+        inputs share one output and the transaction overhead, which is saved
+        """
+        claim_fee = self.client.get_fee_estimation_claim(self.pair)
+        output_script_size = len(
+            script.address_to_scriptpubkey(self.receive_address).data
+        )
+        sizes = [len(claim.redeem_script_hex) // 2 for claim in claims]
+        single_vsizes = sum(
+            estimate_claim_vsize([size], output_script_size) for size in sizes
+        )
+        vsize = estimate_claim_vsize(sizes, output_script_size)
+        fee = ceil(claim_fee * len(claims) * vsize / single_vsizes)
+        return ClaimBatch(
+            transaction=create_batch_claim_tx(claims, self.receive_address, fee),
+            claims=len(claims),
+            vsize=vsize,
+            fee=fee,
+            individual_fees=claim_fee * len(claims),
+        )
@@ -0,0 +1,224 @@
+""" boltz_client load generation, swap lifecycles per second and latency percentiles """
+
+import asyncio
+import shlex
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from math import ceil
+from typing import Any, Callable, Optional
+
+from .boltz import BoltzClient
+from .orchestrator import (
+    ReverseSwapJob,
+    SubmarineSwapJob,
+    SwapJob,
+    SwapOrchestrator,
+    SwapState,
+)
+
+# reported phases and the orchestrator states they are made of, the wait of a
+# submarine swap is boltz detecting our lockup and paying the invoice
+PHASES = {
+    "create": (SwapState.create,),
+    "wait-for-lockup": (
+        SwapState.wait_status,
+        SwapState.wait_lockup,
+        SwapState.wait_timeout,
+    ),
+    "build": (SwapState.build,),
+    "broadcast": (SwapState.broadcast,),
+}
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """nearest-rank percentile of the values"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[max(0, ceil(percent / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class PhaseStats:
+    phase: str
+    count: int
+    p50: float
+    p95: float
+    p99: float
+
+
+@dataclass
+class BenchReport:
+    kind: str
+    concurrency: int
+    duration: float
+    started: int
+    completed: int
+    failed: int
+    # completed lifecycles per second
+    throughput: float
+    phases: list[PhaseStats] = field(default_factory=list)
+    # error message and how often it occurred
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def to_json(self) -> dict:
+        return asdict(self)
+
+    def table(self) -> str:
+        lines = [
+            f"{self.kind} swaps, concurrency {self.concurrency}, "
+            f"{self.duration:.1f}s",
+            f"started {self.started}, completed {self.completed}, "
+            f"failed {self.failed}, {self.throughput:.2f} swaps/s",
+            "",
+            f"{'phase':<16}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}",
+        ]
+        for stats in self.phases:
+            lines.append(
+                f"{stats.phase:<16}{stats.count:>8}{stats.p50 * 1000:>12.1f}"
+                f"{stats.p95 * 1000:>12.1f}{stats.p99 * 1000:>12.1f}"
+            )
+        for error, count in self.errors.items():
+            lines.append(f"error ({count}x): {error}")
+        return "\n".join(lines)
+
+
+def summarize(
+    jobs: list[SwapJob], kind: str, concurrency: int, duration: float
+) -> BenchReport:
+    completed = [job for job in jobs if job.state == SwapState.done]
+    failed = [job for job in jobs if job.state == SwapState.failed]
+    phases = []
+    for phase, states in PHASES.items():
+        timings = [
+            sum(job.timings[state] for state in states if state in job.timings)
+            for job in jobs
+            if any(state in job.timings for state in states)
+        ]
+        if timings:
+            phases.append(
+                PhaseStats(
+                    phase,
+                    len(timings),
+                    percentile(timings, 50),
+                    percentile(timings, 95),
+                    percentile(timings, 99),
+                )
+            )
+    errors: dict[str, int] = {}
+    for job in failed:
+        error = f"{type(job.error).__name__}: {job.error}"
+        errors[error] = errors.get(error, 0) + 1
+    return BenchReport(
+        kind=kind,
+        concurrency=concurrency,
+        duration=duration,
+        started=len(jobs),
+        completed=len(completed),
+        failed=len(failed),
+        throughput=len(completed) / duration if duration else 0,
+        phases=phases,
+        errors=errors,
+    )
+
+
+async def run_bench(
+    client: BoltzClient,
+    make_job: Callable[[int], SwapJob],
+    kind: str = "reverse",
+    concurrency: int = 10,
+    duration: float = 30,
+    drain_timeout: Optional[float] = None,
+    **orchestrator_kwargs: Any,
+) -> BenchReport:
+    """
+    keep `concurrency` swap lifecycles running for `duration` seconds, then wait
+    up to `drain_timeout` for the started ones to finish
+    """
+    loop = asyncio.get_running_loop()
+    jobs: list[SwapJob] = []
+    orchestrator = SwapOrchestrator(
+        client,
+        max_jobs=concurrency,
+        queue_size=concurrency,
+        **orchestrator_kwargs,
+    )
+    start = time.perf_counter()
+    deadline = start + duration
+    async with orchestrator:
+        while time.perf_counter() < deadline:
+            job = await loop.run_in_executor(None, make_job, len(jobs))
+            try:
+                await asyncio.wait_for(
+                    orchestrator.submit(job), deadline - time.perf_counter()
+                )
+            except asyncio.TimeoutError:
+                break
+            jobs.append(job)
+        try:
+            await asyncio.wait_for(orchestrator.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+    return summarize(jobs, kind, concurrency, time.perf_counter() - start)
+
+
+def run_command(command: str, **kwargs: Any) -> str:
+    """run a shell-like command with `{name}` placeholders filled in, return its stdout"""
+    args = [arg.format(**kwargs) for arg in shlex.split(command)]
+    res = subprocess.run(args, capture_output=True, text=True, check=True)
+    return res.stdout.strip()
+
+
+def job_factory(
+    kind: str,
+    amount: int,
+    address: str,
+    pair: Optional[str] = None,
+    invoice_command: Optional[str] = None,
+) -> Callable[[int], SwapJob]:
+    """synthetic jobs, submarine swaps get a fresh invoice from `invoice_command`"""
+    if kind == "reverse":
+        return lambda _: ReverseSwapJob(
+            amount=amount, receive_address=address, pair=pair
+        )
+    if not invoice_command:
+        raise ValueError("submarine swaps need an invoice command")
+    return lambda _: SubmarineSwapJob(
+        payment_request=run_command(invoice_command, amount=amount),
+        refund_address=address,
+        pair=pair,
+    )
+
+
+def command_hooks(
+    pay_command: Optional[str] = None, fund_command: Optional[str] = None
+) -> Callable[[SwapJob], None]:
+    """
+    `on_transition` which pays the invoice of a reverse swap with `pay_command`
+    and funds the lockup of a submarine swap with `fund_command`, in the background
+    """
+
+    def run(command: str, **kwargs: Any) -> None:
+        threading.Thread(
+            target=run_command, args=(command,), kwargs=kwargs, daemon=True
+        ).start()
+
+    def on_transition(job: SwapJob) -> None:
+        if (
+            pay_command
+            and isinstance(job, ReverseSwapJob)
+            and job.state == SwapState.wait_lockup
+            and job.swap
+        ):
+            run(pay_command, invoice=job.swap.invoice)
+        if (
+            fund_command
+            and isinstance(job, SubmarineSwapJob)
+            and job.state == SwapState.wait_status
+            and job.swap
+        ):
+            run(fund_command, address=job.swap.address, amount=job.swap.expectedAmount)
+
+    return on_transition
@@ -0,0 +1,201 @@
+""" boltz_client bolt11 invoice decoding, without signature verification """
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .helpers import LRUCache
+
+CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+CHARSET_REV = {char: value for value, char in enumerate(CHARSET)}
+
+# currency prefix of the human readable part and its network, longest first
+PREFIXES = (("bcrt", "regtest"), ("tbs", "signet"), ("bc", "main"), ("tb", "test"))
+
+# millisatoshis of one unit of each amount multiplier
+MULTIPLIERS_MSAT = {"m": 10**8, "u": 10**5, "n": 10**2}
+
+DEFAULT_EXPIRY = 3600
+DEFAULT_MIN_FINAL_CLTV_EXPIRY = 18
+
+# timestamp, then the signature with its recovery id, in 5 bit groups
+TIMESTAMP_LENGTH = 7
+SIGNATURE_LENGTH = 104
+
+invoice_cache = LRUCache(1024)
+
+
+@dataclass(frozen=True)
+class Invoice:
+    payment_request: str
+    network: str
+    amount_msat: Optional[int]
+    timestamp: int
+    payment_hash: str
+    expiry: int = DEFAULT_EXPIRY
+    description: Optional[str] = None
+    description_hash: Optional[str] = None
+    payee: Optional[str] = None
+    min_final_cltv_expiry: int = DEFAULT_MIN_FINAL_CLTV_EXPIRY
+
+    @property
+    def amount_sat(self) -> Optional[int]:
+        if self.amount_msat is None:
+            return None
+        return self.amount_msat // 1000
+
+    @property
+    def expires_at(self) -> int:
+        return self.timestamp + self.expiry
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) >= self.expires_at
+
+
+def _polymod(values: list[int]) -> int:
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                chk ^= generator[i]
+    return chk
+
+
+def _hrp_expand(hrp: str) -> list[int]:
+    return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
+
+
+def bech32_decode(bech: str) -> tuple[str, list[int]]:
+    """human readable part and 5 bit data of a bech32 string, no length limit"""
+    if bech.lower() != bech and bech.upper() != bech:
+        raise ValueError("mixed case")
+    bech = bech.lower()
+    pos = bech.rfind("1")
+    if pos < 1 or pos + 7 > len(bech):
+        raise ValueError("invalid separator position")
+    hrp = bech[:pos]
+    try:
+        data = [CHARSET_REV[char] for char in bech[pos + 1 :]]  # noqa: E203
+    except KeyError as exc:
+        raise ValueError("invalid bech32 character") from exc
+    if _polymod(_hrp_expand(hrp) + data) != 1:
+        raise ValueError("invalid bech32 checksum")
+    return hrp, data[:-6]
+
+
+def _to_int(data: list[int]) -> int:
+    value = 0
+    for group in data:
+        value = value << 5 | group
+    return value
+
+
+def _to_bytes(data: list[int]) -> bytes:
+    """5 bit groups to bytes, dropping the padding bits"""
+    value = _to_int(data)
+    num_bits = len(data) * 5
+    value >>= num_bits % 8
+    return value.to_bytes(num_bits // 8, "big")
+
+
+def _to_hex(data: list[int]) -> str:
+    return _to_bytes(data).hex()
+
+
+def _to_text(data: list[int]) -> str:
+    return _to_bytes(data).decode("utf-8", "replace")
+
+
+# tagged fields by tag: `Invoice` field, length in 5 bit groups (None for any)
+# and parser of the value. unknown tags are skipped
+TAGGED_FIELDS: dict[str, tuple[str, Optional[int], Callable[[list[int]], Any]]] = {
+    "p": ("payment_hash", 52, _to_hex),
+    "h": ("description_hash", 52, _to_hex),
+    "n": ("payee", 53, _to_hex),
+    "d": ("description", None, _to_text),
+    "x": ("expiry", None, _to_int),
+    "c": ("min_final_cltv_expiry", None, _to_int),
+}
+
+
+def _parse_hrp(hrp: str) -> tuple[str, Optional[int]]:
+    if not hrp.startswith("ln"):
+        raise ValueError("not a lightning invoice")
+    rest = hrp[2:]
+    for prefix, network in PREFIXES:
+        if rest.startswith(prefix):
+            amount = rest[len(prefix) :]  # noqa: E203
+            break
+    else:
+        raise ValueError(f"unknown invoice currency: {hrp}")
+    if not amount:
+        return network, None
+    multiplier = amount[-1]
+    if multiplier.isdigit():
+        digits, amount_msat = amount, int(amount) * 10**11
+    elif multiplier == "p":
+        digits = amount[:-1]
+        if int(digits) % 10:
+            raise ValueError("sub millisatoshi amount")
+        amount_msat = int(digits) // 10
+    elif multiplier in MULTIPLIERS_MSAT:
+        digits = amount[:-1]
+        amount_msat = int(digits) * MULTIPLIERS_MSAT[multiplier]
+    else:
+        raise ValueError(f"invalid amount multiplier: {multiplier}")
+    if not digits.isdigit() or digits.startswith("0"):
+        raise ValueError(f"invalid amount: {amount}")
+    return network, amount_msat
+
+
+def _parse_tagged_fields(data: list[int]) -> dict[str, Any]:
+    """`Invoice` fields of the tagged fields in `data`, see `TAGGED_FIELDS`"""
+    fields: dict[str, Any] = {}
+    pos = 0
+    while pos < len(data):
+        if pos + 3 > len(data):
+            raise ValueError("truncated tagged field")
+        tag = CHARSET[data[pos]]
+        length = data[pos + 1] << 5 | data[pos + 2]
+        value_start = pos + 3
+        pos = value_start + length
+        if pos > len(data):
+            raise ValueError("truncated tagged field")
+        if tag not in TAGGED_FIELDS:
+            continue
+        name, expected_length, parse = TAGGED_FIELDS[tag]
+        # the first occurrence counts, fields of unexpected length are skipped
+        if name in fields or expected_length not in (None, length):
+            continue
+        fields[name] = parse(data[value_start:pos])
+    return fields
+
+
+def decode(payment_request: str) -> Invoice:
+    """decode a bolt11 invoice, the result is cached by payment request"""
+    payment_request = payment_request.strip()
+    cached = invoice_cache.get(payment_request)
+    if cached:
+        return cached
+
+    hrp, data = bech32_decode(payment_request)
+    network, amount_msat = _parse_hrp(hrp)
+    if len(data) < TIMESTAMP_LENGTH + SIGNATURE_LENGTH:
+        raise ValueError("invoice too short")
+    timestamp = _to_int(data[:TIMESTAMP_LENGTH])
+    fields = _parse_tagged_fields(data[TIMESTAMP_LENGTH:-SIGNATURE_LENGTH])
+    if "payment_hash" not in fields:
+        raise ValueError("invoice has no payment hash")
+
+    invoice = Invoice(
+        payment_request=payment_request,
+        network=network,
+        amount_msat=amount_msat,
+        timestamp=timestamp,
+        **fields,
+    )
+    invoice_cache.put(payment_request, invoice)
+    return invoice
@@ -1,21 +1,38 @@
 """ boltz_client main module """
 
 import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from math import ceil, floor
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional, Protocol, TypeVar, Union
 
 import httpx
 
-from .helpers import req_wrap
+from .bolt11 import Invoice, decode
+from .broadcast import Broadcaster, BroadcastResult, broadcast
+from .chain import ChainSource
+from .endpoints import EndpointRouter
+from .helpers import BoltzApiException, SingleFlight, req_wrap, slotted
 from .onchain import (
     create_claim_tx,
     create_key_pair,
     create_preimage,
     create_refund_tx,
+    get_script_pubkey,
     validate_address,
 )
+from .onchain_wally import LiquidTxStats
+from .pairs_cache import PairsCache
+from .quote import PairQuote, quote
+
+if TYPE_CHECKING:
+    from .events import SwapEvents
+    from .taproot_swaps import TaprootSwaps
+
+# posts without side effects, concurrent identical requests share one call
+IDEMPOTENT_POSTS = ("/swapstatus", "/getswaptransaction")
 
 
 class SwapDirection(str, Enum):
@@ -27,7 +44,8 @@ class BoltzLimitException(Exception):
     pass
 
 
-class BoltzApiException(Exception):
+# a subclass, so callers catching rejected invoices from the api still do
+class BoltzInvoiceException(BoltzApiException):
     pass
 
 
@@ -43,6 +61,10 @@ class BoltzPairException(Exception):
     pass
 
 
+class BoltzOfflineException(Exception):
+    pass
+
+
 class BoltzSwapStatusException(Exception):
     def __init__(self, message: str, status: str):
         self.message = message
@@ -54,8 +76,25 @@ class BoltzSwapTransactionException(Exception):
         self.message = message
 
 
+R = TypeVar("R", bound="BoltzResponse")
+
+
+class BoltzResponse(Protocol):  # pylint: disable=too-few-public-methods
+    """
+    the api response models, `slotted` generates their `from_dict` which
+    decodes api json and ignores keys unknown to the model
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls: type[R], data: dict) -> R:
+        ...
+
+
+@slotted
 @dataclass
-class BoltzSwapTransactionResponse:
+class BoltzSwapTransactionResponse(BoltzResponse):
     transactionId: Optional[str] = None
     transactionHex: Optional[str] = None
     timeoutEta: Optional[str] = None
@@ -63,8 +102,9 @@ class BoltzSwapTransactionResponse:
     failureReason: Optional[str] = None
 
 
+@slotted
 @dataclass
-class BoltzSwapStatusResponse:
+class BoltzSwapStatusResponse(BoltzResponse):
     status: str
     failureReason: Optional[str] = None
     zeroConfRejected: Optional[str] = None
@@ -72,8 +112,9 @@ class BoltzSwapStatusResponse:
     failureDetails: Optional[str] = None
 
 
+@slotted
 @dataclass
-class BoltzSwapResponse:
+class BoltzSwapResponse(BoltzResponse):
     id: str
     bip21: str
     address: str
@@ -85,8 +126,9 @@ class BoltzSwapResponse:
     referralId: Optional[str] = None
 
 
+@slotted
 @dataclass
-class BoltzReverseSwapResponse:
+class BoltzReverseSwapResponse(BoltzResponse):
     id: str
     invoice: str
     redeemScript: str
@@ -97,35 +139,220 @@ class BoltzReverseSwapResponse:
     referralId: Optional[str] = None
 
 
+@dataclass
+class BoltzBulkResult:
+    """result of one item of a bulk creation, either `swap` or `error` is set"""
+
+    index: int
+    request: Union[str, int]
+    privkey_wif: Optional[str] = None
+    preimage_hex: Optional[str] = None
+    swap: Optional[Union[BoltzSwapResponse, BoltzReverseSwapResponse]] = None
+    error: Optional[Exception] = None
+    # of the invoice of a swap, or the preimage of a reverse swap
+    payment_hash: Optional[str] = None
+
+
+class BoltzBroadcaster(Broadcaster):
+    """the boltz api, `/broadcasttransaction`"""
+
+    def __init__(self, client: "BoltzClient"):
+        super().__init__("boltz")
+        self.client = client
+
+    def send(self, rawtx: str, currency: str) -> str:
+        data = self.client.request(
+            "post",
+            "/broadcasttransaction",
+            headers={"Content-Type": "application/json"},
+            json={"currency": currency, "transactionHex": rawtx},
+        )
+        return data["transactionId"]
+
+
 @dataclass
 class BoltzConfig:
     network: str = "main"
     network_liquid: str = "liquidv1"
     pairs: list = field(default_factory=lambda: ["BTC/BTC", "L-BTC/BTC"])
     api_url: str = "https://boltz.exchange/api"
+    # several endpoints, e.g. clearnet and onion, overrides `api_url`
+    api_urls: list = field(default_factory=list)
+    # send read-only requests to a second endpoint after that many seconds
+    api_hedge_after: Optional[float] = None
     referral_id: str = "dni"
-
-
-class BoltzClient:
-    def __init__(self, config: BoltzConfig, pair: str = "BTC/BTC"):
+    pairs_cache_path: Optional[str] = None
+    pairs_cache_max_age: int = 300
+    request_cache_ttl: float = 0
+    # broadcast transactions through those backends as well as the boltz api
+    broadcasters: list = field(default_factory=list)
+    # look for lockup transactions on those chain sources as well
+    chain_sources: list = field(default_factory=list)
+    # called with the `LiquidTxStats` of every liquid claim and refund
+    liquid_tx_stats: Optional[Callable[[LiquidTxStats], Any]] = None
+    liquid_tx_trace_allocations: bool = False
+
+
+@dataclass(frozen=True)
+class PairInfo:
+    pair: str
+    # currency of the onchain side, e.g. used for broadcasting
+    currency: str
+    network: str
+    liquid: bool
+
+
+class BoltzClient:  # pylint: disable=too-many-public-methods
+    """
+    serves every pair of `config.pairs`, methods take an optional `pair` and
+    default to the one given here.
+
+    the client is thread-safe and meant to be shared, e.g. by the workers of a
+    web server: all threads use one connection pool, the pairs snapshot is
+    replaced as a whole on refresh and never mutated, so readers need no lock
+    """
+
+    def __init__(
+        self,
+        config: BoltzConfig,
+        pair: str = "BTC/BTC",
+        offline: bool = False,
+        refresh: bool = False,
+        http_client: Optional[httpx.Client] = None,
+    ):
         self._cfg = config
-        if pair not in self._cfg.pairs:
+        self.pair_infos = {
+            pair_id: PairInfo(
+                pair=pair_id,
+                currency=pair_id.split("/")[0],
+                network=(
+                    self._cfg.network_liquid
+                    if pair_id == "L-BTC/BTC"
+                    else self._cfg.network
+                ),
+                liquid=pair_id == "L-BTC/BTC",
+            )
+            for pair_id in self._cfg.pairs
+        }
+        self.pair = self.pair_info(pair).pair
+        self.offline = offline
+        # one connection pool for all pairs and endpoints
+        self.http_client = http_client or httpx.Client()
+        self._singleflight = SingleFlight(self._cfg.request_cache_ttl)
+        self.router = EndpointRouter(
+            self._cfg.api_urls or [self._cfg.api_url],
+            hedge_after=self._cfg.api_hedge_after,
+        )
+        self.boltz_broadcaster = BoltzBroadcaster(self)
+        self.pairs_cache: Optional[PairsCache] = None
+        if self._cfg.pairs_cache_path:
+            self.pairs_cache = PairsCache(
+                self._cfg.pairs_cache_path, self.router.endpoints[0].url
+            )
+        self.pairs = self.load_pairs(refresh)
+        self._events: Optional["SwapEvents"] = None
+        self._taproot: Optional["TaprootSwaps"] = None
+
+    @property
+    def events(self) -> "SwapEvents":
+        """status events of the swaps passed to `events.watch`, see `on`"""
+        if not self._events:
+            from .events import SwapEvents
+
+            self._events = SwapEvents(self)
+        return self._events
+
+    def on(self, status: str, handler: Callable) -> Callable:
+        """
+        call `handler` with a `SwapStatusEvent` when a watched swap reaches
+        `status`, e.g. `transaction.mempool`, or any status for `*`
+        """
+        return self.events.on(status, handler)
+
+    @property
+    def taproot(self) -> "TaprootSwaps":
+        """taproot swaps of the v2 api, see `TaprootSwaps`"""
+        if not self._taproot:
+            from .taproot_swaps import TaprootSwaps
+
+            self._taproot = TaprootSwaps(self)
+        return self._taproot
+
+    @property
+    def referral_id(self) -> Optional[str]:
+        return self._cfg.referral_id
+
+    def close(self) -> None:
+        self.http_client.close()
+        self.router.close()
+
+    def __enter__(self) -> "BoltzClient":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def pair_info(self, pair: Optional[str] = None) -> PairInfo:
+        info = self.pair_infos.get(pair or self.pair)
+        if not info:
             raise BoltzPairException(
                 f"invalid pair {pair}, possible pairs: {', '.join(self._cfg.pairs)}"
             )
-        self.pair = pair
-        self.pairs = self.get_pairs()
-        self.fees = self.pairs[self.pair]["fees"]
-        self.limits = self.pairs[self.pair]["limits"]
+        return info
+
+    def get_fees(self, pair: Optional[str] = None) -> dict:
+        return self.pairs[self.pair_info(pair).pair]["fees"]
+
+    def get_limits(self, pair: Optional[str] = None) -> dict:
+        return self.pairs[self.pair_info(pair).pair]["limits"]
+
+    @property
+    def fees(self) -> dict:
+        return self.get_fees()
 
-        if self.pair == "L-BTC/BTC":
-            self.network = self._cfg.network_liquid
-        else:
-            self.network = self._cfg.network
+    @property
+    def limits(self) -> dict:
+        return self.get_limits()
 
-    def request(self, funcname, *args, **kwargs) -> dict:
+    @property
+    def network(self) -> str:
+        return self.pair_info().network
+
+    def request(self, funcname: str, path: str, **kwargs) -> dict:
+        if self.offline:
+            raise BoltzOfflineException(f"offline mode, not requesting: {path}")
+        if funcname == "get" or path in IDEMPOTENT_POSTS:
+            key = (funcname, path, json.dumps(kwargs.get("json"), sort_keys=True))
+            return self._singleflight.do(
+                key, lambda: self._request(funcname, path, True, **kwargs)
+            )
+        return self._request(funcname, path, False, **kwargs)
+
+    async def request_async(self, funcname: str, path: str, **kwargs) -> dict:
+        """
+        `request` in the default executor of the event loop, concurrent
+        identical read-only requests of coroutines share one call
+        """
+        if self.offline:
+            raise BoltzOfflineException(f"offline mode, not requesting: {path}")
+        if funcname == "get" or path in IDEMPOTENT_POSTS:
+            key = (funcname, path, json.dumps(kwargs.get("json"), sort_keys=True))
+            return await self._singleflight.do_async(
+                key, lambda: self._request(funcname, path, True, **kwargs)
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self._request(funcname, path, False, **kwargs)
+        )
+
+    def _request(self, funcname: str, path: str, read_only: bool, **kwargs) -> dict:
         try:
-            return req_wrap(funcname, *args, **kwargs)
+            return self.router.call(
+                lambda url: req_wrap(
+                    funcname, f"{url}{path}", client=self.http_client, **kwargs
+                ),
+                hedge=read_only,
+            )
         except httpx.RequestError as exc:
             msg = f"unreachable: {exc.request.url!r}."
             raise BoltzApiException(f"boltz api connection error: {msg}") from exc
@@ -138,46 +365,83 @@ class BoltzClient:
     def check_version(self):
         return self.request(
             "get",
-            f"{self._cfg.api_url}/version",
+            "/version",
             headers={"Content-Type": "application/json"},
         )
 
-    def send_onchain_tx(self, rawtw: str) -> str:
-        data = self.request(
-            "post",
-            f"{self._cfg.api_url}/broadcasttransaction",
-            headers={"Content-Type": "application/json"},
-            json={"currency": self.pair.split("/")[0], "transactionHex": rawtw},
+    def send_onchain_tx(self, rawtw: str, pair: Optional[str] = None) -> str:
+        return self.broadcast_tx(rawtw, pair).txid
+
+    def broadcast_tx(self, rawtx: str, pair: Optional[str] = None) -> BroadcastResult:
+        """broadcast through boltz and all configured broadcasters at once"""
+        return broadcast(
+            rawtx,
+            self.pair_info(pair).currency,
+            [self.boltz_broadcaster, *self._cfg.broadcasters],
         )
-        return data["transactionId"]
 
-    def add_reverse_swap_fees(self, amount: int) -> int:
-        rev = self.fees["minerFees"]["baseAsset"]["reverse"]
+    def add_reverse_swap_fees(self, amount: int, pair: Optional[str] = None) -> int:
+        fees = self.get_fees(pair)
+        rev = fees["minerFees"]["baseAsset"]["reverse"]
         fee = rev["claim"] + rev["lockup"]
-        percent = self.fees["percentage"]
+        percent = fees["percentage"]
         return ceil((amount + fee) / (1 - (percent / 100)))
 
-    def substract_swap_fees(self, amount: int) -> int:
-        fee = self.fees["minerFees"]["baseAsset"]["normal"]
-        percent = self.fees["percentageSwapIn"]
+    def substract_swap_fees(self, amount: int, pair: Optional[str] = None) -> int:
+        fees = self.get_fees(pair)
+        fee = fees["minerFees"]["baseAsset"]["normal"]
+        percent = fees["percentageSwapIn"]
         return floor((amount - fee) / (1 + (percent / 100)))
 
-    def get_fee_estimation_claim(self) -> int:
-        return self.fees["minerFees"]["baseAsset"]["reverse"]["claim"]
+    def quote(self, amounts, pairs: Optional[list[str]] = None) -> dict[str, PairQuote]:
+        """
+        fee-inclusive and fee-exclusive amounts and limit validity of many amounts
+        (a sequence or numpy array) for all configured pairs, from one pairs snapshot
+        """
+        snapshot = self.pairs
+        pair_ids = [self.pair_info(pair).pair for pair in pairs or self._cfg.pairs]
+        # configured pairs boltz does not offer right now are left out
+        pair_ids = [pair for pair in pair_ids if pair in snapshot]
+        return quote(snapshot, amounts, pair_ids)
 
-    def get_fee_estimation_refund(self) -> int:
-        return self.fees["minerFees"]["baseAsset"]["normal"]
+    def get_fee_estimation_claim(self, pair: Optional[str] = None) -> int:
+        return self.get_fees(pair)["minerFees"]["baseAsset"]["reverse"]["claim"]
+
+    def get_fee_estimation_refund(self, pair: Optional[str] = None) -> int:
+        return self.get_fees(pair)["minerFees"]["baseAsset"]["normal"]
 
     def get_pairs(self) -> dict:
         data = self.request(
             "get",
-            f"{self._cfg.api_url}/getpairs",
+            "/getpairs",
             headers={"Content-Type": "application/json"},
         )
+        if self.pairs_cache:
+            self.pairs_cache.save(data["pairs"])
         return data["pairs"]
 
-    def check_limits(self, amount: int) -> None:
-        limits = self.limits
+    def refresh_pairs(self) -> dict:
+        """fetch the pairs and swap in the new snapshot, concurrent refreshes share one request"""
+        pairs = self.get_pairs()
+        self.pairs = pairs
+        return pairs
+
+    def load_pairs(self, refresh: bool = False) -> dict:
+        """
+        pairs from the cache if it is younger than `pairs_cache_max_age`,
+        offline mode accepts any age, otherwise fetch them and update the cache
+        """
+        if self.pairs_cache and (self.offline or not refresh):
+            max_age = None if self.offline else self._cfg.pairs_cache_max_age
+            pairs = self.pairs_cache.load(max_age)
+            if pairs:
+                return pairs
+        if self.offline:
+            raise BoltzOfflineException("offline mode, but no cached pairs available")
+        return self.get_pairs()
+
+    def check_limits(self, amount: int, pair: Optional[str] = None) -> None:
+        limits = self.get_limits(pair)
         valid = limits["minimal"] <= amount <= limits["maximal"]
         if not valid:
             raise BoltzLimitException(
@@ -185,14 +449,55 @@ class BoltzClient:
                 f"min: {limits['minimal']}, max: {limits['maximal']}"
             )
 
+    @staticmethod
+    def decode_invoice(payment_request: str) -> Invoice:
+        try:
+            return decode(payment_request)
+        except ValueError as exc:
+            raise BoltzInvoiceException(f"invalid invoice: {exc}") from exc
+
+    def check_invoice(
+        self, payment_request: str, pair: Optional[str] = None
+    ) -> Invoice:
+        """
+        reject invoices boltz would reject, without asking it: other network,
+        no amount, expired or an amount outside of the pair limits
+        """
+        invoice = self.decode_invoice(payment_request)
+        # boltz pays the invoice on the lightning network of bitcoin
+        if invoice.network != self._cfg.network:
+            raise BoltzInvoiceException(
+                f"invoice is for network {invoice.network}, not {self._cfg.network}"
+            )
+        if invoice.amount_sat is None:
+            raise BoltzInvoiceException("invoice has no amount")
+        if invoice.is_expired():
+            raise BoltzInvoiceException("invoice is expired")
+        self.check_limits(invoice.amount_sat, pair)
+        return invoice
+
     def swap_status(self, boltz_id: str) -> BoltzSwapStatusResponse:
         data = self.request(
             "post",
-            f"{self._cfg.api_url}/swapstatus",
+            "/swapstatus",
             json={"id": boltz_id},
             headers={"Content-Type": "application/json"},
         )
-        status = BoltzSwapStatusResponse(**data)
+        return self._swap_status(data)
+
+    async def swap_status_async(self, boltz_id: str) -> BoltzSwapStatusResponse:
+        """`swap_status` for coroutines, see `request_async`"""
+        data = await self.request_async(
+            "post",
+            "/swapstatus",
+            json={"id": boltz_id},
+            headers={"Content-Type": "application/json"},
+        )
+        return self._swap_status(data)
+
+    @staticmethod
+    def _swap_status(data: dict) -> BoltzSwapStatusResponse:
+        status = BoltzSwapStatusResponse.from_dict(data)
 
         if status.failureReason:
             raise BoltzSwapStatusException(status.failureReason, status.status)
@@ -202,11 +507,27 @@ class BoltzClient:
     def swap_transaction(self, boltz_id: str) -> BoltzSwapTransactionResponse:
         data = self.request(
             "post",
-            f"{self._cfg.api_url}/getswaptransaction",
+            "/getswaptransaction",
             json={"id": boltz_id},
             headers={"Content-Type": "application/json"},
         )
-        res = BoltzSwapTransactionResponse(**data)
+        return self._swap_transaction(data)
+
+    async def swap_transaction_async(
+        self, boltz_id: str
+    ) -> BoltzSwapTransactionResponse:
+        """`swap_transaction` for coroutines, see `request_async`"""
+        data = await self.request_async(
+            "post",
+            "/getswaptransaction",
+            json={"id": boltz_id},
+            headers={"Content-Type": "application/json"},
+        )
+        return self._swap_transaction(data)
+
+    @staticmethod
+    def _swap_transaction(data: dict) -> BoltzSwapTransactionResponse:
+        res = BoltzSwapTransactionResponse.from_dict(data)
 
         if res.failureReason:
             raise BoltzSwapTransactionException(res.failureReason)
@@ -216,7 +537,7 @@ class BoltzClient:
     async def wait_for_tx(self, boltz_id: str) -> str:
         while True:
             try:
-                swap_transaction = self.swap_transaction(boltz_id)
+                swap_transaction = await self.swap_transaction_async(boltz_id)
                 assert swap_transaction.transactionHex
                 return swap_transaction.transactionHex
             except (ValueError, BoltzApiException, BoltzSwapTransactionException):
@@ -225,7 +546,7 @@ class BoltzClient:
     async def wait_for_tx_on_status(self, boltz_id: str, zeroconf: bool = True) -> str:
         while True:
             try:
-                status = self.swap_status(boltz_id)
+                status = await self.swap_status_async(boltz_id)
                 assert status.transaction
                 txHex = status.transaction.get("hex")
                 assert txHex
@@ -235,9 +556,52 @@ class BoltzClient:
             except (BoltzApiException, BoltzSwapStatusException, AssertionError):
                 await asyncio.sleep(3)
 
-    def validate_address(self, address: str) -> str:
+    def get_chain_source(self, pair: Optional[str] = None) -> Optional[ChainSource]:
+        currency = self.pair_info(pair).currency
+        for chain_source in self._cfg.chain_sources:
+            if chain_source.currency == currency:
+                return chain_source
+        return None
+
+    async def wait_for_lockup_tx(
+        self,
+        boltz_id: str,
+        lockup_address: str,
+        zeroconf: bool = True,
+        pair: Optional[str] = None,
+    ) -> str:
+        """
+        lockup tx from the boltz status or our chain source, whichever is first,
+        a failing one leaves the other to find it
+        """
+        chain_source = self.get_chain_source(pair)
+        if not chain_source:
+            return await self.wait_for_tx_on_status(boltz_id, zeroconf)
+        script_pubkey = get_script_pubkey(lockup_address, self.pair_info(pair).pair)
+        pending = {
+            asyncio.create_task(self.wait_for_tx_on_status(boltz_id, zeroconf)),
+            asyncio.create_task(chain_source.wait_for_lockup(script_pubkey, zeroconf)),
+        }
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        assert error
+        raise error
+
+    def validate_address(self, address: str, pair: Optional[str] = None) -> str:
+        info = self.pair_info(pair)
         try:
-            return validate_address(address, self.network, self.pair)
+            return validate_address(address, info.network, info.pair)
         except ValueError as exc:
             raise BoltzAddressValidationException(exc) from exc
 
@@ -251,10 +615,15 @@ class BoltzClient:
         redeem_script_hex: str,
         zeroconf: bool = True,
         blinding_key: Optional[str] = None,
+        pair: Optional[str] = None,
     ):
-        self.validate_address(receive_address)
-        self.validate_address(lockup_address)
-        lockup_rawtx = await self.wait_for_tx_on_status(boltz_id, zeroconf)
+        pair = self.pair_info(pair).pair
+        self.validate_address(receive_address, pair)
+        self.validate_address(lockup_address, pair)
+        lockup_rawtx = await self.wait_for_lockup_tx(
+            boltz_id, lockup_address, zeroconf, pair
+        )
+        stats = self._liquid_tx_stats(pair)
 
         transaction = create_claim_tx(
             lockup_address=lockup_address,
@@ -263,11 +632,13 @@ class BoltzClient:
             privkey_wif=privkey_wif,
             redeem_script_hex=redeem_script_hex,
             preimage_hex=preimage_hex,
-            pair=self.pair,
+            pair=pair,
             blinding_key=blinding_key,
-            fees=self.get_fee_estimation_claim(),
+            fees=self.get_fee_estimation_claim(pair),
+            stats=stats,
         )
-        return self.send_onchain_tx(transaction)
+        self._report_liquid_tx_stats(stats)
+        return self.send_onchain_tx(transaction, pair)
 
     async def refund_swap(
         self,
@@ -278,12 +649,15 @@ class BoltzClient:
         redeem_script_hex: str,
         timeout_block_height: int,
         blinding_key: Optional[str] = None,
+        pair: Optional[str] = None,
     ) -> str:
         # self.mempool.check_block_height(timeout_block_height)
-        self.validate_address(receive_address)
-        self.validate_address(lockup_address)
+        pair = self.pair_info(pair).pair
+        self.validate_address(receive_address, pair)
+        self.validate_address(lockup_address, pair)
 
         lockup_rawtx = await self.wait_for_tx(boltz_id)
+        stats = self._liquid_tx_stats(pair)
         transaction = create_refund_tx(
             lockup_address=lockup_address,
             lockup_rawtx=lockup_rawtx,
@@ -291,21 +665,42 @@ class BoltzClient:
             receive_address=receive_address,
             redeem_script_hex=redeem_script_hex,
             timeout_block_height=timeout_block_height,
-            pair=self.pair,
+            pair=pair,
             blinding_key=blinding_key,
-            fees=self.get_fee_estimation_refund(),
+            fees=self.get_fee_estimation_refund(pair),
+            stats=stats,
         )
-        return self.send_onchain_tx(transaction)
+        self._report_liquid_tx_stats(stats)
+        return self.send_onchain_tx(transaction, pair)
 
-    def create_swap(self, payment_request: str) -> tuple[str, BoltzSwapResponse]:
+    def _liquid_tx_stats(self, pair: str) -> Optional[LiquidTxStats]:
+        if not self._cfg.liquid_tx_stats or not self.pair_info(pair).liquid:
+            return None
+        return LiquidTxStats(self._cfg.liquid_tx_trace_allocations)
+
+    def _report_liquid_tx_stats(self, stats: Optional[LiquidTxStats]) -> None:
+        if stats and self._cfg.liquid_tx_stats:
+            self._cfg.liquid_tx_stats(stats)
+
+    def create_swap(
+        self, payment_request: str, pair: Optional[str] = None
+    ) -> tuple[str, BoltzSwapResponse]:
         """create swap and return private key and boltz response"""
-        refund_privkey_wif, refund_pubkey_hex = create_key_pair(self.network, self.pair)
+        info = self.pair_info(pair)
+        self.check_invoice(payment_request, info.pair)
+        refund_privkey_wif, refund_pubkey_hex = create_key_pair(info.network, info.pair)
+        swap = self._create_swap(payment_request, refund_pubkey_hex, info.pair)
+        return refund_privkey_wif, swap
+
+    def _create_swap(
+        self, payment_request: str, refund_pubkey_hex: str, pair: str
+    ) -> BoltzSwapResponse:
         data = self.request(
             "post",
-            f"{self._cfg.api_url}/createswap",
+            "/createswap",
             json={
                 "type": "submarine",
-                "pairId": self.pair,
+                "pairId": pair,
                 "orderSide": "sell",
                 "refundPublicKey": refund_pubkey_hex,
                 "invoice": payment_request,
@@ -313,21 +708,30 @@ class BoltzClient:
             },
             headers={"Content-Type": "application/json"},
         )
-        return refund_privkey_wif, BoltzSwapResponse(**data)
+        return BoltzSwapResponse.from_dict(data)
 
     def create_reverse_swap(
-        self, amount: int = 0
+        self, amount: int = 0, pair: Optional[str] = None
     ) -> tuple[str, str, BoltzReverseSwapResponse]:
         """create reverse swap and return privkey, preimage and boltz response"""
-        self.check_limits(amount)
-        claim_privkey_wif, claim_pubkey_hex = create_key_pair(self.network, self.pair)
+        info = self.pair_info(pair)
+        self.check_limits(amount, info.pair)
+        claim_privkey_wif, claim_pubkey_hex = create_key_pair(info.network, info.pair)
         preimage_hex, preimage_hash = create_preimage()
+        swap = self._create_reverse_swap(
+            amount, preimage_hash, claim_pubkey_hex, info.pair
+        )
+        return claim_privkey_wif, preimage_hex, swap
+
+    def _create_reverse_swap(
+        self, amount: int, preimage_hash: str, claim_pubkey_hex: str, pair: str
+    ) -> BoltzReverseSwapResponse:
         data = self.request(
             "post",
-            f"{self._cfg.api_url}/createswap",
+            "/createswap",
             json={
                 "type": "reversesubmarine",
-                "pairId": self.pair,
+                "pairId": pair,
                 "orderSide": "buy",
                 "invoiceAmount": amount,
                 "preimageHash": preimage_hash,
@@ -336,5 +740,82 @@ class BoltzClient:
             },
             headers={"Content-Type": "application/json"},
         )
-        swap = BoltzReverseSwapResponse(**data)
-        return claim_privkey_wif, preimage_hex, swap
+        return BoltzReverseSwapResponse.from_dict(data)
+
+    def create_swaps(
+        self,
+        payment_requests: list[str],
+        max_concurrency: int = 8,
+        pair: Optional[str] = None,
+    ) -> list[BoltzBulkResult]:
+        """
+        create one swap per payment request, at most `max_concurrency` requests
+        are in flight, a failing swap does not abort the others
+        """
+        info = self.pair_info(pair)
+        keys = [create_key_pair(info.network, info.pair) for _ in payment_requests]
+
+        def create(index: int) -> BoltzBulkResult:
+            invoice = self.check_invoice(payment_requests[index], info.pair)
+            refund_privkey_wif, refund_pubkey_hex = keys[index]
+            swap = self._create_swap(
+                payment_requests[index], refund_pubkey_hex, info.pair
+            )
+            return BoltzBulkResult(
+                index,
+                payment_requests[index],
+                privkey_wif=refund_privkey_wif,
+                swap=swap,
+                payment_hash=invoice.payment_hash,
+            )
+
+        return self._run_bulk(create, payment_requests, max_concurrency)
+
+    def create_reverse_swaps(
+        self,
+        amounts: list[int],
+        max_concurrency: int = 8,
+        pair: Optional[str] = None,
+    ) -> list[BoltzBulkResult]:
+        """
+        create one reverse swap per amount, at most `max_concurrency` requests
+        are in flight, a failing swap does not abort the others
+        """
+        info = self.pair_info(pair)
+        keys = [create_key_pair(info.network, info.pair) for _ in amounts]
+        preimages = [create_preimage() for _ in amounts]
+
+        def create(index: int) -> BoltzBulkResult:
+            self.check_limits(amounts[index], info.pair)
+            claim_privkey_wif, claim_pubkey_hex = keys[index]
+            preimage_hex, preimage_hash = preimages[index]
+            swap = self._create_reverse_swap(
+                amounts[index], preimage_hash, claim_pubkey_hex, info.pair
+            )
+            return BoltzBulkResult(
+                index,
+                amounts[index],
+                privkey_wif=claim_privkey_wif,
+                preimage_hex=preimage_hex,
+                swap=swap,
+                payment_hash=preimage_hash,
+            )
+
+        return self._run_bulk(create, amounts, max_concurrency)
+
+    @staticmethod
+    def _run_bulk(
+        create: Callable[[int], BoltzBulkResult],
+        requests: Union[list[str], list[int]],
+        max_concurrency: int,
+    ) -> list[BoltzBulkResult]:
+        def run(index: int) -> BoltzBulkResult:
+            try:
+                return create(index)
+            except Exception as exc:
+                return BoltzBulkResult(index, requests[index], error=exc)
+
+        if not requests:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            return list(executor.map(run, range(len(requests))))
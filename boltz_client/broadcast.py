@@ -0,0 +1,166 @@
+""" boltz_client transaction broadcasting """
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from .helpers import BoltzApiException, req_wrap
+
+
+# a subclass, so handlers of failed api broadcasts around `send_onchain_tx` still catch it
+class BoltzBroadcastException(BoltzApiException):
+    def __init__(self, message: str, errors: dict[str, str]):
+        super().__init__(message)
+        self.message = message
+        self.errors = errors
+
+
+class Broadcaster:
+    """sends raw transactions to one backend and keeps its latency stats"""
+
+    def __init__(self, name: str, currency: Optional[str] = None):
+        self.name = name
+        # None means the backend serves every currency
+        self.currency = currency
+        self.latencies: deque[float] = deque(maxlen=100)
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def serves(self, currency: str) -> bool:
+        return self.currency is None or self.currency == currency
+
+    def send(self, rawtx: str, currency: str) -> str:
+        """broadcast the transaction and return its txid"""
+        raise NotImplementedError
+
+    def timed_send(self, rawtx: str, currency: str) -> tuple[str, float]:
+        start = time.perf_counter()
+        try:
+            txid = self.send(rawtx, currency)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(latency)
+        return txid, latency
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            return sum(self.latencies) / len(self.latencies)
+
+
+class RpcBroadcaster(Broadcaster):
+    """bitcoind or elementsd json-rpc, `sendrawtransaction`"""
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        currency: str = "BTC",
+        name: Optional[str] = None,
+    ):
+        super().__init__(name or f"rpc {url}", currency)
+        self.url = url
+        self.auth = (username, password)
+
+    def send(self, rawtx: str, currency: str) -> str:
+        try:
+            data = req_wrap(
+                "post",
+                self.url,
+                auth=self.auth,
+                json={
+                    "jsonrpc": "1.0",
+                    "id": "boltz_client",
+                    "method": "sendrawtransaction",
+                    "params": [rawtx],
+                },
+                headers={"Content-Type": "application/json"},
+            )
+        except httpx.HTTPStatusError as exc:
+            # bitcoind answers rpc errors with a status 500 and an error object
+            try:
+                error = exc.response.json()["error"]["message"]
+            except (ValueError, KeyError, TypeError):
+                error = exc.response.text
+            raise ValueError(f"rpc error: {error}") from exc
+        if data.get("error"):
+            raise ValueError(f"rpc error: {data['error']}")
+        return data["result"]
+
+
+class EsploraBroadcaster(Broadcaster):
+    """esplora / electrs http api, `POST /tx`"""
+
+    def __init__(self, url: str, currency: str = "BTC", name: Optional[str] = None):
+        super().__init__(name or f"esplora {url}", currency)
+        self.url = url.rstrip("/")
+
+    def send(self, rawtx: str, currency: str) -> str:
+        data = req_wrap(
+            "post",
+            f"{self.url}/tx",
+            content=rawtx,
+            headers={"Content-Type": "text/plain"},
+        )
+        return data["text"].strip()
+
+
+@dataclass
+class BroadcastResult:
+    txid: str
+    backend: str
+    latency: float
+    # errors of the backends which failed before the first success
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def broadcast(
+    rawtx: str, currency: str, broadcasters: list[Broadcaster]
+) -> BroadcastResult:
+    """
+    send the transaction to all backends serving `currency` at once and return
+    on the first success, the slower backends finish in the background
+    """
+    backends = [b for b in broadcasters if b.serves(currency)]
+    if not backends:
+        raise ValueError(f"no broadcaster configured for {currency}")
+    if len(backends) == 1:
+        txid, latency = backends[0].timed_send(rawtx, currency)
+        return BroadcastResult(txid, backends[0].name, latency)
+
+    errors: dict[str, str] = {}
+    executor = ThreadPoolExecutor(max_workers=len(backends))
+    try:
+        pending: set[Future] = set()
+        names: dict[Future, str] = {}
+        for backend in backends:
+            future = executor.submit(backend.timed_send, rawtx, currency)
+            names[future] = backend.name
+            pending.add(future)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                exc = future.exception()
+                if exc is None:
+                    txid, latency = future.result()
+                    return BroadcastResult(txid, names[future], latency, errors)
+                errors[names[future]] = str(exc)
+    finally:
+        executor.shutdown(wait=False)
+    raise BoltzBroadcastException(
+        "broadcast failed on all backends: "
+        + ", ".join(f"{name}: {error}" for name, error in errors.items()),
+        errors,
+    )
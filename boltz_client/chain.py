@@ -0,0 +1,76 @@
+""" boltz_client chain sources, lockup detection without the boltz api """
+
+import abc
+import asyncio
+from hashlib import sha256
+from typing import Any, Optional
+
+import httpx
+
+from .helpers import req_wrap
+
+
+class ChainSource(abc.ABC):
+    """a view on the chain of one currency, e.g. our own node"""
+
+    def __init__(self, currency: str = "BTC"):
+        self.currency = currency
+
+    @abc.abstractmethod
+    async def find_lockup(
+        self, script_pubkey: bytes, zeroconf: bool = True
+    ) -> Optional[str]:
+        """raw transaction paying to `script_pubkey`, None if not seen yet"""
+
+    @abc.abstractmethod
+    async def get_block_height(self) -> int:
+        """height of the chain tip"""
+
+    async def wait_for_lockup(
+        self, script_pubkey: bytes, zeroconf: bool = True, interval: float = 1
+    ) -> str:
+        while True:
+            try:
+                rawtx = await self.find_lockup(script_pubkey, zeroconf)
+                if rawtx:
+                    return rawtx
+            except (httpx.HTTPError, ValueError, KeyError):
+                pass
+            await asyncio.sleep(interval)
+
+
+class EsploraChainSource(ChainSource):
+    """esplora / electrs http api, looks up the lockup by its script hash"""
+
+    def __init__(self, url: str, currency: str = "BTC"):
+        super().__init__(currency)
+        self.url = url.rstrip("/")
+
+    async def _get(self, path: str, as_json: bool = True) -> Any:
+        content_type = "application/json" if as_json else "text/plain"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: req_wrap(
+                "get", f"{self.url}{path}", headers={"Content-Type": content_type}
+            ),
+        )
+
+    async def get_block_height(self) -> int:
+        data = await self._get("/blocks/tip/height", as_json=False)
+        return int(data["text"])
+
+    async def find_lockup(
+        self, script_pubkey: bytes, zeroconf: bool = True
+    ) -> Optional[str]:
+        # esplora scripthashes are the plain sha256 of the script pubkey
+        scripthash = sha256(script_pubkey).hexdigest()
+        txs = await self._get(f"/scripthash/{scripthash}/txs")
+        script_pubkey_hex = script_pubkey.hex()
+        for tx in txs:
+            if not zeroconf and not tx["status"]["confirmed"]:
+                continue
+            if any(vout["scriptpubkey"] == script_pubkey_hex for vout in tx["vout"]):
+                data = await self._get(f"/tx/{tx['txid']}/hex", as_json=False)
+                return data["text"].strip()
+        return None
@@ -2,13 +2,28 @@
 
 import asyncio
 import json
-
-# import sys
-from typing import Optional
+import os
+import sys
+from functools import partial
+from typing import IO, Awaitable, Callable, Optional, Union
 
 import click
 
+from boltz_client.bench import command_hooks, job_factory, run_bench
 from boltz_client.boltz import BoltzClient, BoltzConfig, SwapDirection
+from boltz_client.daemon import BoltzDaemon, DaemonClient, is_running
+from boltz_client.records import (
+    claim_record,
+    export_records,
+    import_records,
+    iter_records,
+    refund_record,
+    settle_in_executor,
+    settle_many,
+)
+from boltz_client.sharding import SwapWorker
+from boltz_client.store import SqliteSwapStore, SwapRecord
+from boltz_client.watch import watch_swaps
 
 # disable tracebacks on exceptions
 # sys.tracebacklimit = 0
@@ -25,10 +40,72 @@ config = BoltzConfig()
 
 
 @click.group()
-def command_group():
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="use only the cached pairs, commands requiring the api will fail",
+)
+@click.option(
+    "--cache-max-age",
+    type=int,
+    default=config.pairs_cache_max_age,
+    show_default=True,
+    help="seconds until the cached pairs are fetched again",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=str,
+    help="unix socket of the daemon, defaults to daemon.sock in the app dir",
+)
+@click.option(
+    "--no-daemon",
+    is_flag=True,
+    help="run commands in this process even if a daemon is running",
+)
+@click.pass_context
+def command_group(
+    ctx: click.Context,
+    offline: bool,
+    cache_max_age: int,
+    socket_path: Optional[str],
+    no_daemon: bool,
+):
     """
     Python CLI of boltz-client-python, enjoy submarine swapping. :)
     """
+    app_dir = click.get_app_dir("boltz")
+    if not config.pairs_cache_path:
+        config.pairs_cache_path = os.path.join(app_dir, "pairs.json")
+    config.pairs_cache_max_age = cache_max_age
+    ctx.obj = {
+        "offline": offline,
+        "socket_path": socket_path or os.path.join(app_dir, "daemon.sock"),
+        "no_daemon": no_daemon,
+    }
+
+
+def get_client(pair: str = "BTC/BTC", refresh: bool = True) -> BoltzClient:
+    """
+    client for the current command, commands talking to the api anyway
+    refresh the pairs cache, fee and limit calculations run from the cache
+    """
+    ctx = click.get_current_context()
+    return BoltzClient(config, pair, offline=ctx.obj["offline"], refresh=refresh)
+
+
+def get_swap_client(
+    pair: str = "BTC/BTC", refresh: bool = True
+) -> Union[BoltzClient, DaemonClient]:
+    """the running daemon if there is one, else a client of this process"""
+    ctx = click.get_current_context()
+    if (
+        not ctx.obj["offline"]
+        and not ctx.obj["no_daemon"]
+        and is_running(ctx.obj["socket_path"])
+    ):
+        return DaemonClient(ctx.obj["socket_path"], pair)
+    return get_client(pair, refresh)
 
 
 @click.command()
@@ -42,11 +119,12 @@ def create_swap(payment_request: str, pair: str = "BTC/BTC"):
     SATS you want to swap, has to be the same as in PAYMENT_REQUEST
     PAYMENT_REQUEST with the same amount as specified in SATS
     """
-    client = BoltzClient(config, pair)
+    client = get_swap_client(pair)
     refund_privkey_wif, swap = client.create_swap(payment_request)
 
     click.echo()
     click.echo(f"boltz_id: {swap.id}")
+    click.echo(f"payment hash: {client.decode_invoice(payment_request).payment_hash}")
     click.echo()
     click.echo(f"refund privkey in wif: {refund_privkey_wif}")
     click.echo(f"redeem_script_hex: {swap.redeemScript}")
@@ -89,7 +167,7 @@ def refund_swap(
     """
     refund a swap
     """
-    client = BoltzClient(config, pair)
+    client = get_swap_client(pair)
     txid = asyncio.run(
         client.refund_swap(
             boltz_id=boltz_id,
@@ -113,7 +191,7 @@ def create_reverse_swap(sats: int, pair: str = "BTC/BTC", direction: str = "send
     """
     create a reverse swap
     """
-    client = BoltzClient(config, pair)
+    client = get_swap_client(pair)
     if direction == SwapDirection.receive:
         sats = client.add_reverse_swap_fees(sats)
     elif direction == SwapDirection.send:
@@ -165,7 +243,7 @@ def create_reverse_swap_and_claim(
     """
     create a reverse swap and claim
     """
-    client = BoltzClient(config, pair)
+    client = get_swap_client(pair)
     if direction == SwapDirection.receive:
         sats = client.add_reverse_swap_fees(sats)
     elif direction == SwapDirection.send:
@@ -238,7 +316,7 @@ def claim_reverse_swap(
     """
     claims a reverse swap
     """
-    client = BoltzClient(config, pair)
+    client = get_swap_client(pair)
 
     txid = asyncio.run(
         client.claim_reverse_swap(
@@ -266,11 +344,38 @@ def swap_status(swap_id):
 
     ID is the id of your boltz swap
     """
-    client = BoltzClient(config)
+    client = get_swap_client()
     data = client.swap_status(swap_id)
     click.echo(data)
 
 
+@click.command()
+@click.argument("swap_ids", type=str, nargs=-1)
+@click.option(
+    "--interval",
+    type=float,
+    default=3,
+    show_default=True,
+    help="seconds before reconnecting to the status stream",
+)
+def watch(swap_ids: tuple[str, ...], interval: float):
+    """
+    watch swaps and stream their status transitions as json lines
+    until every swap reached a final status
+
+    SWAP_IDS of your boltz swaps, read line by line from stdin if omitted
+    """
+    if not swap_ids:
+        swap_ids = tuple(line.strip() for line in sys.stdin if line.strip())
+    client = get_client(refresh=False)
+
+    async def stream():
+        async for event in watch_swaps(client, swap_ids, interval):
+            click.echo(json.dumps(event.to_json()))
+
+    asyncio.run(stream())
+
+
 @click.command()
 @click.argument("amount", type=int)
 def calculate_swap_send_amount(amount):
@@ -278,23 +383,306 @@ def calculate_swap_send_amount(amount):
     calculate the amount of the invoice you have to send to boltz
     to send the specified amount onchain
     """
-    client = BoltzClient(config)
+    client = get_swap_client(refresh=False)
     click.echo(client.substract_swap_fees(amount))
 
 
+@click.command()
+@click.argument("address", type=str)
+@click.option("--kind", type=click.Choice(["reverse", "submarine"]), default="reverse")
+@click.option("--pair", type=str, default="BTC/BTC", show_default=True)
+@click.option("--amount", type=int, default=50000, show_default=True)
+@click.option("--concurrency", type=int, default=10, show_default=True)
+@click.option("--duration", type=float, default=30, show_default=True)
+@click.option("--drain-timeout", type=float, default=60, show_default=True)
+@click.option("--api-url", type=str, help="e.g. a local mock or the regtest api")
+@click.option("--network", type=str, help="network of the pair, e.g. regtest")
+@click.option(
+    "--pay-command",
+    type=str,
+    help="pays the invoice of a reverse swap, {invoice} is replaced",
+)
+@click.option(
+    "--invoice-command",
+    type=str,
+    help="prints an invoice for a submarine swap, {amount} is replaced",
+)
+@click.option(
+    "--fund-command",
+    type=str,
+    help="funds the lockup of a submarine swap, {address} and {amount} are replaced",
+)
+@click.option("--json", "as_json", is_flag=True, help="print the report as json")
+def bench(
+    address: str,
+    kind: str,
+    pair: str,
+    amount: int,
+    concurrency: int,
+    duration: float,
+    drain_timeout: float,
+    api_url: Optional[str],
+    network: Optional[str],
+    pay_command: Optional[str],
+    invoice_command: Optional[str],
+    fund_command: Optional[str],
+    as_json: bool,
+):
+    """
+    run synthetic swap lifecycles for a while and report the throughput
+    and p50/p95/p99 latencies of every phase
+
+    ADDRESS receives the claims of reverse swaps and refunds of submarine swaps
+    """
+    if api_url:
+        config.api_url = api_url
+        config.api_urls = []
+    if network:
+        if pair == "L-BTC/BTC":
+            config.network_liquid = network
+        else:
+            config.network = network
+    client = get_client(pair)
+    report = asyncio.run(
+        run_bench(
+            client,
+            job_factory(kind, amount, address, pair, invoice_command),
+            kind=kind,
+            concurrency=concurrency,
+            duration=duration,
+            drain_timeout=drain_timeout,
+            on_transition=command_hooks(pay_command, fund_command),
+            poll_interval=0.5,
+        )
+    )
+    if as_json:
+        click.echo(json.dumps(report.to_json()))
+    else:
+        click.echo(report.table())
+
+
+@click.command()
+@click.option("--monitor-interval", type=float, default=3, show_default=True)
+@click.option(
+    "--store",
+    "store_path",
+    type=str,
+    help="sqlite swap store shared with `boltz worker`, swaps are kept in memory without",
+)
+@click.pass_context
+def daemon(ctx: click.Context, monitor_interval: float, store_path: Optional[str]):
+    """
+    keep one client with warm connections, pairs and swap monitor running
+    and serve json-rpc on the daemon socket, other commands use it while it runs
+    """
+    client = get_client()
+    socket_path = ctx.obj["socket_path"]
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    boltz_daemon = BoltzDaemon(
+        client,
+        socket_path,
+        store=SqliteSwapStore(store_path) if store_path else None,
+        monitor_interval=monitor_interval,
+        pairs_refresh_interval=config.pairs_cache_max_age,
+    )
+    click.echo(f"serving on {socket_path}")
+    try:
+        asyncio.run(boltz_daemon.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+
+@click.command()
+@click.argument("store_path", type=str)
+@click.option("--worker-id", type=str, help="defaults to hostname-pid")
+@click.option("--interval", type=float, default=3, show_default=True)
+@click.option("--lease-ttl", type=float, default=30, show_default=True)
+def worker(
+    store_path: str, worker_id: Optional[str], interval: float, lease_ttl: float
+):
+    """
+    monitor, claim and refund one shard of the swaps in a sqlite swap store,
+    start as many workers on the same STORE_PATH as you need
+    """
+    client = get_client()
+    swap_worker = SwapWorker(
+        client,
+        SqliteSwapStore(store_path),
+        worker_id=worker_id,
+        interval=interval,
+        lease_ttl=lease_ttl,
+        on_error=lambda record, exc: click.echo(
+            f"{record.boltz_id}: {type(exc).__name__} {exc}", err=True
+        ),
+    )
+    click.echo(f"worker {swap_worker.worker_id} on {store_path}")
+    try:
+        asyncio.run(swap_worker.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        swap_worker.close()
+        client.close()
+
+
+passphrase_option = click.option(
+    "--passphrase",
+    type=str,
+    envvar="BOLTZ_PASSPHRASE",
+    help="encrypts and decrypts the secrets, also read from BOLTZ_PASSPHRASE",
+)
+
+settle_timeout_option = click.option(
+    "--timeout",
+    type=float,
+    default=600,
+    show_default=True,
+    help="seconds until a swap is reported as failed, e.g. the refund of an unfunded swap",
+)
+
+
+@click.command()
+@click.argument("store_path", type=str)
+@click.argument("output", type=click.File("w"), default="-")
+@passphrase_option
+@click.option("--redact", is_flag=True, help="leave the secrets out")
+@click.option("--pending", is_flag=True, help="only swaps that are not final")
+def export_swaps(
+    store_path: str, output, passphrase: Optional[str], redact: bool, pending: bool
+):
+    """
+    write the swaps of a sqlite swap store to OUTPUT as json lines,
+    secrets are encrypted with the passphrase or redacted
+    """
+    store = SqliteSwapStore(store_path)
+    count = export_records(store.iter_records(pending), output, passphrase, redact)
+    click.echo(f"exported {count} swaps", err=True)
+
+
+@click.command()
+@click.argument("input_file", type=click.File("r"))
+@click.argument("store_path", type=str)
+@passphrase_option
+def import_swaps(input_file, store_path: str, passphrase: Optional[str]):
+    """
+    add the swaps of a json lines file to a sqlite swap store,
+    the secrets are stored decrypted
+    """
+    count = import_records(input_file, SqliteSwapStore(store_path), passphrase)
+    click.echo(f"imported {count} swaps", err=True)
+
+
+def settle_file(
+    input_file: IO[str],
+    kind: str,
+    settle: Callable[[SwapRecord], Awaitable[str]],
+    passphrase: Optional[str],
+    max_concurrency: int,
+    timeout: float,
+):
+    """
+    settle the swaps of `kind` in a json lines file, print one result per line.
+    every settlement runs in an executor thread and fails after `timeout` seconds
+    """
+    records = (
+        record
+        for record in iter_records(input_file, passphrase)
+        if record.kind == kind and not record.txid
+    )
+
+    def settle_bounded(record: SwapRecord) -> Awaitable[str]:
+        return settle_in_executor(partial(settle, record), timeout)
+
+    async def run():
+        failed = 0
+        async for record, txid, error in settle_many(
+            records, settle_bounded, max_concurrency
+        ):
+            result: dict = {"id": record.boltz_id}
+            if error:
+                failed += 1
+                result["error"] = f"{type(error).__name__}: {error}"
+            else:
+                result["txid"] = txid
+            click.echo(json.dumps(result))
+        return failed
+
+    if asyncio.run(run()):
+        sys.exit(1)
+
+
+@click.command()
+@click.argument("input_file", type=click.File("r"))
+@click.option("--receive-address", type=str, help="instead of the one of the records")
+@click.option("--max-concurrency", type=int, default=8, show_default=True)
+@settle_timeout_option
+@passphrase_option
+def claim_many(
+    input_file,
+    receive_address: Optional[str],
+    max_concurrency: int,
+    timeout: float,
+    passphrase: Optional[str],
+):
+    """
+    claim the reverse swaps of a json lines file concurrently,
+    print the txid or error of every swap as a json line
+    """
+    client = get_client()
+
+    def settle(record: SwapRecord) -> Awaitable[str]:
+        return claim_record(client, record, receive_address)
+
+    settle_file(input_file, "reverse", settle, passphrase, max_concurrency, timeout)
+
+
+@click.command()
+@click.argument("input_file", type=click.File("r"))
+@click.option("--refund-address", type=str, help="instead of the one of the records")
+@click.option("--max-concurrency", type=int, default=8, show_default=True)
+@settle_timeout_option
+@passphrase_option
+def refund_many(
+    input_file,
+    refund_address: Optional[str],
+    max_concurrency: int,
+    timeout: float,
+    passphrase: Optional[str],
+):
+    """
+    refund the submarine swaps of a json lines file concurrently,
+    print the txid or error of every swap as a json line
+    """
+    client = get_client()
+
+    def settle(record: SwapRecord) -> Awaitable[str]:
+        return refund_record(client, record, refund_address)
+
+    settle_file(input_file, "submarine", settle, passphrase, max_concurrency, timeout)
+
+
 @click.command()
 def show_pairs():
     """
     show pairs of possible assets to swap
     """
-    client = BoltzClient(config)
-    data = client.get_pairs()
-    click.echo(json.dumps(data))
+    client = get_swap_client()
+    click.echo(json.dumps(client.pairs))
 
 
 def main():
     """main function"""
     command_group.add_command(swap_status)
+    command_group.add_command(watch)
+    command_group.add_command(bench)
+    command_group.add_command(daemon)
+    command_group.add_command(worker)
+    command_group.add_command(export_swaps)
+    command_group.add_command(import_swaps)
+    command_group.add_command(claim_many)
+    command_group.add_command(refund_many)
     command_group.add_command(show_pairs)
     command_group.add_command(create_swap)
     command_group.add_command(refund_swap)
@@ -302,7 +690,7 @@ def main():
     command_group.add_command(create_reverse_swap_and_claim)
     command_group.add_command(claim_reverse_swap)
     command_group.add_command(calculate_swap_send_amount)
-    command_group()
+    command_group()  # pylint: disable=no-value-for-parameter
 
 
 if __name__ == "__main__":
@@ -0,0 +1,415 @@
+""" boltz_client daemon, one warm client serving json-rpc on a unix socket """
+
+import asyncio
+import json
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .boltz import (
+    BoltzClient,
+    BoltzReverseSwapResponse,
+    BoltzSwapResponse,
+    BoltzSwapStatusResponse,
+)
+from .records import settle_in_executor
+from .store import MemorySwapStore, SwapRecord, SwapStore
+from .watch import poll_status
+
+# json-rpc 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+SERVER_ERROR = -32000
+
+# requests and responses are single lines, claims can wait for a long time
+MAX_LINE = 2**20
+
+
+class BoltzDaemonException(Exception):
+    def __init__(self, message: str, error_type: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.error_type = error_type
+
+
+class BoltzDaemon:
+    """
+    serves the methods of one long lived `BoltzClient` as newline delimited
+    json-rpc 2.0 on a unix socket. swaps created through the daemon are kept
+    in `store` and their status is followed by the swap monitor, pairs are
+    refreshed every `pairs_refresh_interval` seconds. claims and refunds wait for
+    their lockup, they run on `max_settlements` threads of their own and give up
+    after `settle_timeout` seconds
+    """
+
+    def __init__(
+        self,
+        client: BoltzClient,
+        socket_path: str,
+        store: Optional[SwapStore] = None,
+        monitor_interval: float = 3,
+        pairs_refresh_interval: Optional[float] = 300,
+        max_workers: int = 16,
+        max_settlements: int = 16,
+        settle_timeout: Optional[float] = 600,
+    ):
+        self.client = client
+        self.socket_path = socket_path
+        self.store = store or MemorySwapStore()
+        self.monitor_interval = monitor_interval
+        self.pairs_refresh_interval = pairs_refresh_interval
+        self.settle_timeout = settle_timeout
+        self.methods: dict[str, Callable] = {
+            "ping": self.ping,
+            "get_pairs": self.get_pairs,
+            "swap_status": self.swap_status,
+            "add_reverse_swap_fees": self.client.add_reverse_swap_fees,
+            "substract_swap_fees": self.client.substract_swap_fees,
+            "create_swap": self.create_swap,
+            "create_reverse_swap": self.create_reverse_swap,
+            "claim_reverse_swap": self.claim_reverse_swap,
+            "refund_swap": self.refund_swap,
+            "get_swap": self.get_swap,
+            "list_swaps": self.list_swaps,
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # pending claims must not take the threads of the other methods
+        self._settle_executor = ThreadPoolExecutor(max_workers=max_settlements)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if is_running(self.socket_path):
+            raise BoltzDaemonException(f"daemon already running on {self.socket_path}")
+        if os.path.exists(self.socket_path):
+            # left behind by a daemon that did not shut down
+            os.unlink(self.socket_path)
+        # only our user may connect, the socket is created with mode 0600
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=self.socket_path, limit=MAX_LINE
+            )
+        finally:
+            os.umask(umask)
+        self._tasks = [asyncio.create_task(self._monitor())]
+        if self.pairs_refresh_interval:
+            self._tasks.append(asyncio.create_task(self._refresh_pairs()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._executor.shutdown(wait=False)
+        self._settle_executor.shutdown(wait=False)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        assert self._server
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handle(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, line: bytes) -> dict:
+        """answer one json-rpc request, exceptions of the method become errors"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return rpc_error(None, PARSE_ERROR, "parse error")
+        if not isinstance(request, dict) or "method" not in request:
+            return rpc_error(None, INVALID_REQUEST, "invalid request")
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if not method:
+            return rpc_error(
+                request_id, METHOD_NOT_FOUND, f"unknown method {request['method']}"
+            )
+        params = request.get("params") or {}
+        try:
+            if asyncio.iscoroutinefunction(method):
+                result = await method(**params)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._executor, partial(method, **params)
+                )
+        except Exception as exc:
+            return rpc_error(request_id, SERVER_ERROR, str(exc), type(exc).__name__)
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def _monitor(self) -> None:
+        """follow the status of the stored swaps until they are final"""
+        loop = asyncio.get_running_loop()
+        while True:
+            records = self.store.records(pending=True)
+            events = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        self._executor,
+                        poll_status,
+                        self.client,
+                        record.boltz_id,
+                        record.status,
+                    )
+                    for record in records
+                )
+            )
+            for event in events:
+                if event and event.status and event.status != event.previous:
+                    self.store.update(event.boltz_id, status=event.status)
+            await asyncio.sleep(self.monitor_interval)
+
+    async def _refresh_pairs(self) -> None:
+        assert self.pairs_refresh_interval
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.pairs_refresh_interval)
+            try:
+                await loop.run_in_executor(self._executor, self.client.refresh_pairs)
+            except Exception:
+                # keep the last pairs, the next refresh may succeed
+                pass
+
+    def ping(self) -> dict:
+        return {
+            "pairs": list(self.client.pair_infos),
+            "swaps": len(self.store.records()),
+        }
+
+    def get_pairs(self) -> dict:
+        return self.client.pairs
+
+    def swap_status(self, boltz_id: str) -> dict:
+        return asdict(self.client.swap_status(boltz_id))
+
+    def create_swap(
+        self,
+        payment_request: str,
+        pair: Optional[str] = None,
+        refund_address: Optional[str] = None,
+    ) -> dict:
+        """`refund_address` lets swap workers refund the swap if it fails"""
+        info = self.client.pair_info(pair)
+        if refund_address:
+            self.client.validate_address(refund_address, info.pair)
+        privkey_wif, swap = self.client.create_swap(payment_request, info.pair)
+        self.store.add(
+            SwapRecord(
+                swap.id,
+                "submarine",
+                info.pair,
+                data={
+                    "privkey_wif": privkey_wif,
+                    "payment_request": payment_request,
+                    "lockup_address": swap.address,
+                    "redeem_script_hex": swap.redeemScript,
+                    "timeout_block_height": swap.timeoutBlockHeight,
+                    "blinding_key": swap.blindingKey,
+                    "refund_address": refund_address,
+                },
+            )
+        )
+        return {"privkey_wif": privkey_wif, "swap": asdict(swap)}
+
+    def create_reverse_swap(
+        self,
+        amount: int,
+        pair: Optional[str] = None,
+        receive_address: Optional[str] = None,
+        zeroconf: bool = True,
+    ) -> dict:
+        """`receive_address` lets swap workers claim the swap after the lockup"""
+        info = self.client.pair_info(pair)
+        if receive_address:
+            self.client.validate_address(receive_address, info.pair)
+        privkey_wif, preimage_hex, swap = self.client.create_reverse_swap(
+            amount, info.pair
+        )
+        self.store.add(
+            SwapRecord(
+                swap.id,
+                "reverse",
+                info.pair,
+                data={
+                    "privkey_wif": privkey_wif,
+                    "preimage_hex": preimage_hex,
+                    "lockup_address": swap.lockupAddress,
+                    "redeem_script_hex": swap.redeemScript,
+                    "timeout_block_height": swap.timeoutBlockHeight,
+                    "blinding_key": swap.blindingKey,
+                    "receive_address": receive_address,
+                    "zeroconf": zeroconf,
+                },
+            )
+        )
+        return {
+            "privkey_wif": privkey_wif,
+            "preimage_hex": preimage_hex,
+            "swap": asdict(swap),
+        }
+
+    # claims and refunds build and broadcast their transaction without yielding,
+    # they run on their own event loops in the settle executor
+
+    async def claim_reverse_swap(self, **kwargs) -> str:
+        txid = await settle_in_executor(
+            partial(self.client.claim_reverse_swap, **kwargs),
+            self.settle_timeout,
+            self._settle_executor,
+        )
+        self._set_txid(kwargs["boltz_id"], txid)
+        return txid
+
+    async def refund_swap(self, **kwargs) -> str:
+        txid = await settle_in_executor(
+            partial(self.client.refund_swap, **kwargs),
+            self.settle_timeout,
+            self._settle_executor,
+        )
+        self._set_txid(kwargs["boltz_id"], txid)
+        return txid
+
+    def _set_txid(self, boltz_id: str, txid: str) -> None:
+        if self.store.get(boltz_id):
+            self.store.update(boltz_id, txid=txid)
+
+    def get_swap(self, boltz_id: str) -> Optional[dict]:
+        record = self.store.get(boltz_id)
+        return record.to_json() if record else None
+
+    def list_swaps(self, pending: bool = False) -> list[dict]:
+        return [record.to_json() for record in self.store.records(pending)]
+
+
+def rpc_error(
+    request_id: Any, code: int, message: str, error_type: Optional[str] = None
+) -> dict:
+    error: dict = {"code": code, "message": message}
+    if error_type:
+        error["data"] = {"type": error_type}
+    return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+def is_running(socket_path: str) -> bool:
+    """whether a daemon accepts connections on `socket_path`"""
+    if not os.path.exists(socket_path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+class DaemonClient:
+    """
+    talks to a running daemon, offers the `BoltzClient` methods the cli uses,
+    so commands work the same with and without a daemon
+    """
+
+    def __init__(self, socket_path: str, pair: str = "BTC/BTC"):
+        self.socket_path = socket_path
+        self.pair = pair
+        self._next_id = 0
+
+    def call(self, method: str, **params) -> Any:
+        self._next_id += 1
+        request = {
+            "jsonrpc": "2.0",
+            "id": self._next_id,
+            "method": method,
+            "params": params,
+        }
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps(request).encode() + b"\n")
+                stream.flush()
+                line = stream.readline()
+        if not line:
+            raise BoltzDaemonException("daemon closed the connection")
+        response = json.loads(line)
+        error = response.get("error")
+        if error:
+            raise BoltzDaemonException(
+                error["message"], (error.get("data") or {}).get("type")
+            )
+        return response["result"]
+
+    @property
+    def pairs(self) -> dict:
+        return self.call("get_pairs")
+
+    decode_invoice = staticmethod(BoltzClient.decode_invoice)
+
+    def swap_status(self, boltz_id: str) -> BoltzSwapStatusResponse:
+        return BoltzSwapStatusResponse.from_dict(
+            self.call("swap_status", boltz_id=boltz_id)
+        )
+
+    def add_reverse_swap_fees(self, amount: int, pair: Optional[str] = None) -> int:
+        return self.call("add_reverse_swap_fees", amount=amount, pair=pair or self.pair)
+
+    def substract_swap_fees(self, amount: int, pair: Optional[str] = None) -> int:
+        return self.call("substract_swap_fees", amount=amount, pair=pair or self.pair)
+
+    def create_swap(
+        self, payment_request: str, pair: Optional[str] = None
+    ) -> tuple[str, BoltzSwapResponse]:
+        result = self.call(
+            "create_swap", payment_request=payment_request, pair=pair or self.pair
+        )
+        return result["privkey_wif"], BoltzSwapResponse.from_dict(result["swap"])
+
+    def create_reverse_swap(
+        self, amount: int = 0, pair: Optional[str] = None
+    ) -> tuple[str, str, BoltzReverseSwapResponse]:
+        result = self.call("create_reverse_swap", amount=amount, pair=pair or self.pair)
+        return (
+            result["privkey_wif"],
+            result["preimage_hex"],
+            BoltzReverseSwapResponse.from_dict(result["swap"]),
+        )
+
+    async def claim_reverse_swap(self, **kwargs) -> str:
+        kwargs.setdefault("pair", self.pair)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.call("claim_reverse_swap", **kwargs)
+        )
+
+    async def refund_swap(self, **kwargs) -> str:
+        kwargs.setdefault("pair", self.pair)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.call("refund_swap", **kwargs)
+        )
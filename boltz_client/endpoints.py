@@ -0,0 +1,145 @@
+""" boltz_client api endpoint routing """
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+
+def is_endpoint_failure(exc: BaseException) -> bool:
+    """connection errors and 5xx responses count against the endpoint"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.RequestError)
+
+
+@dataclass
+class Endpoint:
+    url: str
+    # ewma of the latency of successful requests in seconds
+    latency: Optional[float] = None
+    # consecutive failures, the circuit opens at the router's threshold
+    failures: int = 0
+    # monotonic time until which the circuit is open
+    open_until: float = 0
+
+
+class EndpointRouter:
+    """
+    routes requests to the fastest healthy endpoint and fails over to the next
+    one, read-only requests can be hedged to a second endpoint after `hedge_after`
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        hedge_after: Optional[float] = None,
+        alpha: float = 0.3,
+        failure_threshold: int = 3,
+        cooldown: float = 30,
+        hedge_workers: Optional[int] = None,
+    ):
+        if not urls:
+            raise ValueError("at least one api endpoint is required")
+        self.endpoints = [Endpoint(url.rstrip("/")) for url in urls]
+        self.hedge_after = hedge_after
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        # shared by all hedged requests, requests abandoned for a faster
+        # endpoint finish on it without piling up threads
+        self._executor = ThreadPoolExecutor(
+            max_workers=hedge_workers or 4 * len(self.endpoints),
+            thread_name_prefix="boltz-hedge",
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def ranked(self) -> list[Endpoint]:
+        """
+        healthy endpoints by recent failures, then latency with unmeasured ones
+        first, endpoints with an open circuit are kept as last resort
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.open_until <= now]
+            broken = [e for e in self.endpoints if e.open_until > now]
+            healthy.sort(key=lambda e: (e.failures, e.latency or 0))
+            broken.sort(key=lambda e: e.open_until)
+        return healthy + broken
+
+    def record_success(self, endpoint: Endpoint, latency: float) -> None:
+        with self._lock:
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.alpha * (latency - endpoint.latency)
+            endpoint.failures = 0
+            endpoint.open_until = 0
+
+    def record_failure(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold:
+                endpoint.open_until = time.monotonic() + self.cooldown
+
+    def call(self, func: Callable[[str], T], hedge: bool = False) -> T:
+        """call `func` with the url of the best endpoint, fail over on endpoint failures"""
+        endpoints = self.ranked()
+        if hedge and self.hedge_after is not None and len(endpoints) > 1:
+            return self._call_hedged(func, endpoints)
+        last_exc: Optional[BaseException] = None
+        for endpoint in endpoints:
+            try:
+                return self._call(endpoint, func)
+            except Exception as exc:
+                if not is_endpoint_failure(exc):
+                    raise
+                last_exc = exc
+        assert last_exc
+        raise last_exc
+
+    def _call(self, endpoint: Endpoint, func: Callable[[str], T]) -> T:
+        start = time.perf_counter()
+        try:
+            result = func(endpoint.url)
+        except Exception as exc:
+            if is_endpoint_failure(exc):
+                self.record_failure(endpoint)
+            else:
+                # the endpoint answered, it is healthy
+                self.record_success(endpoint, time.perf_counter() - start)
+            raise
+        self.record_success(endpoint, time.perf_counter() - start)
+        return result
+
+    def _call_hedged(self, func: Callable[[str], T], endpoints: list[Endpoint]) -> T:
+        remaining = iter(endpoints)
+        last_exc: Optional[BaseException] = None
+        pending: set[Future] = {
+            self._executor.submit(self._call, next(remaining), func)
+        }
+        while pending:
+            done, pending = wait(
+                pending, timeout=self.hedge_after, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                exc = future.exception()
+                if exc is None:
+                    return future.result()
+                if not is_endpoint_failure(exc):
+                    raise exc
+                last_exc = exc
+            # too slow or failed, ask the next endpoint as well
+            endpoint = next(remaining, None)
+            if endpoint is not None:
+                pending.add(self._executor.submit(self._call, endpoint, func))
+        assert last_exc
+        raise last_exc
@@ -0,0 +1,191 @@
+""" boltz_client status event callbacks, dispatched from one watcher """
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .boltz import BoltzClient
+from .watch import SwapStatusEvent, poll_status
+
+# handlers registered for it get the events of every status
+ALL_STATUSES = "*"
+
+Handler = Callable[[SwapStatusEvent], Any]
+
+
+class HandlerQueue:
+    """
+    the events of one handler, run one after another. when the handler
+    falls `queue_size` events behind the oldest ones are dropped
+    """
+
+    def __init__(
+        self,
+        handler: Handler,
+        queue_size: int,
+        on_error: Optional[Callable[[Handler, SwapStatusEvent, Exception], Any]],
+    ):
+        self.handler = handler
+        self.queue_size = queue_size
+        # created on the event loop of the watcher, handlers are registered before
+        self.queue: Optional[asyncio.Queue] = None
+        self.on_error = on_error
+        self.dropped = 0
+        self.errors = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def put(self, event: SwapStatusEvent) -> None:
+        if not self.queue:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+        if not self.task:
+            self.task = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        assert self.queue
+        while True:
+            event = await self.queue.get()
+            try:
+                result = self.handler(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as exc:
+                self.errors += 1
+                if self.on_error:
+                    try:
+                        self.on_error(self.handler, event, exc)
+                    except Exception:
+                        pass
+            finally:
+                self.queue.task_done()
+
+    def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+class SwapEvents:
+    """
+    calls the handlers registered with `on` when a watched swap changes its
+    status. one watcher polls all watched swaps every `interval` seconds and
+    hands the transitions to a bounded queue per handler, so a slow or failing
+    handler neither delays the polling nor the other handlers. a swap is no
+    longer watched after reaching a final status
+    """
+
+    def __init__(
+        self,
+        client: BoltzClient,
+        interval: float = 3,
+        max_concurrency: int = 16,
+        queue_size: int = 1000,
+        on_error: Optional[Callable[[Handler, SwapStatusEvent, Exception], Any]] = None,
+    ):
+        self.client = client
+        self.interval = interval
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.handlers: dict[str, list[HandlerQueue]] = {}
+        self.watched: dict[str, Optional[str]] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def on(self, status: str, handler: Handler) -> Handler:
+        """call `handler` with the events of `status`, `*` for all statuses"""
+        queue = HandlerQueue(handler, self.queue_size, self.on_error)
+        self.handlers.setdefault(status, []).append(queue)
+        return handler
+
+    def off(self, status: str, handler: Handler) -> None:
+        queues = self.handlers.get(status, [])
+        for queue in [queue for queue in queues if queue.handler == handler]:
+            queue.stop()
+            queues.remove(queue)
+
+    def watch(self, boltz_id: str, status: Optional[str] = None) -> None:
+        """
+        follow a swap, `status` is its last known one. starts the watcher
+        when called on a running event loop
+        """
+        self.watched.setdefault(boltz_id, status)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start()
+        assert self._wakeup
+        self._wakeup.set()
+
+    def unwatch(self, boltz_id: str) -> None:
+        self.watched.pop(boltz_id, None)
+
+    def start(self) -> None:
+        if not self._watcher or self._watcher.done():
+            self._wakeup = asyncio.Event()
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """stop the watcher and the handlers, queued events are dropped"""
+        tasks = [self._watcher] if self._watcher else []
+        for queues in self.handlers.values():
+            for queue in queues:
+                if queue.task:
+                    tasks.append(queue.task)
+                queue.stop()
+        if self._watcher:
+            self._watcher.cancel()
+            self._watcher = None
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def join(self) -> None:
+        """wait until the handlers processed all queued events"""
+        for queues in list(self.handlers.values()):
+            for queue in queues:
+                if queue.queue:
+                    await queue.queue.join()
+
+    def dispatch(self, event: SwapStatusEvent) -> None:
+        if event.status:
+            for queue in self.handlers.get(event.status, []):
+                queue.put(event)
+        for queue in self.handlers.get(ALL_STATUSES, []):
+            queue.put(event)
+
+    async def _watch(self) -> None:
+        assert self._wakeup
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+            while True:
+                self._wakeup.clear()
+                watched = list(self.watched.items())
+                events = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            executor, poll_status, self.client, boltz_id, previous
+                        )
+                        for boltz_id, previous in watched
+                    )
+                )
+                for event in events:
+                    if event is None or event.boltz_id not in self.watched:
+                        continue
+                    if event.status == event.previous and not event.final:
+                        continue
+                    if event.final:
+                        del self.watched[event.boltz_id]
+                    else:
+                        self.watched[event.boltz_id] = event.status
+                    self.dispatch(event)
+                if not self.watched:
+                    await self._wakeup.wait()
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
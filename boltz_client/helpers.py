@@ -1,11 +1,26 @@
 """ boltz_client helpers """
 
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import MISSING, fields
+from typing import Any, Callable, Hashable, Optional, TypeVar
+
 import httpx
 
+T = TypeVar("T")
+
+
+# lives here so the broadcast module can subclass it, `boltz` re-exports it
+class BoltzApiException(Exception):
+    pass
 
-def req_wrap(funcname, *args, **kwargs) -> dict:
-    """request wrapper for httpx"""
-    func = getattr(httpx, funcname)
+
+def req_wrap(funcname, *args, client: Optional[httpx.Client] = None, **kwargs) -> dict:
+    """request wrapper for httpx, on the pool of `client` if given"""
+    func = getattr(client or httpx, funcname)
     res = func(*args, timeout=30, **kwargs)
     res.raise_for_status()
     return (
@@ -13,3 +28,138 @@ def req_wrap(funcname, *args, **kwargs) -> dict:
         if kwargs["headers"]["Content-Type"] == "application/json"
         else {"text": res.text}
     )
+
+
+class SingleFlight:
+    """
+    concurrent calls with the same key share one execution and its result,
+    with `ttl` the result is also kept for that many seconds. `do` shares
+    calls between threads, `do_async` between coroutines
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._results: dict[Hashable, tuple[float, Any]] = {}
+        self._async_calls: dict[tuple[asyncio.AbstractEventLoop, Hashable], Any] = {}
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            if self.ttl:
+                cached = self._results.get(key)
+                if cached and cached[0] > time.monotonic():
+                    return cached[1]
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as exc:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            del self._calls[key]
+            if self.ttl:
+                self._store(key, result)
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        `do` without blocking the event loop: concurrent calls of coroutines
+        await one execution of `func` in the default executor of the loop,
+        which also joins the calls of other threads. a cancelled caller does
+        not cancel the execution for the others
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        future = self._async_calls.get(call_key)
+        if future is None:
+            future = loop.run_in_executor(None, self.do, key, func)
+            self._async_calls[call_key] = future
+            future.add_done_callback(lambda _: self._async_calls.pop(call_key, None))
+        return await asyncio.shield(future)
+
+    def _store(self, key: Hashable, result: Any) -> None:
+        now = time.monotonic()
+        if len(self._results) >= 1024:
+            self._results = {
+                k: cached for k, cached in self._results.items() if cached[0] > now
+            }
+        self._results[key] = (now + self.ttl, result)
+
+
+class LRUCache:
+    """thread-safe mapping which keeps the `maxsize` most recently used items"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return default
+            return self._items[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+def slotted(cls: type[T]) -> type[T]:
+    """
+    recreate a dataclass with `__slots__`, like `dataclass(slots=True)`
+    which is only available on python >= 3.10, and give it a generated
+    `from_dict` classmethod which ignores unknown keys of the api json
+    """
+    cls_fields = fields(cls)  # type: ignore
+    field_names = tuple(f.name for f in cls_fields)
+    namespace = dict(cls.__dict__)
+    for name in field_names:
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = field_names
+
+    # assign the slots directly instead of calling `__init__` with kwargs
+    scope: dict = {"new": object.__new__}
+    lines = ["def from_dict(cls, data):", "    self = new(cls)"]
+    for f in cls_fields:
+        if f.default is not MISSING:
+            scope[f"default_{f.name}"] = f.default
+            lines.append(f"    self.{f.name} = data.get({f.name!r}, default_{f.name})")
+        elif f.default_factory is not MISSING:
+            scope[f"factory_{f.name}"] = f.default_factory
+            lines.append(
+                f"    self.{f.name} = data[{f.name!r}] "
+                f"if {f.name!r} in data else factory_{f.name}()"
+            )
+        else:
+            lines.append(f"    self.{f.name} = data[{f.name!r}]")
+    lines.append("    return self")
+    exec("\n".join(lines), scope)  # pylint: disable=exec-used
+    namespace["from_dict"] = classmethod(scope["from_dict"])
+
+    return type(cls.__name__, cls.__bases__, namespace)  # type: ignore
@@ -0,0 +1,335 @@
+""" boltz_client musig2 (bip327) for the cooperative spends of taproot swaps """
+
+import ctypes
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from embit.hashes import tagged_hash
+from embit.util import ctypes_secp256k1 as secp256k1
+
+# secp256k1 field size, group order and generator
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+# affine points, None is the point at infinity. the pure python point math is
+# for public points only, secret keys and nonces go through libsecp256k1
+Point = Optional[tuple[int, int]]
+
+
+class MusigException(Exception):
+    pass
+
+
+def point_add(p1: Point, p2: Point) -> Point:
+    if p1 is None:
+        return p2
+    if p2 is None:
+        return p1
+    if p1[0] == p2[0] and p1[1] != p2[1]:
+        return None
+    if p1 == p2:
+        lam = 3 * p1[0] * p1[0] * pow(2 * p1[1], P - 2, P) % P
+    else:
+        lam = (p2[1] - p1[1]) * pow(p2[0] - p1[0], P - 2, P) % P
+    x = (lam * lam - p1[0] - p2[0]) % P
+    return x, (lam * (p1[0] - x) - p1[1]) % P
+
+
+def _to_jacobian(point: Point) -> tuple[int, int, int]:
+    return (point[0], point[1], 1) if point else (0, 1, 0)
+
+
+def _jacobian_double(p1: tuple[int, int, int]) -> tuple[int, int, int]:
+    x, y, z = p1
+    if not y or not z:
+        return 0, 1, 0
+    ysq = y * y % P
+    s = 4 * x * ysq % P
+    m = 3 * x * x % P
+    nx = (m * m - 2 * s) % P
+    return nx, (m * (s - nx) - 8 * ysq * ysq) % P, 2 * y * z % P
+
+
+def _jacobian_add(
+    p1: tuple[int, int, int], p2: tuple[int, int, int]
+) -> tuple[int, int, int]:
+    if not p1[2]:
+        return p2
+    if not p2[2]:
+        return p1
+    z1z1 = p1[2] * p1[2] % P
+    z2z2 = p2[2] * p2[2] % P
+    u1 = p1[0] * z2z2 % P
+    u2 = p2[0] * z1z1 % P
+    s1 = p1[1] * p2[2] * z2z2 % P
+    s2 = p2[1] * p1[2] * z1z1 % P
+    if u1 == u2:
+        return _jacobian_double(p1) if s1 == s2 else (0, 1, 0)
+    h = u2 - u1
+    r = s2 - s1
+    hh = h * h % P
+    hhh = h * hh % P
+    v = u1 * hh % P
+    nx = (r * r - hhh - 2 * v) % P
+    ny = (r * (v - nx) - s1 * hhh) % P
+    return nx, ny, h * p1[2] * p2[2] % P
+
+
+def point_mul(point: Point, scalar: int) -> Point:
+    """double and add in jacobian coordinates, one inversion at the end"""
+    result = (0, 1, 0)
+    addend = _to_jacobian(point)
+    scalar %= N
+    while scalar:
+        if scalar & 1:
+            result = _jacobian_add(result, addend)
+        addend = _jacobian_double(addend)
+        scalar >>= 1
+    x, y, z = result
+    if not z:
+        return None
+    z_inv = pow(z, P - 2, P)
+    return x * z_inv * z_inv % P, y * z_inv * z_inv * z_inv % P
+
+
+def point_negate(point: Point) -> Point:
+    return None if point is None else (point[0], P - point[1])
+
+
+def has_even_y(point: Point) -> bool:
+    assert point is not None
+    return point[1] % 2 == 0
+
+
+def xbytes(point: Point) -> bytes:
+    assert point is not None
+    return point[0].to_bytes(32, "big")
+
+
+def cbytes(point: Point) -> bytes:
+    assert point is not None
+    return (b"\x02" if has_even_y(point) else b"\x03") + xbytes(point)
+
+
+def cbytes_ext(point: Point) -> bytes:
+    return b"\x00" * 33 if point is None else cbytes(point)
+
+
+def lift_x(x: int) -> tuple[int, int]:
+    if x >= P:
+        raise MusigException("x not on the curve")
+    y_sq = (pow(x, 3, P) + 7) % P
+    y = pow(y_sq, (P + 1) // 4, P)
+    if pow(y, 2, P) != y_sq:
+        raise MusigException("x not on the curve")
+    return x, y if y % 2 == 0 else P - y
+
+
+def cpoint(data: bytes) -> tuple[int, int]:
+    """parse a compressed point"""
+    if len(data) != 33 or data[0] not in (2, 3):
+        raise MusigException("invalid compressed point")
+    point = lift_x(int.from_bytes(data[1:], "big"))
+    return point if data[0] == 2 else (point[0], P - point[1])
+
+
+def cpoint_ext(data: bytes) -> Point:
+    return None if data == b"\x00" * 33 else cpoint(data)
+
+
+def pubkey_gen(secret: bytes) -> bytes:
+    return secp256k1.ec_pubkey_serialize(secp256k1.ec_pubkey_create(secret))
+
+
+def _secret_mul(secret: bytes, factor: int) -> bytes:
+    """`secret` times a public `factor`, libsecp256k1 tweaks a copy in place"""
+    buffer = ctypes.create_string_buffer(secret, 32)
+    secp256k1.ec_privkey_tweak_mul(buffer, (factor % N).to_bytes(32, "big"))
+    return buffer.raw
+
+
+def schnorr_verify(msg: bytes, xonly_pubkey: bytes, sig: bytes) -> bool:
+    """bip340 verification"""
+    if len(sig) != 64:
+        return False
+    try:
+        pubkey = lift_x(int.from_bytes(xonly_pubkey, "big"))
+    except MusigException:
+        return False
+    r = int.from_bytes(sig[:32], "big")
+    s = int.from_bytes(sig[32:], "big")
+    if r >= P or s >= N:
+        return False
+    e = (
+        int.from_bytes(
+            tagged_hash("BIP0340/challenge", sig[:32] + xonly_pubkey + msg), "big"
+        )
+        % N
+    )
+    point = point_add(point_mul(G, s), point_mul(pubkey, N - e))
+    return point is not None and has_even_y(point) and point[0] == r
+
+
+@dataclass
+class KeyAggContext:
+    """aggregated key `q` with the accumulated negation `gacc` and tweak `tacc`"""
+
+    pubkeys: list[bytes]
+    q: tuple[int, int]
+    gacc: int = 1
+    tacc: int = 0
+
+    @property
+    def xonly(self) -> bytes:
+        return xbytes(self.q)
+
+    def coefficient(self, pubkey: bytes) -> int:
+        return key_agg_coeff(self.pubkeys, pubkey)
+
+    def apply_xonly_tweak(self, tweak: bytes) -> "KeyAggContext":
+        """x-only tweak, e.g. the taproot tweak of the output key"""
+        t = int.from_bytes(tweak, "big")
+        if t >= N:
+            raise MusigException("tweak out of range")
+        g = 1 if has_even_y(self.q) else N - 1
+        q = point_add(point_mul(self.q, g), point_mul(G, t))
+        if q is None:
+            raise MusigException("tweaked key is infinite")
+        return KeyAggContext(
+            self.pubkeys, q, g * self.gacc % N, (t + g * self.tacc) % N
+        )
+
+
+def _second_key(pubkeys: list[bytes]) -> Optional[bytes]:
+    for pubkey in pubkeys[1:]:
+        if pubkey != pubkeys[0]:
+            return pubkey
+    return None
+
+
+def key_agg_coeff(pubkeys: list[bytes], pubkey: bytes) -> int:
+    if pubkey == _second_key(pubkeys):
+        return 1
+    keys_hash = tagged_hash("KeyAgg list", b"".join(pubkeys))
+    return (
+        int.from_bytes(tagged_hash("KeyAgg coefficient", keys_hash + pubkey), "big") % N
+    )
+
+
+def key_agg(pubkeys: list[bytes]) -> KeyAggContext:
+    """aggregate 33 byte compressed public keys, their order matters"""
+    q: Point = None
+    for pubkey in pubkeys:
+        q = point_add(q, point_mul(cpoint(pubkey), key_agg_coeff(pubkeys, pubkey)))
+    if q is None:
+        raise MusigException("aggregated key is infinite")
+    return KeyAggContext(list(pubkeys), q)
+
+
+@dataclass
+class SecretNonce:
+    k1: bytes
+    k2: bytes
+    pubkey: bytes
+    used: bool = False
+
+
+def _random_secret() -> bytes:
+    while True:
+        secret = os.urandom(32)
+        if secp256k1.ec_seckey_verify(secret):
+            return secret
+
+
+def nonce_gen(pubkey: bytes) -> tuple[SecretNonce, bytes]:
+    """random secret nonce and its 66 byte public nonce, never reuse them"""
+    k1, k2 = _random_secret(), _random_secret()
+    return SecretNonce(k1, k2, pubkey), pubkey_gen(k1) + pubkey_gen(k2)
+
+
+def nonce_agg(pubnonces: list[bytes]) -> bytes:
+    aggnonce = b""
+    for i in (0, 1):
+        r: Point = None
+        for pubnonce in pubnonces:
+            if len(pubnonce) != 66:
+                raise MusigException("invalid public nonce")
+            r = point_add(r, cpoint(pubnonce[i * 33 : (i + 1) * 33]))  # noqa: E203
+        aggnonce += cbytes_ext(r)
+    return aggnonce
+
+
+@dataclass
+class Session:
+    ctx: KeyAggContext
+    aggnonce: bytes
+    msg: bytes
+
+    def values(self) -> tuple[int, int, tuple[int, int]]:
+        """nonce coefficient b, challenge e and final nonce r"""
+        r1 = cpoint_ext(self.aggnonce[:33])
+        r2 = cpoint_ext(self.aggnonce[33:])
+        b = (
+            int.from_bytes(
+                tagged_hash(
+                    "MuSig/noncecoef", self.aggnonce + self.ctx.xonly + self.msg
+                ),
+                "big",
+            )
+            % N
+        )
+        r = point_add(r1, point_mul(r2, b)) or G
+        e = (
+            int.from_bytes(
+                tagged_hash("BIP0340/challenge", xbytes(r) + self.ctx.xonly + self.msg),
+                "big",
+            )
+            % N
+        )
+        return b, e, r
+
+    def sign(self, secnonce: SecretNonce, secret: bytes) -> bytes:
+        """32 byte partial signature, `secnonce` can not be used again"""
+        if secnonce.used:
+            raise MusigException("secret nonce already used")
+        secnonce.used = True
+        b, e, r = self.values()
+        k1, k2 = secnonce.k1, secnonce.k2
+        if not has_even_y(r):
+            k1, k2 = secp256k1.ec_privkey_negate(k1), secp256k1.ec_privkey_negate(k2)
+        pubkey = pubkey_gen(secret)
+        if pubkey != secnonce.pubkey:
+            raise MusigException("secret nonce is for another key")
+        g = 1 if has_even_y(self.ctx.q) else N - 1
+        # k1 + b * k2 + e * a * g * gacc * d, the factors besides the secrets are public
+        factor = e * self.ctx.coefficient(pubkey) * g * self.ctx.gacc
+        s = secp256k1.ec_privkey_add(k1, _secret_mul(k2, b))
+        return secp256k1.ec_privkey_add(s, _secret_mul(secret, factor))
+
+    def partial_sig_verify(self, psig: bytes, pubnonce: bytes, pubkey: bytes) -> bool:
+        s = int.from_bytes(psig, "big")
+        if len(psig) != 32 or s >= N:
+            return False
+        b, e, r = self.values()
+        re = point_add(cpoint(pubnonce[:33]), point_mul(cpoint(pubnonce[33:]), b))
+        if not has_even_y(r):
+            re = point_negate(re)
+        g = 1 if has_even_y(self.ctx.q) else N - 1
+        a = self.ctx.coefficient(pubkey)
+        expected = point_add(
+            re, point_mul(cpoint(pubkey), e * a * g * self.ctx.gacc % N)
+        )
+        return point_mul(G, s) == expected
+
+    def partial_sig_agg(self, psigs: list[bytes]) -> bytes:
+        """the 64 byte schnorr signature of the aggregated, tweaked key"""
+        _, e, r = self.values()
+        s = sum(int.from_bytes(psig, "big") for psig in psigs)
+        g = 1 if has_even_y(self.ctx.q) else N - 1
+        s = (s + e * g * self.ctx.tacc) % N
+        return xbytes(r) + s.to_bytes(32, "big")
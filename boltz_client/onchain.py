@@ -1,16 +1,20 @@
 """ boltz_client onchain module """
+import hashlib
 import os
+from dataclasses import dataclass
 from hashlib import sha256
+from math import ceil
 from typing import Optional
 
 from embit import ec, script
 from embit.base import EmbitError
-from embit.liquid.addresses import to_unconfidential
+from embit.liquid.addresses import addr_decode, to_unconfidential
 from embit.liquid.networks import NETWORKS as LNETWORKS
 from embit.networks import NETWORKS
 from embit.transaction import SIGHASH, Transaction, TransactionInput, TransactionOutput
 
-from .onchain_wally import create_liquid_tx
+from .onchain_wally import LiquidTxStats, create_liquid_tx
+from .signing import get_backend
 
 
 def validate_address(address: str, network: str, pair: str) -> str:
@@ -33,6 +37,80 @@ def validate_address(address: str, network: str, pair: str) -> str:
         raise ValueError(f"Invalid address: {exc}") from exc
 
 
+def get_script_pubkey(address: str, pair: str) -> bytes:
+    """script pubkey of an address, confidential addresses for L-BTC/BTC"""
+    try:
+        if pair == "L-BTC/BTC":
+            return addr_decode(address)[0].data
+        return script.address_to_scriptpubkey(address).data
+    except (EmbitError, ValueError, RuntimeError) as exc:
+        raise ValueError(f"Invalid address: {exc}") from exc
+
+
+def _read_varint(data: memoryview, pos: int) -> tuple[int, int]:
+    first = data[pos]
+    if first < 0xFD:
+        return first, pos + 1
+    start = pos + 1
+    end = start + {0xFD: 2, 0xFE: 4, 0xFF: 8}[first]
+    if end > len(data):
+        raise IndexError("varint out of range")
+    return int.from_bytes(data[start:end], "little"), end
+
+
+def find_lockup_output(
+    lockup_rawtx: str, script_pubkey: bytes
+) -> tuple[bytes, int, int]:
+    """
+    txid, vout and amount of the output paying to `script_pubkey`, scans the raw
+    transaction in place instead of decoding it and compares outputs only until
+    the match. the txid is hashed from the non-witness parts of the buffer.
+    """
+    try:
+        raw = bytes.fromhex(lockup_rawtx)
+        data = memoryview(raw)
+        pos = 4
+        segwit = data[4] == 0 and data[5] == 1
+        if segwit:
+            pos += 2
+        body_start = pos
+        num_inputs, pos = _read_varint(data, pos)
+        for _ in range(num_inputs):
+            script_len, pos = _read_varint(data, pos + 36)
+            pos += script_len + 4
+        num_outputs, pos = _read_varint(data, pos)
+        vout_index: Optional[int] = None
+        vout_amount = 0
+        for index in range(num_outputs):
+            value_end = pos + 8
+            script_len, script_start = _read_varint(data, value_end)
+            script_end = script_start + script_len
+            if vout_index is None and data[script_start:script_end] == script_pubkey:
+                vout_index = index
+                vout_amount = int.from_bytes(data[pos:value_end], "little")
+                if not segwit:
+                    # the txid is the hash of the whole buffer, no need to go on
+                    break
+            pos = script_end
+        if pos > len(data) - 4:
+            raise IndexError("transaction truncated")
+    except (ValueError, IndexError, KeyError) as exc:
+        raise ValueError("Invalid lockup transaction hex") from exc
+
+    if vout_index is None:
+        raise ValueError("No matching vout found in lockup transaction")
+
+    if segwit:
+        hasher = sha256(data[:4])
+        hasher.update(data[body_start:pos])
+        hasher.update(data[-4:])
+        first_hash = hasher.digest()
+    else:
+        first_hash = sha256(data).digest()
+    txid = sha256(first_hash).digest()[::-1]
+    return txid, vout_index, vout_amount
+
+
 def create_preimage() -> tuple[str, str]:
     preimage = os.urandom(32)
     preimage_hash = sha256(preimage).hexdigest()
@@ -61,6 +139,7 @@ def create_refund_tx(
     pair: str,
     fees: int,
     blinding_key: Optional[str] = None,
+    stats: Optional[LiquidTxStats] = None,
 ) -> str:
     # redeemscript to script_sig
     rs = bytes([34]) + bytes([0]) + bytes([32])
@@ -78,6 +157,7 @@ def create_refund_tx(
         pair=pair,
         fees=fees,
         blinding_key=blinding_key,
+        stats=stats,
     )
 
 
@@ -91,6 +171,7 @@ def create_claim_tx(
     fees: int,
     pair: str,
     blinding_key: Optional[str] = None,
+    stats: Optional[LiquidTxStats] = None,
 ) -> str:
     return create_onchain_tx(
         lockup_address=lockup_address,
@@ -102,9 +183,105 @@ def create_claim_tx(
         fees=fees,
         pair=pair,
         blinding_key=blinding_key,
+        stats=stats,
     )
 
 
+@dataclass
+class ClaimInput:
+    """a BTC reverse swap lockup ready to be claimed"""
+
+    lockup_address: str
+    lockup_rawtx: str
+    privkey_wif: str
+    preimage_hex: str
+    redeem_script_hex: str
+
+
+def _varint_size(n: int) -> int:
+    return 1 if n < 0xFD else 3 if n <= 0xFFFF else 5 if n <= 0xFFFFFFFF else 9
+
+
+def estimate_claim_vsize(
+    redeem_script_sizes: list[int], output_script_size: int
+) -> int:
+    """
+    vsize of a segwit claim transaction with one p2wsh input per redeem script
+    and one output, assumes 72 byte signatures, real ones may be a byte shorter
+    """
+    base = 4 + _varint_size(len(redeem_script_sizes)) + 1 + 4
+    base += 8 + _varint_size(output_script_size) + output_script_size
+    # outpoint, empty script sig and sequence
+    base += len(redeem_script_sizes) * (36 + 1 + 4)
+    # marker and flag, then the witness stacks: signature, preimage, redeem script
+    witness = 2
+    for size in redeem_script_sizes:
+        witness += 1 + (1 + 72) + (1 + 32) + _varint_size(size) + size
+    return ceil((base * 4 + witness) / 4)
+
+
+def check_claim_input(claim: ClaimInput) -> None:
+    """
+    raises ValueError if `claim` cannot be spent on its own: its redeem script
+    does not match the lockup address, the preimage or the key, or the lockup
+    transaction does not pay to it
+    """
+    try:
+        redeem_script = bytes.fromhex(claim.redeem_script_hex)
+        preimage = bytes.fromhex(claim.preimage_hex)
+        pubkey = ec.PrivateKey.from_wif(claim.privkey_wif).sec()
+        lockup_script_pubkey = script.address_to_scriptpubkey(claim.lockup_address).data
+    except (ValueError, EmbitError) as exc:
+        raise ValueError(f"Invalid claim: {exc}") from exc
+    if script.p2wsh(script.Script(redeem_script)).data != lockup_script_pubkey:
+        raise ValueError("Redeem script does not match the lockup address")
+    preimage_hash160 = hashlib.new("ripemd160", sha256(preimage).digest()).digest()
+    if preimage_hash160 not in redeem_script:
+        raise ValueError("Preimage does not match the redeem script")
+    if pubkey not in redeem_script:
+        raise ValueError("Private key does not match the redeem script")
+    find_lockup_output(claim.lockup_rawtx, lockup_script_pubkey)
+
+
+def create_batch_claim_tx(
+    claims: list[ClaimInput], receive_address: str, fees: int
+) -> str:
+    """one BTC transaction claiming all lockups to `receive_address`"""
+    if not claims:
+        raise ValueError("No claims to batch")
+    vin = []
+    amounts = []
+    for claim in claims:
+        lockup_script_pubkey = script.address_to_scriptpubkey(claim.lockup_address).data
+        txid, vout_index, vout_amount = find_lockup_output(
+            claim.lockup_rawtx, lockup_script_pubkey
+        )
+        vin.append(TransactionInput(txid, vout_index, sequence=0xFFFFFFFF))
+        amounts.append(vout_amount)
+
+    vout = TransactionOutput(
+        sum(amounts) - fees,
+        script.address_to_scriptpubkey(receive_address),
+    )
+    tx = Transaction(vin=vin, vout=[vout])
+
+    backend = get_backend()
+    sighasher = backend.sighasher(tx)
+    for index, claim in enumerate(claims):
+        redeem_script = bytes.fromhex(claim.redeem_script_hex)
+        h = sighasher.sighash(index, redeem_script, amounts[index])
+        secret = ec.PrivateKey.from_wif(claim.privkey_wif).secret
+        tx.vin[index].witness = script.Witness(
+            items=[
+                backend.sign(secret, h) + bytes([SIGHASH.ALL]),
+                bytes.fromhex(claim.preimage_hex),
+                redeem_script,
+            ]
+        )
+
+    return bytes.hex(tx.serialize())
+
+
 def create_onchain_tx(
     lockup_address: str,
     lockup_rawtx: str,
@@ -118,6 +295,7 @@ def create_onchain_tx(
     preimage_hex: str = "",
     script_sig: Optional[bytes] = None,
     blinding_key: Optional[str] = None,
+    stats: Optional[LiquidTxStats] = None,
 ) -> str:
 
     if pair == "L-BTC/BTC":
@@ -135,24 +313,13 @@ def create_onchain_tx(
             timeout_block_height=timeout_block_height,
             preimage_hex=preimage_hex,
             blinding_key=blinding_key,
+            stats=stats,
         )
 
-    try:
-        lockup_transaction = Transaction.from_string(lockup_rawtx)
-    except EmbitError as exc:
-        raise ValueError("Invalid lockup transaction hex") from exc
-
-    txid = lockup_transaction.txid()
-    vout_amount: Optional[int] = None
-    vout_index: int = 0
-    for vout in lockup_transaction.vout:
-        if vout.script_pubkey == script.address_to_scriptpubkey(lockup_address):
-            vout_amount = vout.value
-            break
-        vout_index += 1
-
-    if vout_amount is None:
-        raise ValueError("No matching vout found in lockup transaction")
+    lockup_script_pubkey = script.address_to_scriptpubkey(lockup_address).data
+    txid, vout_index, vout_amount = find_lockup_output(
+        lockup_rawtx, lockup_script_pubkey
+    )
 
     vout = TransactionOutput(
         vout_amount - fees,
@@ -170,11 +337,13 @@ def create_onchain_tx(
     if timeout_block_height > 0:
         tx.locktime = timeout_block_height
 
-    redeem_script = script.Script(data=bytes.fromhex(redeem_script_hex))
-    h = tx.sighash_segwit(0, redeem_script, vout_amount)
-    sig = ec.PrivateKey.from_wif(privkey_wif).sign(h).serialize() + bytes([SIGHASH.ALL])
+    backend = get_backend()
+    redeem_script = bytes.fromhex(redeem_script_hex)
+    h = backend.sighasher(tx).sighash(0, redeem_script, vout_amount)
+    secret = ec.PrivateKey.from_wif(privkey_wif).secret
+    sig = backend.sign(secret, h) + bytes([SIGHASH.ALL])
     witness_script = script.Witness(
-        items=[sig, bytes.fromhex(preimage_hex), bytes.fromhex(redeem_script_hex)]
+        items=[sig, bytes.fromhex(preimage_hex), redeem_script]
     )
 
     tx.vin[0].witness = witness_script
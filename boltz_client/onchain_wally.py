@@ -7,8 +7,14 @@ special thanks to @jgriffiths for helping debugging this!
 from __future__ import annotations
 
 import secrets
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass
-from typing import Any, Optional
+from hashlib import sha256
+from typing import Any, ContextManager, Iterator, Optional, Union
+
+from .helpers import LRUCache
 
 
 @dataclass
@@ -71,6 +77,78 @@ NETWORKS: list[Network] = [
 ]
 
 
+@dataclass(frozen=True)
+class LockupOutput:
+    txid: bytes
+    vout: int
+    script: bytes
+    asset: bytes
+    value: bytes
+    nonce: bytes
+    surjectionproof: bytes
+    rangeproof: bytes
+
+
+@dataclass(frozen=True)
+class UnblindedOutput:
+    amount: int
+    asset: bytes
+    abf: bytes
+    vbf: bytes
+
+
+# parsed lockup outputs keyed by (lockup tx hash, lockup script) and unblinded
+# outputs keyed by (txid, vout, blinding key), rebuilding a claim or refund for
+# the same lockup skips parsing the tx and rewinding the rangeproof
+lockup_output_cache = LRUCache(256)
+unblinded_output_cache = LRUCache(256)
+
+
+@dataclass
+class LiquidTxPhase:
+    name: str
+    seconds: float
+    # peak of the python allocations during the phase, only with
+    # `trace_allocations`, memory allocated inside libwally is not traced
+    allocated: Optional[int] = None
+
+
+class LiquidTxStats:
+    """timings and optionally allocations of the phases of one `create_liquid_tx` call"""
+
+    def __init__(self, trace_allocations: bool = False):
+        self.trace_allocations = trace_allocations
+        self.phases: list[LiquidTxPhase] = []
+
+    @property
+    def seconds(self) -> float:
+        return sum(phase.seconds for phase in self.phases)
+
+    def as_dict(self) -> dict[str, float]:
+        return {phase.name: phase.seconds for phase in self.phases}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_tracing = False
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            allocated = None
+            if self.trace_allocations:
+                allocated = tracemalloc.get_traced_memory()[1] - before
+                if started_tracing:
+                    tracemalloc.stop()
+            self.phases.append(LiquidTxPhase(name, seconds, allocated))
+
+
 def get_entropy(num_outputs_to_blind: int) -> bytes:
     # For each output to blind, we need 32 bytes of entropy for each of:
     # - Output assetblinder
@@ -144,6 +222,64 @@ def decode_address(
     raise ValueError("only confidential addresses are supported")
 
 
+def parse_lockup_output(
+    wally, lockup_rawtx: str, lockup_script_pubkey: Union[bytes, bytearray]
+) -> LockupOutput:
+    key = (sha256(lockup_rawtx.encode()).digest(), bytes(lockup_script_pubkey))
+    cached = lockup_output_cache.get(key)
+    if cached:
+        return cached
+
+    lockup_transaction = wally.tx_from_hex(
+        lockup_rawtx, wally.WALLY_TX_FLAG_USE_ELEMENTS
+    )
+    vout_n: Optional[int] = None
+    for vout in range(wally.tx_get_num_outputs(lockup_transaction)):
+        script_out = wally.tx_get_output_script(lockup_transaction, vout)  # type: ignore
+        if script_out:
+            if script_out == lockup_script_pubkey:
+                vout_n = vout
+                break
+
+    assert vout_n is not None, "Lockup vout not found"
+
+    output = LockupOutput(
+        txid=bytes(wally.tx_get_txid(lockup_transaction)),  # type: ignore
+        vout=vout_n,
+        script=bytes(wally.tx_get_output_script(lockup_transaction, vout_n)),  # type: ignore
+        asset=bytes(wally.tx_get_output_asset(lockup_transaction, vout_n)),  # type: ignore
+        value=bytes(wally.tx_get_output_value(lockup_transaction, vout_n)),  # type: ignore
+        nonce=bytes(wally.tx_get_output_nonce(lockup_transaction, vout_n)),  # type: ignore
+        surjectionproof=bytes(
+            wally.tx_get_output_surjectionproof(lockup_transaction, vout_n)  # type: ignore
+        ),
+        rangeproof=bytes(wally.tx_get_output_rangeproof(lockup_transaction, vout_n)),  # type: ignore
+    )
+    lockup_output_cache.put(key, output)
+    return output
+
+
+def unblind_lockup_output(
+    wally, output: LockupOutput, blinding_key: bytes
+) -> UnblindedOutput:
+    key = (output.txid, output.vout, bytes(blinding_key))
+    cached = unblinded_output_cache.get(key)
+    if cached:
+        return cached
+
+    amount, asset, abf, vbf = wally.asset_unblind(
+        output.nonce,
+        blinding_key,
+        output.rangeproof,
+        output.value,
+        output.script,
+        output.asset,
+    )  # type: ignore
+    unblinded = UnblindedOutput(amount, bytes(asset), bytes(abf), bytes(vbf))
+    unblinded_output_cache.put(key, unblinded)
+    return unblinded
+
+
 def create_liquid_tx(
     lockup_rawtx: str,
     lockup_address: str,
@@ -155,7 +291,12 @@ def create_liquid_tx(
     timeout_block_height: int = 0,
     preimage_hex: str = "",
     blinding_key: Optional[str] = None,
+    stats: Optional[LiquidTxStats] = None,
 ) -> str:
+    """
+    claim or refund transaction of a liquid swap, pass `stats` to get
+    the timings of the phases of building it
+    """
     try:
         import wallycore as wally
     except ImportError as exc:
@@ -163,158 +304,158 @@ def create_liquid_tx(
             "`wallycore` is not installed, but required for liquid support."
         ) from exc
 
-    network = get_address_network(wally, receive_address)
+    def phase(name: str) -> ContextManager:
+        return stats.phase(name) if stats else nullcontext()
 
-    redeem_script = bytes.fromhex(redeem_script_hex)
-    preimage = bytes.fromhex(preimage_hex)
-    private_key = wally.wif_to_bytes(
-        privkey_wif,
-        network.wif_net(wally),
-        wally.WALLY_WIF_FLAG_COMPRESSED,
-    )  # type: ignore
+    with phase("decode_addresses"):
+        network = get_address_network(wally, receive_address)
 
-    assert blinding_key, "blinding_key is required"
-    try:
-        blinding_key_bytes = bytes.fromhex(blinding_key)
-    except ValueError as exc:
-        raise ValueError("blinding_key must be hex encoded") from exc
+        redeem_script = bytes.fromhex(redeem_script_hex)
+        preimage = bytes.fromhex(preimage_hex)
+        private_key = wally.wif_to_bytes(
+            privkey_wif,
+            network.wif_net(wally),
+            wally.WALLY_WIF_FLAG_COMPRESSED,
+        )  # type: ignore
 
-    receive_blinding_pubkey, receive_script_pubkey = decode_address(
-        wally, network, receive_address
-    )
-
-    _, lockup_script_pubkey = decode_address(wally, network, lockup_address)
+        assert blinding_key, "blinding_key is required"
+        try:
+            blinding_key_bytes = bytes.fromhex(blinding_key)
+        except ValueError as exc:
+            raise ValueError("blinding_key must be hex encoded") from exc
 
-    # parse lockup tx
-    lockup_transaction = wally.tx_from_hex(
-        lockup_rawtx, wally.WALLY_TX_FLAG_USE_ELEMENTS
-    )
-    vout_n: Optional[int] = None
-    for vout in range(wally.tx_get_num_outputs(lockup_transaction)):
-        script_out = wally.tx_get_output_script(lockup_transaction, vout)  # type: ignore
-        if script_out:
-            if script_out == lockup_script_pubkey:
-                vout_n = vout
-                break
+        receive_blinding_pubkey, receive_script_pubkey = decode_address(
+            wally, network, receive_address
+        )
 
-    assert vout_n is not None, "Lockup vout not found"
+        _, lockup_script_pubkey = decode_address(wally, network, lockup_address)
 
-    txid = wally.tx_get_txid(lockup_transaction)  # type: ignore
-    lockup_script = wally.tx_get_output_script(lockup_transaction, vout_n)  # type: ignore
-    lockup_rangeproof = wally.tx_get_output_rangeproof(lockup_transaction, vout_n)  # type: ignore
-    lockup_ephemeral_pubkey = wally.tx_get_output_nonce(lockup_transaction, vout_n)  # type: ignore
-    lockup_asset_commitment = wally.tx_get_output_asset(lockup_transaction, vout_n)  # type: ignore
-    lockup_value_commitment = wally.tx_get_output_value(lockup_transaction, vout_n)  # type: ignore
-
-    # UNBLIND
-    unblinded_amount, unblinded_asset, abf, vbf = wally.asset_unblind(
-        lockup_ephemeral_pubkey,
-        blinding_key_bytes,
-        lockup_rangeproof,
-        lockup_value_commitment,
-        lockup_script,
-        lockup_asset_commitment,
-    )  # type: ignore
+    # parse lockup tx and unblind the lockup output, both cached
+    with phase("parse_lockup"):
+        lockup_output = parse_lockup_output(wally, lockup_rawtx, lockup_script_pubkey)
+    with phase("unblind"):
+        unblinded = unblind_lockup_output(wally, lockup_output, blinding_key_bytes)
+    txid, vout_n = lockup_output.txid, lockup_output.vout
+    lockup_rangeproof = lockup_output.rangeproof
+    unblinded_amount, unblinded_asset = unblinded.amount, unblinded.asset
+    abf, vbf = unblinded.abf, unblinded.vbf
 
     assert unblinded_asset == network.lbtc_asset, "Wrong asset"
 
-    # INITIALIZE PSBT (PSET)
-    num_vin = 1
-    num_vout = 2
-    psbt_flags = wally.WALLY_PSBT_INIT_PSET  # Make an Elements PSET
-    psbt_version = wally.WALLY_PSBT_VERSION_2  # PSET only supports v2
-    psbt = wally.psbt_init(psbt_version, num_vin, num_vout, 0, psbt_flags)
-
-    if timeout_block_height > 0:
-        wally.psbt_set_fallback_locktime(psbt, timeout_block_height)
-
-    # ADD PSBT INPUT
-    idx = wally.psbt_get_num_inputs(psbt)
-    # Add the txout from the lockup tx as the witness UTXO for our input
-    input_ = wally.tx_input_init(txid, vout_n, sequence, None, None)
-    wally.psbt_add_tx_input_at(psbt, idx, 0, input_)
-    wally.psbt_set_input_witness_utxo_from_tx(psbt, idx, lockup_transaction, vout_n)
-    # Add the rangeproof
-    wally.psbt_set_input_utxo_rangeproof(psbt, idx, lockup_rangeproof)
-    # And the witness script
-    wally.psbt_set_input_witness_script(psbt, idx, redeem_script)
-    # Add the key info for our private key, so psbt_sign knows what input
-    # to sign when given the private key.
-    # Since we don't have a BIP32 key, add it with a dummy fingerprint and path.
-    # When signing with a non-BIP32 private key, wally uses the key as given
-    # and doesn't attempt to derive a BIP32 key to sign with, so these dummy
-    # values aren't used except to indicate that the key belongs to this input.
-    keypaths = wally.map_keypath_public_key_init(1)
-    signing_pubkey = wally.ec_public_key_from_private_key(private_key)  # type: ignore
-    wally.map_keypath_add(keypaths, signing_pubkey, bytes(4), [0])
-    wally.psbt_set_input_keypaths(psbt, idx, keypaths)
-
-    # Uncomment to generate explicit value proofs for the input.
-    # These expose the unblinded value and asset in the PSBT; we
-    # don't need them for this use-case.
-    # wally.psbt_generate_input_explicit_proofs(psbt, idx, unblinded_amount,
-    # unblinded_asset, abf, vbf, secrets.token_bytes(32))
-
-    # ADD PSBT OUTPUT
-    output_idx = wally.psbt_get_num_outputs(psbt)
-    asset_tag = bytearray([1]) + unblinded_asset  # Explicit (unblinded) asset
-    value = wally.tx_confidential_value_from_satoshi(unblinded_amount - fees)  # type: ignore
-    txout = wally.tx_elements_output_init(receive_script_pubkey, asset_tag, value, None)
-    wally.psbt_add_tx_output_at(psbt, output_idx, 0, txout)
-    wally.psbt_set_output_blinding_public_key(psbt, output_idx, receive_blinding_pubkey)
-    wally.psbt_set_output_blinder_index(psbt, output_idx, 0)
-
-    # ADD FEE OUTPUT
-    fee_value = wally.tx_confidential_value_from_satoshi(fees)  # type: ignore
-    fee_txout = wally.tx_elements_output_init(None, asset_tag, fee_value)
-    wally.psbt_add_tx_output_at(psbt, output_idx + 1, 0, fee_txout)
-
-    # BLIND PSBT
-    entropy = get_entropy(1)
-    values, vbfs, assets, abfs = [wally.map_init(1, None) for _ in range(4)]
-
-    unblinded_value = wally.tx_confidential_value_from_satoshi(unblinded_amount)  # type: ignore
-    wally.map_add_integer(values, idx, unblinded_value)
-    wally.map_add_integer(vbfs, idx, vbf)
-    wally.map_add_integer(assets, idx, unblinded_asset)
-    wally.map_add_integer(abfs, idx, abf)
-
-    # returns ephemeral_keys
-    _ = wally.psbt_blind(psbt, values, vbfs, assets, abfs, entropy, output_idx, 0)
-
-    # SIGN PSBT
-    # wally can identify the input to sign because we gave the keypath above
-    wally.psbt_sign(psbt, private_key, wally.EC_FLAG_GRIND_R)
-    # Fetch the signature from the PSBT input for finalization
-    sig_pos = wally.psbt_find_input_signature(psbt, idx, signing_pubkey)
-    assert sig_pos != 0, "signature not found"
-    sig = wally.psbt_get_input_signature(psbt, idx, sig_pos - 1)  # type: ignore
-
-    # FINALIZE PSBT
-    # Wally can't know how to finalize our bespoke p2wsh input, so
-    # we do it manually:
-    # 1) Set the final_witness according to our script requirements
-    stack = wally.tx_witness_stack_init(3)
-    wally.tx_witness_stack_add(stack, sig)
-    wally.tx_witness_stack_add(stack, preimage)
-    wally.tx_witness_stack_add(stack, redeem_script)
-    wally.psbt_set_input_final_witness(psbt, idx, stack)
-    # 2) Set the final_scriptsig. For p2wsh this must be empty, so
-    #    we don't have to do anything.
-    # if script_sig:
-    #     wally.psbt_set_input_final_scriptsig(psbt, idx, script_sig)
-
-    # OUTPUT FINALIZED PSBT/TX
-    # Convert the PSBT to base64, then parse in strict mode.
-    # This uses wally to perform strict verification that everything is OK.
-    base64 = wally.psbt_to_base64(psbt, 0)
-    wally.psbt_from_base64(base64, wally.WALLY_PSBT_PARSE_FLAG_STRICT)
-    # Dump the psbt. To extract the finalized tx, use e.g:
-    # elements-cli-sim finalizepsbt $(python psbt_wally.py) true
-
-    # Extract the completed tx from the now-finalized psbt
-    tx = wally.psbt_extract(psbt, 0)  # 0 == must be finalized
-
-    rawtx = str(wally.tx_to_hex(tx, wally.WALLY_TX_FLAG_USE_WITNESS))
+    with phase("build_pset"):
+        # INITIALIZE PSBT (PSET)
+        num_vin = 1
+        num_vout = 2
+        psbt_flags = wally.WALLY_PSBT_INIT_PSET  # Make an Elements PSET
+        psbt_version = wally.WALLY_PSBT_VERSION_2  # PSET only supports v2
+        psbt = wally.psbt_init(psbt_version, num_vin, num_vout, 0, psbt_flags)
+
+        if timeout_block_height > 0:
+            wally.psbt_set_fallback_locktime(psbt, timeout_block_height)
+
+        # ADD PSBT INPUT
+        idx = wally.psbt_get_num_inputs(psbt)
+        # Add the txout from the lockup tx as the witness UTXO for our input
+        input_ = wally.tx_input_init(txid, vout_n, sequence, None, None)
+        wally.psbt_add_tx_input_at(psbt, idx, 0, input_)
+        lockup_txout = wally.tx_elements_output_init(
+            lockup_output.script,
+            lockup_output.asset,
+            lockup_output.value,
+            lockup_output.nonce,
+            lockup_output.surjectionproof,
+            lockup_output.rangeproof,
+        )
+        wally.psbt_set_input_witness_utxo(psbt, idx, lockup_txout)
+        # Add the rangeproof
+        wally.psbt_set_input_utxo_rangeproof(psbt, idx, lockup_rangeproof)
+        # And the witness script
+        wally.psbt_set_input_witness_script(psbt, idx, redeem_script)
+        # Add the key info for our private key, so psbt_sign knows what input
+        # to sign when given the private key.
+        # Since we don't have a BIP32 key, add it with a dummy fingerprint and path.
+        # When signing with a non-BIP32 private key, wally uses the key as given
+        # and doesn't attempt to derive a BIP32 key to sign with, so these dummy
+        # values aren't used except to indicate that the key belongs to this input.
+        keypaths = wally.map_keypath_public_key_init(1)
+        signing_pubkey = wally.ec_public_key_from_private_key(private_key)  # type: ignore
+        wally.map_keypath_add(keypaths, signing_pubkey, bytes(4), [0])
+        wally.psbt_set_input_keypaths(psbt, idx, keypaths)
+
+        # Uncomment to generate explicit value proofs for the input.
+        # These expose the unblinded value and asset in the PSBT; we
+        # don't need them for this use-case.
+        # wally.psbt_generate_input_explicit_proofs(psbt, idx, unblinded_amount,
+        # unblinded_asset, abf, vbf, secrets.token_bytes(32))
+
+        # ADD PSBT OUTPUT
+        output_idx = wally.psbt_get_num_outputs(psbt)
+        asset_tag = bytearray([1]) + unblinded_asset  # Explicit (unblinded) asset
+        value = wally.tx_confidential_value_from_satoshi(unblinded_amount - fees)  # type: ignore
+        txout = wally.tx_elements_output_init(
+            receive_script_pubkey, asset_tag, value, None
+        )
+        wally.psbt_add_tx_output_at(psbt, output_idx, 0, txout)
+        wally.psbt_set_output_blinding_public_key(
+            psbt, output_idx, receive_blinding_pubkey
+        )
+        wally.psbt_set_output_blinder_index(psbt, output_idx, 0)
+
+        # ADD FEE OUTPUT
+        fee_value = wally.tx_confidential_value_from_satoshi(fees)  # type: ignore
+        fee_txout = wally.tx_elements_output_init(None, asset_tag, fee_value)
+        wally.psbt_add_tx_output_at(psbt, output_idx + 1, 0, fee_txout)
+
+    with phase("blind"):
+        # BLIND PSBT
+        entropy = get_entropy(1)
+        values, vbfs, assets, abfs = [wally.map_init(1, None) for _ in range(4)]
+
+        unblinded_value = wally.tx_confidential_value_from_satoshi(unblinded_amount)  # type: ignore
+        wally.map_add_integer(values, idx, unblinded_value)
+        wally.map_add_integer(vbfs, idx, vbf)
+        wally.map_add_integer(assets, idx, unblinded_asset)
+        wally.map_add_integer(abfs, idx, abf)
+
+        # returns ephemeral_keys
+        _ = wally.psbt_blind(psbt, values, vbfs, assets, abfs, entropy, output_idx, 0)
+
+    with phase("sign"):
+        # SIGN PSBT
+        # wally can identify the input to sign because we gave the keypath above
+        wally.psbt_sign(psbt, private_key, wally.EC_FLAG_GRIND_R)
+        # Fetch the signature from the PSBT input for finalization
+        sig_pos = wally.psbt_find_input_signature(psbt, idx, signing_pubkey)
+        assert sig_pos != 0, "signature not found"
+        sig = wally.psbt_get_input_signature(psbt, idx, sig_pos - 1)  # type: ignore
+
+        # FINALIZE PSBT
+        # Wally can't know how to finalize our bespoke p2wsh input, so
+        # we do it manually:
+        # 1) Set the final_witness according to our script requirements
+        stack = wally.tx_witness_stack_init(3)
+        wally.tx_witness_stack_add(stack, sig)
+        wally.tx_witness_stack_add(stack, preimage)
+        wally.tx_witness_stack_add(stack, redeem_script)
+        wally.psbt_set_input_final_witness(psbt, idx, stack)
+        # 2) Set the final_scriptsig. For p2wsh this must be empty, so
+        #    we don't have to do anything.
+        # if script_sig:
+        #     wally.psbt_set_input_final_scriptsig(psbt, idx, script_sig)
+
+    with phase("base64_roundtrip"):
+        # OUTPUT FINALIZED PSBT/TX
+        # Convert the PSBT to base64, then parse in strict mode.
+        # This uses wally to perform strict verification that everything is OK.
+        base64 = wally.psbt_to_base64(psbt, 0)
+        wally.psbt_from_base64(base64, wally.WALLY_PSBT_PARSE_FLAG_STRICT)
+        # Dump the psbt. To extract the finalized tx, use e.g:
+        # elements-cli-sim finalizepsbt $(python psbt_wally.py) true
+
+    with phase("extract"):
+        # Extract the completed tx from the now-finalized psbt
+        tx = wally.psbt_extract(psbt, 0)  # 0 == must be finalized
+
+        rawtx = str(wally.tx_to_hex(tx, wally.WALLY_TX_FLAG_USE_WITNESS))
 
     return rawtx
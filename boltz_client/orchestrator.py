@@ -0,0 +1,445 @@
+""" boltz_client swap orchestrator, many swap lifecycles on one event loop """
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+import httpx
+
+from .boltz import (
+    BoltzApiException,
+    BoltzClient,
+    BoltzInvoiceException,
+    BoltzReverseSwapResponse,
+    BoltzSwapResponse,
+    BoltzSwapStatusException,
+    BoltzSwapStatusResponse,
+    BoltzSwapTransactionException,
+)
+from .broadcast import BoltzBroadcastException
+from .onchain import create_claim_tx, create_refund_tx, get_script_pubkey
+from .watch import FINAL_STATUSES
+
+T = TypeVar("T")
+
+# errors of a state worth another attempt, everything else and invalid invoices fail the job
+RETRYABLE_EXCEPTIONS = (BoltzApiException, BoltzBroadcastException, httpx.HTTPError)
+
+# statuses of a submarine swap after which the lockup has to be refunded
+REFUND_STATUSES = frozenset(
+    ["invoice.failedToPay", "transaction.lockupFailed", "swap.expired"]
+)
+
+
+class SwapState(str, Enum):
+    pending = "pending"
+    create = "create"
+    # submarine swaps only, until boltz paid the invoice or gave up
+    wait_status = "wait_status"
+    wait_lockup = "wait_lockup"
+    # submarine swaps only, refunds are not final before the timeout block height
+    wait_timeout = "wait_timeout"
+    build = "build"
+    broadcast = "broadcast"
+    done = "done"
+    failed = "failed"
+
+
+FINAL_STATES = frozenset([SwapState.done, SwapState.failed])
+
+
+@dataclass
+class SwapJob:
+    """one swap lifecycle, the orchestrator fills in everything after `pair`"""
+
+    state: SwapState = field(default=SwapState.pending, init=False)
+    # attempts and seconds spent per state, retries included
+    attempts: dict[SwapState, int] = field(default_factory=dict, init=False)
+    timings: dict[SwapState, float] = field(default_factory=dict, init=False)
+    privkey_wif: Optional[str] = field(default=None, init=False)
+    lockup_rawtx: Optional[str] = field(default=None, init=False)
+    transaction: Optional[str] = field(default=None, init=False)
+    txid: Optional[str] = field(default=None, init=False)
+    error: Optional[BaseException] = field(default=None, init=False)
+
+    @property
+    def boltz_id(self) -> Optional[str]:
+        swap = getattr(self, "swap", None)
+        return swap.id if swap else None
+
+
+@dataclass
+class ReverseSwapJob(SwapJob):
+    """create a reverse swap and claim its lockup, the invoice is paid by the caller"""
+
+    amount: int = 0
+    receive_address: str = ""
+    pair: Optional[str] = None
+    zeroconf: bool = True
+    preimage_hex: Optional[str] = field(default=None, init=False)
+    swap: Optional[BoltzReverseSwapResponse] = field(default=None, init=False)
+
+
+@dataclass
+class SubmarineSwapJob(SwapJob):
+    """
+    create a swap and refund its lockup if boltz fails to pay the invoice,
+    the lockup is sent by the caller
+    """
+
+    payment_request: str = ""
+    refund_address: str = ""
+    pair: Optional[str] = None
+    status: Optional[str] = field(default=None, init=False)
+    swap: Optional[BoltzSwapResponse] = field(default=None, init=False)
+
+
+class SwapOrchestrator:
+    """
+    runs swap jobs as state machines on one event loop. api calls, cpu-bound
+    transaction building and broadcasts each have their own concurrency limit,
+    `submit` waits while the queue is full, so bursts are absorbed by the queue
+    instead of piling up requests. failed states are retried `retries` times
+    with exponential backoff, `state_retries` overrides that per state. a failed
+    submarine swap without a lockup after `lockup_timeout` seconds fails its job,
+    a reverse swap without one after `reverse_lockup_timeout` seconds or at a
+    final status, e.g. an expired invoice, as well
+    """
+
+    def __init__(
+        self,
+        client: BoltzClient,
+        max_jobs: int = 100,
+        queue_size: int = 100,
+        api_concurrency: int = 8,
+        cpu_concurrency: int = 2,
+        broadcast_concurrency: int = 4,
+        retries: int = 3,
+        state_retries: Optional[dict[SwapState, int]] = None,
+        retry_delay: float = 1,
+        poll_interval: float = 3,
+        lockup_timeout: float = 60,
+        reverse_lockup_timeout: float = 600,
+        on_transition: Optional[Callable[[SwapJob], Any]] = None,
+    ):
+        self.client = client
+        self.max_jobs = max_jobs
+        self.queue_size = queue_size
+        self.api_concurrency = api_concurrency
+        self.cpu_concurrency = cpu_concurrency
+        self.broadcast_concurrency = broadcast_concurrency
+        self.retries = retries
+        self.state_retries = state_retries or {}
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.lockup_timeout = lockup_timeout
+        self.reverse_lockup_timeout = reverse_lockup_timeout
+        self.on_transition = on_transition
+        self._queue: Optional[asyncio.Queue] = None
+        self._api_limit: Optional[asyncio.Semaphore] = None
+        self._cpu_limit: Optional[asyncio.Semaphore] = None
+        self._broadcast_limit: Optional[asyncio.Semaphore] = None
+        self._workers: list[asyncio.Task] = []
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+        self._cpu_executor: Optional[ThreadPoolExecutor] = None
+
+    async def __aenter__(self) -> "SwapOrchestrator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        # asyncio primitives are bound to the running loop on python < 3.10
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._api_limit = asyncio.Semaphore(self.api_concurrency)
+        self._cpu_limit = asyncio.Semaphore(self.cpu_concurrency)
+        self._broadcast_limit = asyncio.Semaphore(self.broadcast_concurrency)
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=self.api_concurrency + self.broadcast_concurrency
+        )
+        self._cpu_executor = ThreadPoolExecutor(max_workers=self.cpu_concurrency)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_jobs)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for executor in (self._io_executor, self._cpu_executor):
+            if executor:
+                executor.shutdown(wait=False)
+
+    async def submit(self, job: SwapJob) -> None:
+        """queue the job, waits while `queue_size` jobs are already waiting"""
+        assert self._queue, "orchestrator is not started"
+        await self._queue.put(job)
+
+    async def join(self) -> None:
+        """wait until every submitted job is done or failed"""
+        assert self._queue, "orchestrator is not started"
+        await self._queue.join()
+
+    async def run(self, jobs: list[SwapJob]) -> list[SwapJob]:
+        """run all jobs to completion"""
+        async with self:
+            for job in jobs:
+                await self.submit(job)
+            await self.join()
+        return jobs
+
+    async def _worker(self) -> None:
+        assert self._queue
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: SwapJob) -> None:
+        state = SwapState.create
+        while state not in FINAL_STATES:
+            self._transition(job, state)
+            start = time.perf_counter()
+            try:
+                state = await self._run_state(job, state)
+            except Exception as exc:
+                job.error = exc
+                state = SwapState.failed
+            finally:
+                job.timings[job.state] = (
+                    job.timings.get(job.state, 0) + time.perf_counter() - start
+                )
+        self._transition(job, state)
+
+    def _transition(self, job: SwapJob, state: SwapState) -> None:
+        job.state = state
+        if self.on_transition:
+            self.on_transition(job)
+
+    async def _run_state(self, job: SwapJob, state: SwapState) -> SwapState:
+        step = self._step(job, state)
+        retries = self.state_retries.get(state, self.retries)
+        attempt = 0
+        while True:
+            attempt += 1
+            job.attempts[state] = attempt
+            try:
+                return await step()
+            except BoltzInvoiceException:
+                raise
+            except RETRYABLE_EXCEPTIONS:
+                if attempt > retries:
+                    raise
+            await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    def _step(self, job: SwapJob, state: SwapState) -> Callable:
+        steps: dict[SwapState, Callable]
+        if isinstance(job, ReverseSwapJob):
+            steps = {
+                SwapState.create: self._create_reverse_swap,
+                SwapState.wait_lockup: self._wait_reverse_lockup,
+                SwapState.build: self._build_claim,
+                SwapState.broadcast: self._broadcast,
+            }
+        else:
+            steps = {
+                SwapState.create: self._create_swap,
+                SwapState.wait_status: self._wait_swap_status,
+                SwapState.wait_lockup: self._wait_swap_lockup,
+                SwapState.wait_timeout: self._wait_swap_timeout,
+                SwapState.build: self._build_refund,
+                SwapState.broadcast: self._broadcast,
+            }
+        return lambda: steps[state](job)
+
+    async def _call_api(self, func: Callable[..., T], *args) -> T:
+        assert self._api_limit
+        loop = asyncio.get_running_loop()
+        async with self._api_limit:
+            return await loop.run_in_executor(self._io_executor, func, *args)
+
+    async def _create_reverse_swap(self, job: ReverseSwapJob) -> SwapState:
+        pair = self.client.pair_info(job.pair).pair
+        self.client.validate_address(job.receive_address, pair)
+        self.client.check_limits(job.amount, pair)
+        job.privkey_wif, job.preimage_hex, job.swap = await self._call_api(
+            self.client.create_reverse_swap, job.amount, pair
+        )
+        return SwapState.wait_lockup
+
+    async def _wait_reverse_lockup(self, job: ReverseSwapJob) -> SwapState:
+        assert job.swap
+        chain_source = self.client.get_chain_source(job.pair)
+        script_pubkey = None
+        if chain_source:
+            script_pubkey = get_script_pubkey(
+                job.swap.lockupAddress, self.client.pair_info(job.pair).pair
+            )
+        # the invoice is paid by the caller, it may never be
+        deadline = time.monotonic() + self.reverse_lockup_timeout
+        while time.monotonic() < deadline:
+            if chain_source and script_pubkey:
+                try:
+                    rawtx = await chain_source.find_lockup(script_pubkey, job.zeroconf)
+                    if rawtx:
+                        job.lockup_rawtx = rawtx
+                        return SwapState.build
+                except (httpx.HTTPError, ValueError, KeyError):
+                    pass
+            status = await self._poll_status(job.swap.id)
+            if status and status.transaction and status.transaction.get("hex"):
+                if job.zeroconf or status.status == "transaction.confirmed":
+                    job.lockup_rawtx = status.transaction["hex"]
+                    return SwapState.build
+            elif status and status.status in FINAL_STATUSES:
+                raise BoltzSwapStatusException(
+                    f"swap {job.swap.id} is {status.status} without a lockup",
+                    status.status,
+                )
+            await asyncio.sleep(self.poll_interval)
+        raise BoltzSwapTransactionException(
+            f"no lockup of swap {job.swap.id} after {self.reverse_lockup_timeout}s"
+        )
+
+    async def _poll_status(self, boltz_id: str) -> Optional[BoltzSwapStatusResponse]:
+        """status of the swap, None while the api is not reachable"""
+        try:
+            return await self._call_api(self.client.swap_status, boltz_id)
+        except BoltzApiException:
+            return None
+
+    async def _build_claim(self, job: ReverseSwapJob) -> SwapState:
+        assert job.swap and job.lockup_rawtx and job.privkey_wif and job.preimage_hex
+        pair = self.client.pair_info(job.pair).pair
+        job.transaction = await self._call_cpu(
+            create_claim_tx,
+            lockup_address=job.swap.lockupAddress,
+            lockup_rawtx=job.lockup_rawtx,
+            receive_address=job.receive_address,
+            privkey_wif=job.privkey_wif,
+            redeem_script_hex=job.swap.redeemScript,
+            preimage_hex=job.preimage_hex,
+            pair=pair,
+            blinding_key=job.swap.blindingKey,
+            fees=self.client.get_fee_estimation_claim(pair),
+        )
+        return SwapState.broadcast
+
+    async def _call_cpu(self, func: Callable[..., T], **kwargs) -> T:
+        assert self._cpu_limit
+        loop = asyncio.get_running_loop()
+        async with self._cpu_limit:
+            return await loop.run_in_executor(
+                self._cpu_executor, partial(func, **kwargs)
+            )
+
+    async def _broadcast(self, job: SwapJob) -> SwapState:
+        assert job.transaction and self._broadcast_limit
+        loop = asyncio.get_running_loop()
+        async with self._broadcast_limit:
+            result = await loop.run_in_executor(
+                self._io_executor,
+                self.client.broadcast_tx,
+                job.transaction,
+                getattr(job, "pair", None),
+            )
+        job.txid = result.txid
+        return SwapState.done
+
+    async def _create_swap(self, job: SubmarineSwapJob) -> SwapState:
+        pair = self.client.pair_info(job.pair).pair
+        self.client.validate_address(job.refund_address, pair)
+        job.privkey_wif, job.swap = await self._call_api(
+            self.client.create_swap, job.payment_request, pair
+        )
+        return SwapState.wait_status
+
+    async def _wait_swap_status(self, job: SubmarineSwapJob) -> SwapState:
+        assert job.swap
+        while True:
+            try:
+                status = await self._call_api(self.client.swap_status, job.swap.id)
+                job.status = status.status
+                if status.status == "transaction.claimed":
+                    return SwapState.done
+            except BoltzApiException:
+                pass
+            except BoltzSwapStatusException as exc:
+                if exc.status not in REFUND_STATUSES:
+                    raise
+                job.status = exc.status
+                return SwapState.wait_lockup
+            if job.status in REFUND_STATUSES:
+                return SwapState.wait_lockup
+            await asyncio.sleep(self.poll_interval)
+
+    async def _wait_swap_lockup(self, job: SubmarineSwapJob) -> SwapState:
+        assert job.swap
+        # boltz knows the lockup of a failed swap, an expired swap may never have had one
+        deadline = time.monotonic() + self.lockup_timeout
+        while time.monotonic() < deadline:
+            try:
+                res = await self._call_api(self.client.swap_transaction, job.swap.id)
+                if res.transactionHex:
+                    job.lockup_rawtx = res.transactionHex
+                    return SwapState.wait_timeout
+            except (BoltzApiException, BoltzSwapTransactionException):
+                pass
+            await asyncio.sleep(self.poll_interval)
+        raise BoltzSwapTransactionException(
+            f"no lockup of swap {job.swap.id} after {self.lockup_timeout}s"
+        )
+
+    async def _wait_swap_timeout(self, job: SubmarineSwapJob) -> SwapState:
+        """
+        wait for the timeout block height of the chain source, without one
+        until boltz stops reporting the eta of the timeout
+        """
+        assert job.swap
+        chain_source = self.client.get_chain_source(job.pair)
+        while True:
+            try:
+                if chain_source:
+                    block_height = await chain_source.get_block_height()
+                    if block_height >= job.swap.timeoutBlockHeight:
+                        return SwapState.build
+                else:
+                    res = await self._call_api(
+                        self.client.swap_transaction, job.swap.id
+                    )
+                    if not res.timeoutEta:
+                        return SwapState.build
+            except (
+                BoltzApiException,
+                BoltzSwapTransactionException,
+                httpx.HTTPError,
+                ValueError,
+            ):
+                pass
+            await asyncio.sleep(self.poll_interval)
+
+    async def _build_refund(self, job: SubmarineSwapJob) -> SwapState:
+        assert job.swap and job.lockup_rawtx and job.privkey_wif
+        pair = self.client.pair_info(job.pair).pair
+        job.transaction = await self._call_cpu(
+            create_refund_tx,
+            lockup_address=job.swap.address,
+            lockup_rawtx=job.lockup_rawtx,
+            privkey_wif=job.privkey_wif,
+            receive_address=job.refund_address,
+            redeem_script_hex=job.swap.redeemScript,
+            timeout_block_height=job.swap.timeoutBlockHeight,
+            pair=pair,
+            blinding_key=job.swap.blindingKey,
+            fees=self.client.get_fee_estimation_refund(pair),
+        )
+        return SwapState.broadcast
@@ -0,0 +1,42 @@
+""" boltz_client pairs cache """
+
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+
+class PairsCache:
+    """on-disk cache of the `/getpairs` response of one api endpoint"""
+
+    def __init__(self, path: str, api_url: str):
+        self.path = path
+        self.api_url = api_url
+
+    def load(self, max_age: Optional[float] = None) -> Optional[dict]:
+        """return the cached pairs, None if missing, stale or for another api"""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("api_url") != self.api_url:
+            return None
+        if max_age is not None and time.time() - data.get("timestamp", 0) > max_age:
+            return None
+        return data.get("pairs")
+
+    def save(self, pairs: dict) -> None:
+        """write the pairs atomically, concurrent readers never see partial files"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        data = {"api_url": self.api_url, "timestamp": time.time(), "pairs": pairs}
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,78 @@
+""" boltz_client batch quotes for many amounts and pairs """
+
+from dataclasses import dataclass
+from math import ceil, floor
+from typing import Any, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+
+@dataclass
+class PairQuote:
+    pair: str
+    amounts: Any
+    # invoice amount of a reverse swap to receive `amounts` onchain,
+    # like `BoltzClient.add_reverse_swap_fees`
+    reverse_amounts: Any
+    # onchain amount of a swap paying an invoice of `amounts`,
+    # like `BoltzClient.substract_swap_fees`
+    swap_amounts: Any
+    # `amounts` within the limits, like `BoltzClient.check_limits`
+    valid: Any
+    # `reverse_amounts` within the limits
+    reverse_valid: Any
+
+
+def quote_pair(pair: str, pair_data: dict, amounts: Any) -> PairQuote:
+    """
+    quote all amounts of one pair, vectorized if numpy is installed.
+    the divisions are the same float64 operations as the scalar methods,
+    so ceil and floor round exactly like them
+    """
+    fees = pair_data["fees"]
+    limits = pair_data["limits"]
+    base = fees["minerFees"]["baseAsset"]
+    reverse_fee = base["reverse"]["claim"] + base["reverse"]["lockup"]
+    reverse_divisor = 1 - (fees["percentage"] / 100)
+    swap_fee = base["normal"]
+    swap_divisor = 1 + (fees["percentageSwapIn"] / 100)
+    minimal, maximal = limits["minimal"], limits["maximal"]
+
+    if np is None:
+        reverse_amounts = [ceil((a + reverse_fee) / reverse_divisor) for a in amounts]
+        return PairQuote(
+            pair=pair,
+            amounts=list(amounts),
+            reverse_amounts=reverse_amounts,
+            swap_amounts=[floor((a - swap_fee) / swap_divisor) for a in amounts],
+            valid=[minimal <= a <= maximal for a in amounts],
+            reverse_valid=[minimal <= a <= maximal for a in reverse_amounts],
+        )
+
+    amounts = np.asarray(amounts, dtype=np.int64)
+    reverse_amounts = np.ceil((amounts + reverse_fee) / reverse_divisor).astype(
+        np.int64
+    )
+    return PairQuote(
+        pair=pair,
+        amounts=amounts,
+        reverse_amounts=reverse_amounts,
+        swap_amounts=np.floor((amounts - swap_fee) / swap_divisor).astype(np.int64),
+        valid=(amounts >= minimal) & (amounts <= maximal),
+        reverse_valid=(reverse_amounts >= minimal) & (reverse_amounts <= maximal),
+    )
+
+
+def quote(
+    pairs: dict, amounts: Any, pair_ids: Optional[Sequence[str]] = None
+) -> dict[str, PairQuote]:
+    """quote every amount for every pair of one `/getpairs` snapshot"""
+    if np is not None:
+        amounts = np.asarray(amounts, dtype=np.int64)
+    return {
+        pair: quote_pair(pair, pairs[pair], amounts)
+        for pair in (pair_ids if pair_ids is not None else pairs)
+    }
@@ -0,0 +1,248 @@
+""" boltz_client swap records as jsonl, streaming import, export and settlement """
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+from concurrent.futures import Executor
+from typing import IO, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional
+
+from .boltz import BoltzClient
+from .store import SwapRecord, SwapStore
+
+# record data that spends the swap funds
+SECRET_FIELDS = ("privkey_wif", "preimage_hex", "blinding_key")
+
+ENCRYPTED_PREFIX = "enc1:"
+KDF_ITERATIONS = 200_000
+
+
+class SecretBox:
+    """
+    encrypts secrets with aes-256-cbc and an hmac-sha256, the keys are derived
+    from the passphrase with pbkdf2 once per salt, so files of many records
+    stay fast to write and read
+    """
+
+    def __init__(self, passphrase: str):
+        try:
+            import wallycore as wally
+        except ImportError as exc:
+            raise ImportError(
+                "`wallycore` is not installed, but required for encrypted secrets."
+            ) from exc
+        self.wally = wally
+        self.passphrase = passphrase.encode()
+        self.salt = os.urandom(16)
+        self._keys: dict[bytes, tuple[bytes, bytes]] = {}
+
+    def _derive(self, salt: bytes) -> tuple[bytes, bytes]:
+        keys = self._keys.get(salt)
+        if not keys:
+            key = hashlib.pbkdf2_hmac(
+                "sha256", self.passphrase, salt, KDF_ITERATIONS, 64
+            )
+            keys = self._keys[salt] = (key[:32], key[32:])
+        return keys
+
+    def encrypt(self, secret: str) -> str:
+        aes_key, mac_key = self._derive(self.salt)
+        iv = os.urandom(16)
+        ciphertext = bytes(
+            self.wally.aes_cbc(
+                aes_key, iv, secret.encode(), self.wally.AES_FLAG_ENCRYPT
+            )
+        )
+        payload = self.salt + iv + ciphertext
+        mac = hmac.new(mac_key, payload, hashlib.sha256).digest()
+        return ENCRYPTED_PREFIX + base64.b64encode(payload + mac).decode()
+
+    def decrypt(self, value: str) -> str:
+        raw = base64.b64decode(value[len(ENCRYPTED_PREFIX) :])  # noqa: E203
+        payload, mac = raw[:-32], raw[-32:]
+        aes_key, mac_key = self._derive(payload[:16])
+        expected = hmac.new(mac_key, payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(mac, expected):
+            raise ValueError("wrong passphrase or corrupted secret")
+        plaintext = self.wally.aes_cbc(
+            aes_key, payload[16:32], payload[32:], self.wally.AES_FLAG_DECRYPT
+        )
+        return bytes(plaintext).decode()
+
+
+def dump_record(
+    record: SwapRecord, box: Optional[SecretBox] = None, redact: bool = False
+) -> str:
+    """one jsonl line, secrets are encrypted with `box` or `redact`ed"""
+    data = record.to_json()
+    secrets = data["data"]
+    for name in SECRET_FIELDS:
+        if secrets.get(name) is None:
+            continue
+        if redact:
+            secrets[name] = None
+        elif box:
+            secrets[name] = box.encrypt(secrets[name])
+    return json.dumps(data)
+
+
+def load_record(line: str, box: Optional[SecretBox] = None) -> SwapRecord:
+    record = SwapRecord.from_json(json.loads(line))
+    for name in SECRET_FIELDS:
+        value = record.data.get(name)
+        if isinstance(value, str) and value.startswith(ENCRYPTED_PREFIX):
+            if not box:
+                raise ValueError(f"secrets of {record.boltz_id} are encrypted")
+            record.data[name] = box.decrypt(value)
+    return record
+
+
+def export_records(
+    records: Iterable[SwapRecord],
+    file: IO[str],
+    passphrase: Optional[str] = None,
+    redact: bool = False,
+) -> int:
+    """
+    write `records` as jsonl, one at a time. secrets are never written in
+    plain text: pass a `passphrase` to encrypt them or `redact` them
+    """
+    if not passphrase and not redact:
+        raise ValueError("pass a passphrase to encrypt the secrets or redact them")
+    box = SecretBox(passphrase) if passphrase and not redact else None
+    count = 0
+    for record in records:
+        file.write(dump_record(record, box, redact) + "\n")
+        count += 1
+    return count
+
+
+def iter_records(
+    file: IO[str], passphrase: Optional[str] = None
+) -> Iterator[SwapRecord]:
+    """read jsonl records lazily, decrypting the secrets with `passphrase`"""
+    box = SecretBox(passphrase) if passphrase else None
+    for line in file:
+        if line.strip():
+            yield load_record(line, box)
+
+
+def import_records(
+    file: IO[str], store: SwapStore, passphrase: Optional[str] = None
+) -> int:
+    count = 0
+    for record in iter_records(file, passphrase):
+        store.add(record)
+        count += 1
+    return count
+
+
+async def claim_record(
+    client: BoltzClient, record: SwapRecord, receive_address: Optional[str] = None
+) -> str:
+    """claim a reverse swap from its record, to `receive_address` of the record"""
+    data = record.data
+    receive_address = receive_address or data.get("receive_address")
+    if record.kind != "reverse" or not receive_address:
+        raise ValueError(f"{record.boltz_id} is no reverse swap with a receive address")
+    return await client.claim_reverse_swap(
+        boltz_id=record.boltz_id,
+        lockup_address=data["lockup_address"],
+        receive_address=receive_address,
+        privkey_wif=data["privkey_wif"],
+        preimage_hex=data["preimage_hex"],
+        redeem_script_hex=data["redeem_script_hex"],
+        zeroconf=data.get("zeroconf", True),
+        blinding_key=data.get("blinding_key"),
+        pair=record.pair,
+    )
+
+
+async def refund_record(
+    client: BoltzClient, record: SwapRecord, refund_address: Optional[str] = None
+) -> str:
+    """
+    refund a submarine swap from its record, to `refund_address` of the
+    record. with a chain source of the pair, refunds before the timeout fail
+    without building a transaction
+    """
+    data = record.data
+    refund_address = refund_address or data.get("refund_address")
+    if record.kind != "submarine" or not refund_address:
+        raise ValueError(
+            f"{record.boltz_id} is no submarine swap with a refund address"
+        )
+    chain_source = client.get_chain_source(record.pair)
+    if chain_source:
+        block_height = await chain_source.get_block_height()
+        if block_height < data["timeout_block_height"]:
+            raise ValueError(
+                f"refund of {record.boltz_id} not possible before block "
+                f"{data['timeout_block_height']}, at {block_height}"
+            )
+    return await client.refund_swap(
+        boltz_id=record.boltz_id,
+        privkey_wif=data["privkey_wif"],
+        lockup_address=data["lockup_address"],
+        receive_address=refund_address,
+        redeem_script_hex=data["redeem_script_hex"],
+        timeout_block_height=data["timeout_block_height"],
+        blinding_key=data.get("blinding_key"),
+        pair=record.pair,
+    )
+
+
+async def settle_in_executor(
+    settle: Callable[[], Awaitable[str]],
+    timeout: Optional[float] = None,
+    executor: Optional[Executor] = None,
+) -> str:
+    """
+    run a claim or refund like `partial(claim_record, client, record)` on its own
+    event loop in `executor`, building and broadcasting the transaction does not
+    yield. raises TimeoutError if it is not settled after `timeout` seconds, e.g.
+    the refund of a swap that was never funded
+    """
+
+    async def bounded() -> str:
+        try:
+            return await asyncio.wait_for(settle(), timeout)
+        except asyncio.TimeoutError as exc:
+            raise TimeoutError(f"not settled after {timeout}s") from exc
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, asyncio.run, bounded())
+
+
+async def settle_many(
+    records: Iterable[SwapRecord],
+    settle: Callable[[SwapRecord], Awaitable[str]],
+    max_concurrency: int = 8,
+) -> AsyncIterator[tuple[SwapRecord, Optional[str], Optional[BaseException]]]:
+    """
+    run `settle` on the records and yield record, txid and error as they
+    finish. records are pulled from the iterable only when one of the
+    `max_concurrency` slots is free, so memory does not grow with the input
+    """
+    pending: dict[asyncio.Task, SwapRecord] = {}
+    records_iter = iter(records)
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < max_concurrency:
+            record = next(records_iter, None)
+            if record is None:
+                exhausted = True
+                break
+            pending[asyncio.ensure_future(settle(record))] = record
+        if not pending:
+            break
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            record = pending.pop(task)
+            error = task.exception()
+            if error:
+                yield record, None, error
+            else:
+                yield record, task.result(), None
@@ -0,0 +1,241 @@
+""" boltz_client sharded swap workers, swaps spread over processes by a hash ring """
+
+import asyncio
+import bisect
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from hashlib import sha256
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from .boltz import BoltzApiException, BoltzClient, BoltzSwapTransactionException
+from .records import claim_record, refund_record, settle_in_executor
+from .store import SwapRecord, SwapStore
+from .watch import poll_status
+
+# statuses of a reverse swap once boltz sent the lockup transaction
+LOCKUP_STATUSES = frozenset(["transaction.mempool", "transaction.confirmed"])
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(sha256(key.encode()).digest()[:8], "big")
+
+
+class HashRing:  # pylint: disable=too-few-public-methods
+    """
+    consistent hashing, every node owns `replicas` points on the ring and a
+    key belongs to the next point. adding or removing a node only moves the
+    keys of that node
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = 64):
+        points = sorted(
+            (_hash(f"{node}-{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._nodes:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[index]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SwapWorker:
+    """
+    one shard of the swap monitoring, several workers share a `SwapStore`.
+    every round a worker takes leases on the pending swaps the ring of live
+    workers assigns to it and releases the others, its heartbeat renews them
+    every `interval` seconds on its own. it polls the status of its swaps,
+    claims reverse swaps with a `receive_address` and refunds submarine swaps
+    with a `refund_address` in their record data. refunds wait until boltz
+    knows a lockup. claims and refunds run on threads of their own beside the
+    rounds, keep their lease until they finish and fail after `settle_timeout`
+    seconds. swaps of a worker that stopped heartbeating are taken over once
+    their leases expired, after at most `lease_ttl` seconds
+    """
+
+    def __init__(
+        self,
+        client: BoltzClient,
+        store: SwapStore,
+        worker_id: Optional[str] = None,
+        interval: float = 3,
+        lease_ttl: float = 30,
+        replicas: int = 64,
+        max_concurrency: int = 16,
+        settle_timeout: float = 300,
+        on_error: Optional[Callable[[SwapRecord, Exception], Any]] = None,
+    ):
+        if lease_ttl <= interval:
+            raise ValueError("lease_ttl has to be longer than the interval")
+        self.client = client
+        self.store = store
+        self.worker_id = worker_id or default_worker_id()
+        self.interval = interval
+        self.lease_ttl = lease_ttl
+        self.replicas = replicas
+        self.settle_timeout = settle_timeout
+        self.on_error = on_error
+        self.owned: set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        # settlements and the heartbeat never wait for the threads of the rounds
+        self._settle_executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._heartbeat_executor = ThreadPoolExecutor(max_workers=1)
+        self._settling: dict[str, asyncio.Task] = {}
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def run(self) -> None:
+        """
+        work rounds until `stop`, wait for the settlements in flight, then
+        release the leases and leave the ring, so the other workers take over
+        right away
+        """
+        self._stopped = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not self._stopped.is_set():
+                await self.run_once()
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self.join()
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            for boltz_id in self.owned:
+                self.store.release(boltz_id, self.worker_id)
+            self.owned.clear()
+            self.store.heartbeat(self.worker_id, 0)
+
+    def stop(self) -> None:
+        if self._stopped:
+            self._stopped.set()
+
+    def close(self) -> None:
+        for executor in (
+            self._executor,
+            self._settle_executor,
+            self._heartbeat_executor,
+        ):
+            executor.shutdown(wait=False)
+
+    async def join(self) -> None:
+        """wait for the claims and refunds in flight"""
+        await asyncio.gather(*self._settling.values(), return_exceptions=True)
+
+    async def run_once(self) -> None:
+        """rebalance, poll the swaps and start their claims or refunds"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self._executor, partial(self.rebalance, set(self._settling))
+        )
+        records = [
+            record
+            for record in await loop.run_in_executor(
+                self._executor, self.store.records, True
+            )
+            if record.boltz_id in self.owned and record.boltz_id not in self._settling
+        ]
+        await asyncio.gather(*(self._process(record) for record in records))
+
+    def rebalance(self, settling: Iterable[str] = ()) -> None:
+        """
+        heartbeat, then lease the swaps of this shard and release the rest,
+        swaps `settling` stay leased until their claim or refund finished
+        """
+        self.store.heartbeat(self.worker_id, self.lease_ttl)
+        ring = HashRing(self.store.live_workers(), self.replicas)
+        settling = set(settling)
+        owned = set()
+        for record in self.store.records(pending=True):
+            if (
+                ring.node_for(record.boltz_id) != self.worker_id
+                and record.boltz_id not in settling
+            ):
+                continue
+            if self.store.acquire(record.boltz_id, self.worker_id, self.lease_ttl):
+                owned.add(record.boltz_id)
+        for boltz_id in self.owned - owned:
+            self.store.release(boltz_id, self.worker_id)
+        self.owned = owned
+
+    async def _heartbeat(self) -> None:
+        """renew the heartbeat and the leases while rounds or settlements run"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await loop.run_in_executor(
+                    self._heartbeat_executor,
+                    self.store.heartbeat,
+                    self.worker_id,
+                    self.lease_ttl,
+                )
+            except Exception:
+                # e.g. a locked database, the next beat may succeed
+                pass
+
+    async def _process(self, record: SwapRecord) -> None:
+        loop = asyncio.get_running_loop()
+        event = await loop.run_in_executor(
+            self._executor, poll_status, self.client, record.boltz_id, record.status
+        )
+        if event and event.status and event.status != record.status:
+            record = self.store.update(record.boltz_id, status=event.status)
+        if record.txid:
+            return
+        settle = self._settlement(record)
+        if not settle:
+            return
+        if record.needs_refund and not await loop.run_in_executor(
+            self._executor, self._has_lockup, record.boltz_id
+        ):
+            # e.g. expired before it was funded, there is nothing to refund
+            return
+        self._settling[record.boltz_id] = asyncio.create_task(
+            self._settle(record, settle)
+        )
+
+    async def _settle(
+        self, record: SwapRecord, settle: Callable[[], Awaitable[str]]
+    ) -> None:
+        try:
+            txid = await settle_in_executor(
+                settle, self.settle_timeout, self._settle_executor
+            )
+            self.store.update(record.boltz_id, txid=txid)
+        except Exception as exc:
+            if self.on_error:
+                self.on_error(record, exc)
+        finally:
+            del self._settling[record.boltz_id]
+
+    def _has_lockup(self, boltz_id: str) -> bool:
+        try:
+            return bool(self.client.swap_transaction(boltz_id).transactionHex)
+        except (BoltzApiException, BoltzSwapTransactionException):
+            return False
+
+    def _settlement(self, record: SwapRecord) -> Optional[Callable[[], Awaitable[str]]]:
+        """the claim or refund a swap is ready for, None if there is none"""
+        data = record.data
+        if (
+            record.kind == "reverse"
+            and record.status in LOCKUP_STATUSES
+            and data.get("receive_address")
+            and (data.get("zeroconf", True) or record.status != "transaction.mempool")
+        ):
+            return partial(claim_record, self.client, record)
+        if record.needs_refund:
+            return partial(refund_record, self.client, record)
+        return None
@@ -0,0 +1,184 @@
+""" boltz_client signing backends for the BTC path """
+
+from hashlib import sha256
+from typing import Any, Optional, Protocol
+
+from embit import ec
+from embit.transaction import Transaction
+
+
+def _varint(n: int) -> bytes:
+    if n < 0xFD:
+        return bytes([n])
+    if n <= 0xFFFF:
+        return b"\xfd" + n.to_bytes(2, "little")
+    if n <= 0xFFFFFFFF:
+        return b"\xfe" + n.to_bytes(4, "little")
+    return b"\xff" + n.to_bytes(8, "little")
+
+
+class Sighasher(Protocol):  # pylint: disable=too-few-public-methods
+    """the bip143 SIGHASH_ALL hashes of the inputs of one transaction"""
+
+    def sighash(self, index: int, script_code: bytes, value: int) -> bytes:
+        ...
+
+
+class Bip143Sighasher:  # pylint: disable=too-few-public-methods
+    """
+    SIGHASH_ALL segwit v0 sighashes of all inputs of one transaction.
+    hashPrevouts, hashSequence and hashOutputs are computed once and the sha256
+    state after the common prefix is copied for every input, so signing all
+    inputs is linear in the size of the transaction. the transaction must not
+    change anymore, except for witnesses.
+    """
+
+    def __init__(self, tx: Transaction):
+        self.tx = tx
+        prevouts = sha256()
+        sequences = sha256()
+        for vin in tx.vin:
+            prevouts.update(bytes(reversed(vin.txid)))
+            prevouts.update(vin.vout.to_bytes(4, "little"))
+            sequences.update(vin.sequence.to_bytes(4, "little"))
+        outputs = sha256()
+        for vout in tx.vout:
+            outputs.update(vout.serialize())
+        self.hash_outputs = sha256(outputs.digest()).digest()
+        self.suffix = self.hash_outputs + tx.locktime.to_bytes(4, "little")
+        self.suffix += (1).to_bytes(4, "little")  # SIGHASH_ALL
+        self.midstate = sha256(tx.version.to_bytes(4, "little"))
+        self.midstate.update(sha256(prevouts.digest()).digest())
+        self.midstate.update(sha256(sequences.digest()).digest())
+
+    def sighash(self, index: int, script_code: bytes, value: int) -> bytes:
+        vin = self.tx.vin[index]
+        h = self.midstate.copy()
+        h.update(bytes(reversed(vin.txid)))
+        h.update(vin.vout.to_bytes(4, "little"))
+        h.update(_varint(len(script_code)))
+        h.update(script_code)
+        h.update(value.to_bytes(8, "little"))
+        h.update(vin.sequence.to_bytes(4, "little"))
+        h.update(self.suffix)
+        return sha256(h.digest()).digest()
+
+
+class WallySighasher:  # pylint: disable=too-few-public-methods
+    """
+    the sighashes of libwally, the transaction is converted to its format
+    once. libwally hashes the prevouts, sequences and outputs again for every
+    input, see benchmarks/bench_sighash.py
+    """
+
+    def __init__(self, wally: Any, tx: Transaction):
+        self.wally = wally
+        self.wally_tx = wally.tx_from_bytes(
+            tx.serialize(), wally.WALLY_TX_FLAG_USE_WITNESS
+        )
+
+    def sighash(self, index: int, script_code: bytes, value: int) -> bytes:
+        wally = self.wally
+        return bytes(
+            wally.tx_get_btc_signature_hash(
+                self.wally_tx,
+                index,
+                script_code,
+                value,
+                wally.WALLY_SIGHASH_ALL,
+                wally.WALLY_TX_FLAG_USE_WITNESS,
+            )
+        )
+
+
+class SigningBackend:
+    """
+    segwit v0 sighashes and ecdsa signatures for BTC transactions, both are
+    per backend. the default sighasher is the midstate one
+    """
+
+    name = ""
+
+    def sighasher(self, tx: Transaction) -> Sighasher:
+        """sighashes of every input of `tx`, sharing the per transaction work"""
+        return Bip143Sighasher(tx)
+
+    def sign(self, secret: bytes, msghash: bytes) -> bytes:
+        """der encoded rfc6979 signature with a low r, without the sighash byte"""
+        raise NotImplementedError
+
+
+class EmbitBackend(SigningBackend):
+    """embit, libsecp256k1 through ctypes or its pure python fallback"""
+
+    name = "embit"
+
+    def sign(self, secret: bytes, msghash: bytes) -> bytes:
+        return ec.PrivateKey(secret).sign(msghash).serialize()
+
+
+class WallyBackend(SigningBackend):
+    """libwally, the same library the liquid path uses"""
+
+    name = "wally"
+
+    def __init__(self):
+        try:
+            import wallycore as wally
+        except ImportError as exc:
+            raise ImportError("`wallycore` is not installed") from exc
+        self.wally = wally
+
+    def sighasher(self, tx: Transaction) -> Sighasher:
+        return WallySighasher(self.wally, tx)
+
+    def sign(self, secret: bytes, msghash: bytes) -> bytes:
+        wally = self.wally
+        flags = wally.EC_FLAG_ECDSA
+        der = wally.ec_sig_to_der(wally.ec_sig_from_bytes(secret, msghash, flags))
+        # grind like embit, until the der signature is at most 70 bytes, so
+        # both produce the same signatures
+        counter = 1
+        while len(der) > 70 and counter <= 200:
+            extra = counter.to_bytes(32, "little")
+            der = wally.ec_sig_to_der(
+                wally.ec_sig_from_bytes_aux(secret, msghash, extra, flags)
+            )
+            counter += 1
+        return bytes(der)
+
+
+# in order of preference, libwally signs a little faster than embit's binding
+# of libsecp256k1, see benchmarks/bench_signing.py
+BACKENDS = {"wally": WallyBackend, "embit": EmbitBackend}
+
+_backend: Optional[SigningBackend] = None
+
+
+def available_backends() -> list[SigningBackend]:
+    backends = []
+    for backend_class in BACKENDS.values():
+        try:
+            backends.append(backend_class())
+        except ImportError:
+            pass
+    return backends
+
+
+def get_backend() -> SigningBackend:
+    """the first available backend of `BACKENDS`, unless one is set"""
+    global _backend  # pylint: disable=global-statement
+    if _backend is None:
+        _backend = available_backends()[0]
+    return _backend
+
+
+def set_backend(name: str) -> SigningBackend:
+    """use backend `name` instead of the preferred one"""
+    global _backend  # pylint: disable=global-statement
+    if name not in BACKENDS:
+        raise ValueError(
+            f"unknown signing backend {name}, choose from: {', '.join(BACKENDS)}"
+        )
+    _backend = BACKENDS[name]()
+    return _backend
@@ -0,0 +1,339 @@
+""" boltz_client swap store, what is needed to follow, claim and refund swaps """
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Iterator, Optional
+
+from .orchestrator import REFUND_STATUSES
+from .watch import FINAL_STATUSES
+
+
+@dataclass
+class SwapRecord:
+    boltz_id: str
+    # "submarine" or "reverse"
+    kind: str
+    pair: str
+    status: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # privkey_wif, preimage_hex, redeem_script_hex, lockup_address, ...
+    data: dict = field(default_factory=dict)
+    txid: Optional[str] = None
+
+    @property
+    def needs_refund(self) -> bool:
+        return (
+            self.kind == "submarine"
+            and self.status in REFUND_STATUSES
+            and bool(self.data.get("refund_address"))
+            and not self.txid
+        )
+
+    @property
+    def final(self) -> bool:
+        """nothing will happen to the swap anymore, refunds are still pending"""
+        return self.status in FINAL_STATUSES and not self.needs_refund
+
+    def copy(self) -> "SwapRecord":
+        return replace(self, data=dict(self.data))
+
+    def to_json(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SwapRecord":
+        return cls(**data)
+
+
+class SwapStore:
+    """
+    base of the swap stores, records handed out are copies, changes are
+    written back with `update`
+    """
+
+    def add(self, record: SwapRecord) -> None:
+        raise NotImplementedError
+
+    def get(self, boltz_id: str) -> Optional[SwapRecord]:
+        raise NotImplementedError
+
+    def update(self, boltz_id: str, **changes) -> SwapRecord:
+        """change fields of a record, raises KeyError for unknown swaps"""
+        raise NotImplementedError
+
+    def records(self, pending: bool = False) -> list[SwapRecord]:
+        """all records by creation time, only those not final if `pending`"""
+        raise NotImplementedError
+
+    def iter_records(self, pending: bool = False) -> Iterator[SwapRecord]:
+        """like `records`, stores on disk read them in batches"""
+        yield from self.records(pending)
+
+    # workers sharing a store own swaps through leases, a lease not renewed
+    # within its ttl expires and the swap can be acquired by another worker
+
+    def heartbeat(self, worker_id: str, ttl: float) -> None:
+        """mark the worker alive and renew all of its leases for `ttl` seconds"""
+        raise NotImplementedError
+
+    def live_workers(self) -> list[str]:
+        """ids of the workers with an unexpired heartbeat, sorted"""
+        raise NotImplementedError
+
+    def acquire(self, boltz_id: str, worker_id: str, ttl: float) -> bool:
+        """lease the swap unless another worker holds an unexpired lease"""
+        raise NotImplementedError
+
+    def release(self, boltz_id: str, worker_id: str) -> None:
+        """give up the lease, if the worker holds it"""
+        raise NotImplementedError
+
+
+class MemorySwapStore(SwapStore):
+    """records of the running process only, thread-safe"""
+
+    def __init__(self):
+        self._records: dict[str, SwapRecord] = {}
+        # boltz id to owner and expiry of its lease, worker id to expiry
+        self._leases: dict[str, tuple[str, float]] = {}
+        self._workers: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, record: SwapRecord) -> None:
+        with self._lock:
+            self._records[record.boltz_id] = record.copy()
+
+    def get(self, boltz_id: str) -> Optional[SwapRecord]:
+        with self._lock:
+            record = self._records.get(boltz_id)
+            return record.copy() if record else None
+
+    def update(self, boltz_id: str, **changes) -> SwapRecord:
+        with self._lock:
+            record = replace(self._records[boltz_id], updated_at=time.time(), **changes)
+            self._records[boltz_id] = record
+            return record.copy()
+
+    def records(self, pending: bool = False) -> list[SwapRecord]:
+        with self._lock:
+            records = [record.copy() for record in self._records.values()]
+        records.sort(key=lambda record: record.created_at)
+        return [record for record in records if not (pending and record.final)]
+
+    def heartbeat(self, worker_id: str, ttl: float) -> None:
+        expires = time.time() + ttl
+        with self._lock:
+            self._workers[worker_id] = expires
+            for boltz_id, (owner, _) in self._leases.items():
+                if owner == worker_id:
+                    self._leases[boltz_id] = (owner, expires)
+
+    def live_workers(self) -> list[str]:
+        now = time.time()
+        with self._lock:
+            return sorted(w for w, expires in self._workers.items() if expires > now)
+
+    def acquire(self, boltz_id: str, worker_id: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            if boltz_id not in self._records:
+                return False
+            owner, expires = self._leases.get(boltz_id, (worker_id, 0))
+            if owner != worker_id and expires > now:
+                return False
+            self._leases[boltz_id] = (worker_id, now + ttl)
+            return True
+
+    def release(self, boltz_id: str, worker_id: str) -> None:
+        with self._lock:
+            if self._leases.get(boltz_id, ("", 0))[0] == worker_id:
+                del self._leases[boltz_id]
+
+
+class SqliteSwapStore(SwapStore):
+    """
+    records in a sqlite database, shared by the processes of one host.
+    leases are taken with a single conditional update, so two workers never
+    own the same swap
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS swaps (
+                    boltz_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    pair TEXT NOT NULL,
+                    status TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    txid TEXT,
+                    owner TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker_id TEXT PRIMARY KEY,
+                    expires REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    @staticmethod
+    def _from_row(row: tuple) -> SwapRecord:
+        boltz_id, kind, pair, status, created_at, updated_at, data, txid = row
+        return SwapRecord(
+            boltz_id, kind, pair, status, created_at, updated_at, json.loads(data), txid
+        )
+
+    def add(self, record: SwapRecord) -> None:
+        self._execute(
+            """
+            INSERT OR REPLACE INTO swaps
+            (boltz_id, kind, pair, status, created_at, updated_at, data, txid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                record.boltz_id,
+                record.kind,
+                record.pair,
+                record.status,
+                record.created_at,
+                record.updated_at,
+                json.dumps(record.data),
+                record.txid,
+            ),
+        )
+
+    def get(self, boltz_id: str) -> Optional[SwapRecord]:
+        row = self._execute(
+            "SELECT boltz_id, kind, pair, status, created_at, updated_at, data, txid"
+            " FROM swaps WHERE boltz_id = ?",
+            (boltz_id,),
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def update(self, boltz_id: str, **changes) -> SwapRecord:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT boltz_id, kind, pair, status, created_at, updated_at, data, txid"
+                    " FROM swaps WHERE boltz_id = ?",
+                    (boltz_id,),
+                ).fetchone()
+                if not row:
+                    raise KeyError(boltz_id)
+                record = replace(self._from_row(row), updated_at=time.time(), **changes)
+                self._conn.execute(
+                    "UPDATE swaps SET status = ?, updated_at = ?, data = ?, txid = ?"
+                    " WHERE boltz_id = ?",
+                    (
+                        record.status,
+                        record.updated_at,
+                        json.dumps(record.data),
+                        record.txid,
+                        boltz_id,
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return record
+
+    @staticmethod
+    def _select(pending: bool) -> tuple[str, tuple]:
+        sql = (
+            "SELECT boltz_id, kind, pair, status, created_at, updated_at, data, txid"
+            " FROM swaps"
+        )
+        params: tuple = ()
+        if pending:
+            # swaps possibly waiting for a refund are checked on the records
+            final = ", ".join("?" * len(FINAL_STATUSES))
+            refund = ", ".join("?" * len(REFUND_STATUSES))
+            sql += (
+                f" WHERE status IS NULL OR status NOT IN ({final}) OR (kind = 'submarine'"
+                f" AND txid IS NULL AND status IN ({refund}))"
+            )
+            params = tuple(FINAL_STATUSES) + tuple(REFUND_STATUSES)
+        return sql + " ORDER BY created_at", params
+
+    def records(self, pending: bool = False) -> list[SwapRecord]:
+        rows = self._execute(*self._select(pending)).fetchall()
+        records = [self._from_row(row) for row in rows]
+        return [record for record in records if not (pending and record.final)]
+
+    def iter_records(
+        self, pending: bool = False, batch_size: int = 500
+    ) -> Iterator[SwapRecord]:
+        # a connection of its own, reading in batches does not block the store
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(*self._select(pending))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    record = self._from_row(row)
+                    if not (pending and record.final):
+                        yield record
+        finally:
+            conn.close()
+
+    def heartbeat(self, worker_id: str, ttl: float) -> None:
+        expires = time.time() + ttl
+        self._execute(
+            "INSERT OR REPLACE INTO workers (worker_id, expires) VALUES (?, ?)",
+            (worker_id, expires),
+        )
+        self._execute(
+            "UPDATE swaps SET lease_expires = ? WHERE owner = ?", (expires, worker_id)
+        )
+
+    def live_workers(self) -> list[str]:
+        rows = self._execute(
+            "SELECT worker_id FROM workers WHERE expires > ? ORDER BY worker_id",
+            (time.time(),),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def acquire(self, boltz_id: str, worker_id: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE swaps SET owner = ?, lease_expires = ?"
+            " WHERE boltz_id = ? AND (owner IS NULL OR owner = ? OR lease_expires <= ?)",
+            (worker_id, now + ttl, boltz_id, worker_id, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, boltz_id: str, worker_id: str) -> None:
+        self._execute(
+            "UPDATE swaps SET owner = NULL, lease_expires = 0"
+            " WHERE boltz_id = ? AND owner = ?",
+            (boltz_id, worker_id),
+        )
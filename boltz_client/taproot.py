@@ -0,0 +1,285 @@
+""" boltz_client taproot swaps, swap trees and key or script path spends of BTC lockups """
+
+from dataclasses import dataclass
+from hashlib import sha256
+from math import ceil
+from typing import Callable, Optional
+
+from embit import ec, script
+from embit.hashes import ripemd160, tagged_hash
+from embit.networks import NETWORKS
+from embit.transaction import Transaction, TransactionInput, TransactionOutput
+
+from .musig import KeyAggContext, MusigException, Session, key_agg, nonce_agg, nonce_gen
+from .onchain import _varint_size, estimate_claim_vsize, find_lockup_output
+from .signing import _varint
+
+LEAF_VERSION = 0xC0
+
+# sequence of a script path refund, enables the locktime
+REFUND_SEQUENCE = 0xFFFFFFFD
+
+# the hash time lock redeem script of a legacy reverse swap, its fee estimate
+# of boltz is for a claim with it
+LEGACY_REDEEM_SCRIPT_SIZE = 106
+
+SCHNORR_SIG_SIZE = 64
+# leaf version and internal key, then the hash of the other leaf
+CONTROL_BLOCK_SIZE = 33 + 32
+
+OP_SIZE = 0x82
+OP_EQUALVERIFY = 0x88
+OP_HASH160 = 0xA9
+OP_CHECKSIG = 0xAC
+OP_CHECKSIGVERIFY = 0xAD
+OP_CHECKLOCKTIMEVERIFY = 0xB1
+
+
+def _push(data: bytes) -> bytes:
+    assert len(data) < 0x4C
+    return bytes([len(data)]) + data
+
+
+def _script_num(n: int) -> bytes:
+    """minimal push of a positive script number, e.g. a block height"""
+    if 0 < n <= 16:
+        return bytes([0x50 + n])
+    data = n.to_bytes((n.bit_length() + 7) // 8, "little")
+    if data[-1] & 0x80:
+        data += b"\x00"
+    return _push(data)
+
+
+def public_key_hex(privkey_wif: str) -> str:
+    return ec.PrivateKey.from_wif(privkey_wif).sec().hex()
+
+
+def xonly(pubkey_hex: str) -> bytes:
+    pubkey = bytes.fromhex(pubkey_hex)
+    if len(pubkey) != 33:
+        raise ValueError("public key is not compressed")
+    return pubkey[1:]
+
+
+def claim_leaf(
+    preimage_hash: bytes, claim_pubkey_hex: str, reverse: bool = False
+) -> bytes:
+    """
+    spendable with the preimage and a signature of the claim key, the one of a
+    reverse swap also checks the preimage size. `preimage_hash` is the sha256
+    of the preimage, the leaf commits to its ripemd160
+    """
+    leaf = (
+        bytes([OP_SIZE]) + _script_num(32) + bytes([OP_EQUALVERIFY]) if reverse else b""
+    )
+    return (
+        leaf
+        + bytes([OP_HASH160])
+        + _push(ripemd160(preimage_hash))
+        + bytes([OP_EQUALVERIFY])
+        + _push(xonly(claim_pubkey_hex))
+        + bytes([OP_CHECKSIG])
+    )
+
+
+def refund_leaf(refund_pubkey_hex: str, timeout_block_height: int) -> bytes:
+    """spendable with a signature of the refund key after the timeout"""
+    return (
+        _push(xonly(refund_pubkey_hex))
+        + bytes([OP_CHECKSIGVERIFY])
+        + _script_num(timeout_block_height)
+        + bytes([OP_CHECKLOCKTIMEVERIFY])
+    )
+
+
+def tap_leaf_hash(leaf: bytes) -> bytes:
+    return tagged_hash("TapLeaf", bytes([LEAF_VERSION]) + _varint(len(leaf)) + leaf)
+
+
+def tap_branch_hash(left: bytes, right: bytes) -> bytes:
+    return tagged_hash("TapBranch", b"".join(sorted([left, right])))
+
+
+@dataclass(frozen=True)
+class SwapTree:
+    """the two leaves of a swap, `swapTree` of the boltz api"""
+
+    claim_leaf: bytes
+    refund_leaf: bytes
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SwapTree":
+        for name in ("claimLeaf", "refundLeaf"):
+            if data[name].get("version", LEAF_VERSION) != LEAF_VERSION:
+                raise ValueError(f"unknown leaf version of {name}")
+        return cls(
+            bytes.fromhex(data["claimLeaf"]["output"]),
+            bytes.fromhex(data["refundLeaf"]["output"]),
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "claimLeaf": {"version": LEAF_VERSION, "output": self.claim_leaf.hex()},
+            "refundLeaf": {"version": LEAF_VERSION, "output": self.refund_leaf.hex()},
+        }
+
+    @property
+    def merkle_root(self) -> bytes:
+        return tap_branch_hash(
+            tap_leaf_hash(self.claim_leaf), tap_leaf_hash(self.refund_leaf)
+        )
+
+
+class TaprootSwap:
+    """
+    the lockup output of a swap: the musig2 aggregate of the boltz key and our
+    key, tweaked with the swap tree. both keys together spend it by the key
+    path, on their own the leaves of the tree allow the claim or the refund
+    """
+
+    def __init__(self, boltz_pubkey_hex: str, our_pubkey_hex: str, tree: SwapTree):
+        self.boltz_pubkey = bytes.fromhex(boltz_pubkey_hex)
+        self.our_pubkey = bytes.fromhex(our_pubkey_hex)
+        self.tree = tree
+        # boltz orders its key first
+        self.internal = key_agg([self.boltz_pubkey, self.our_pubkey])
+        tweak = tagged_hash("TapTweak", self.internal.xonly + tree.merkle_root)
+        self.tweaked: KeyAggContext = self.internal.apply_xonly_tweak(tweak)
+
+    @property
+    def output_key(self) -> bytes:
+        return self.tweaked.xonly
+
+    @property
+    def script_pubkey(self) -> bytes:
+        return b"\x51\x20" + self.output_key
+
+    def address(self, network: str) -> str:
+        return script.Script(self.script_pubkey).address(NETWORKS[network])
+
+    def control_block(self, leaf: bytes) -> bytes:
+        tree = self.tree
+        if leaf == tree.claim_leaf:
+            sibling = tap_leaf_hash(tree.refund_leaf)
+        elif leaf == tree.refund_leaf:
+            sibling = tap_leaf_hash(tree.claim_leaf)
+        else:
+            raise ValueError("leaf is not in the swap tree")
+        parity = self.tweaked.q[1] & 1
+        return bytes([LEAF_VERSION | parity]) + self.internal.xonly + sibling
+
+
+def taproot_sighash(
+    tx: Transaction,
+    index: int,
+    script_pubkeys: list[bytes],
+    amounts: list[int],
+    leaf: Optional[bytes] = None,
+) -> bytes:
+    """bip341 SIGHASH_DEFAULT hash of input `index`, of the script path of `leaf`"""
+    prevouts = b"".join(
+        bytes(reversed(vin.txid)) + vin.vout.to_bytes(4, "little") for vin in tx.vin
+    )
+    sequences = b"".join(vin.sequence.to_bytes(4, "little") for vin in tx.vin)
+    msg = b"\x00\x00"  # epoch, hash type
+    msg += tx.version.to_bytes(4, "little") + tx.locktime.to_bytes(4, "little")
+    msg += sha256(prevouts).digest()
+    msg += sha256(b"".join(amount.to_bytes(8, "little") for amount in amounts)).digest()
+    msg += sha256(b"".join(_varint(len(spk)) + spk for spk in script_pubkeys)).digest()
+    msg += sha256(sequences).digest()
+    msg += sha256(b"".join(vout.serialize() for vout in tx.vout)).digest()
+    # spend type: extension flag, no annex
+    msg += bytes([2 if leaf is not None else 0]) + index.to_bytes(4, "little")
+    if leaf is not None:
+        msg += tap_leaf_hash(leaf) + b"\x00" + b"\xff\xff\xff\xff"
+    return tagged_hash("TapSighash", msg)
+
+
+def estimate_taproot_vsize(witness_items: list[int], output_script_size: int) -> int:
+    """vsize of a transaction with one taproot input and one output"""
+    base = 4 + 1 + (36 + 1 + 4) + 1 + 4
+    base += 8 + _varint_size(output_script_size) + output_script_size
+    witness = 2 + _varint_size(len(witness_items))
+    witness += sum(_varint_size(size) + size for size in witness_items)
+    return ceil((base * 4 + witness) / 4)
+
+
+def key_path_vsize(output_script_size: int) -> int:
+    return estimate_taproot_vsize([SCHNORR_SIG_SIZE], output_script_size)
+
+
+def script_path_vsize(
+    leaf: bytes, output_script_size: int, preimage: bool = False
+) -> int:
+    items = [SCHNORR_SIG_SIZE, len(leaf), CONTROL_BLOCK_SIZE]
+    if preimage:
+        items.insert(1, 32)
+    return estimate_taproot_vsize(items, output_script_size)
+
+
+def taproot_fees(legacy_fees: int, vsize: int, output_script_size: int) -> int:
+    """the fee rate of the legacy estimate of boltz, for a spend of `vsize`"""
+    legacy_vsize = estimate_claim_vsize([LEGACY_REDEEM_SCRIPT_SIZE], output_script_size)
+    return ceil(legacy_fees * vsize / legacy_vsize)
+
+
+def create_taproot_tx(
+    swap: TaprootSwap,
+    lockup_rawtx: str,
+    receive_address: str,
+    fees: int,
+    sequence: int = 0xFFFFFFFF,
+    locktime: int = 0,
+) -> tuple[Transaction, int]:
+    """the unsigned spend of the lockup output and the amount it spends"""
+    txid, vout_index, vout_amount = find_lockup_output(lockup_rawtx, swap.script_pubkey)
+    tx = Transaction(
+        vin=[TransactionInput(txid, vout_index, sequence=sequence)],
+        vout=[
+            TransactionOutput(
+                vout_amount - fees, script.address_to_scriptpubkey(receive_address)
+            )
+        ],
+        locktime=locktime,
+    )
+    return tx, vout_amount
+
+
+def sign_script_path(
+    swap: TaprootSwap,
+    tx: Transaction,
+    amount: int,
+    leaf: bytes,
+    privkey_wif: str,
+    preimage: Optional[bytes] = None,
+) -> str:
+    """spend the lockup by `leaf`, the claim leaf needs the `preimage`"""
+    msg = taproot_sighash(tx, 0, [swap.script_pubkey], [amount], leaf)
+    sig = ec.PrivateKey.from_wif(privkey_wif).schnorr_sign(msg).serialize()
+    items = [sig, preimage, leaf, swap.control_block(leaf)]
+    tx.vin[0].witness = script.Witness(items=[i for i in items if i is not None])
+    return bytes.hex(tx.serialize())
+
+
+def sign_key_path(
+    swap: TaprootSwap,
+    tx: Transaction,
+    amount: int,
+    privkey_wif: str,
+    cosign: Callable[[bytes, str], tuple[bytes, bytes]],
+) -> str:
+    """
+    spend the lockup by the key path. `cosign` is called with our public nonce
+    and the unsigned transaction and returns the public nonce and the partial
+    signature of boltz, which is verified before we sign
+    """
+    msg = taproot_sighash(tx, 0, [swap.script_pubkey], [amount])
+    secnonce, pubnonce = nonce_gen(swap.our_pubkey)
+    boltz_pubnonce, boltz_psig = cosign(pubnonce, bytes.hex(tx.serialize()))
+    session = Session(swap.tweaked, nonce_agg([boltz_pubnonce, pubnonce]), msg)
+    if not session.partial_sig_verify(boltz_psig, boltz_pubnonce, swap.boltz_pubkey):
+        raise MusigException("invalid partial signature of boltz")
+    secret = ec.PrivateKey.from_wif(privkey_wif).secret
+    sig = session.partial_sig_agg([boltz_psig, session.sign(secnonce, secret)])
+    tx.vin[0].witness = script.Witness(items=[sig])
+    return bytes.hex(tx.serialize())
@@ -0,0 +1,336 @@
+""" boltz_client taproot swaps of the v2 api, `BoltzClient.taproot` """
+
+from dataclasses import dataclass
+from hashlib import sha256
+from typing import Optional
+
+from .boltz import (
+    BoltzApiException,
+    BoltzClient,
+    BoltzNotFoundException,
+    BoltzPairException,
+    BoltzResponse,
+    BoltzSwapTransactionException,
+    PairInfo,
+)
+from .helpers import slotted
+from .musig import MusigException
+from .onchain import create_key_pair, create_preimage, get_script_pubkey
+from .taproot import (
+    REFUND_SEQUENCE,
+    SwapTree,
+    TaprootSwap,
+    claim_leaf,
+    create_taproot_tx,
+    key_path_vsize,
+    public_key_hex,
+    refund_leaf,
+    script_path_vsize,
+    sign_key_path,
+    sign_script_path,
+    taproot_fees,
+)
+
+
+@slotted
+@dataclass
+class BoltzTaprootSwapResponse(BoltzResponse):
+    id: str
+    bip21: str
+    address: str
+    swapTree: dict
+    claimPublicKey: str
+    acceptZeroConf: bool
+    expectedAmount: int
+    timeoutBlockHeight: int
+    referralId: Optional[str] = None
+
+
+@slotted
+@dataclass
+class BoltzTaprootReverseSwapResponse(BoltzResponse):
+    id: str
+    invoice: str
+    swapTree: dict
+    lockupAddress: str
+    refundPublicKey: str
+    timeoutBlockHeight: int
+    onchainAmount: int
+    referralId: Optional[str] = None
+
+
+class TaprootSwaps:
+    """
+    BTC swaps locked in a taproot output, claimed and refunded by the key path
+    together with boltz or on our own by the leaves of the swap tree
+    """
+
+    def __init__(self, client: BoltzClient):
+        self.client = client
+
+    def create_swap(
+        self, payment_request: str, pair: Optional[str] = None
+    ) -> tuple[str, BoltzTaprootSwapResponse]:
+        """create taproot swap and return private key and boltz response"""
+        info = self._pair_info(pair)
+        invoice = self.client.check_invoice(payment_request, info.pair)
+        refund_privkey_wif, refund_pubkey_hex = create_key_pair(info.network, info.pair)
+        data = self.client.request(
+            "post",
+            "/v2/swap/submarine",
+            json={
+                "from": info.currency,
+                "to": "BTC",
+                "invoice": payment_request,
+                "refundPublicKey": refund_pubkey_hex,
+                "referralId": self.client.referral_id,
+            },
+            headers={"Content-Type": "application/json"},
+        )
+        swap = BoltzTaprootSwapResponse.from_dict(data)
+        self._swap(
+            swap.swapTree,
+            swap.claimPublicKey,
+            refund_pubkey_hex,
+            swap.address,
+            info.pair,
+            claim_leaf(bytes.fromhex(invoice.payment_hash), swap.claimPublicKey),
+            refund_leaf(refund_pubkey_hex, swap.timeoutBlockHeight),
+        )
+        return refund_privkey_wif, swap
+
+    def create_reverse_swap(
+        self, amount: int = 0, pair: Optional[str] = None
+    ) -> tuple[str, str, BoltzTaprootReverseSwapResponse]:
+        """create taproot reverse swap and return privkey, preimage and boltz response"""
+        info = self._pair_info(pair)
+        self.client.check_limits(amount, info.pair)
+        claim_privkey_wif, claim_pubkey_hex = create_key_pair(info.network, info.pair)
+        preimage_hex, preimage_hash = create_preimage()
+        data = self.client.request(
+            "post",
+            "/v2/swap/reverse",
+            json={
+                "from": "BTC",
+                "to": info.currency,
+                "invoiceAmount": amount,
+                "preimageHash": preimage_hash,
+                "claimPublicKey": claim_pubkey_hex,
+                "referralId": self.client.referral_id,
+            },
+            headers={"Content-Type": "application/json"},
+        )
+        swap = BoltzTaprootReverseSwapResponse.from_dict(data)
+        self._swap(
+            swap.swapTree,
+            swap.refundPublicKey,
+            claim_pubkey_hex,
+            swap.lockupAddress,
+            info.pair,
+            claim_leaf(bytes.fromhex(preimage_hash), claim_pubkey_hex, reverse=True),
+            refund_leaf(swap.refundPublicKey, swap.timeoutBlockHeight),
+        )
+        return claim_privkey_wif, preimage_hex, swap
+
+    async def claim_reverse_swap(
+        self,
+        boltz_id: str,
+        lockup_address: str,
+        receive_address: str,
+        privkey_wif: str,
+        preimage_hex: str,
+        swap_tree: dict,
+        boltz_pubkey_hex: str,
+        zeroconf: bool = True,
+        cooperative: bool = True,
+        pair: Optional[str] = None,
+    ) -> str:
+        """
+        claim a taproot reverse swap by the key path, signed together with boltz,
+        or by the claim leaf if boltz refuses to sign or its partial signature
+        is invalid
+        """
+        info = self._pair_info(pair)
+        self.client.validate_address(receive_address, info.pair)
+        preimage = bytes.fromhex(preimage_hex)
+        pubkey_hex = public_key_hex(privkey_wif)
+        leaf = claim_leaf(sha256(preimage).digest(), pubkey_hex, reverse=True)
+        swap = self._swap(
+            swap_tree, boltz_pubkey_hex, pubkey_hex, lockup_address, info.pair, leaf
+        )
+        lockup_rawtx = await self.client.wait_for_lockup_tx(
+            boltz_id, lockup_address, zeroconf, info.pair
+        )
+        legacy_fees = self.client.get_fee_estimation_claim(info.pair)
+        output_size = len(get_script_pubkey(receive_address, info.pair))
+        if cooperative:
+            try:
+                transaction = self._key_path_spend(
+                    swap,
+                    lockup_rawtx,
+                    receive_address,
+                    privkey_wif,
+                    taproot_fees(legacy_fees, key_path_vsize(output_size), output_size),
+                    f"/v2/swap/reverse/{boltz_id}/claim",
+                    preimage=preimage_hex,
+                )
+            except (BoltzApiException, BoltzNotFoundException, MusigException):
+                pass
+            else:
+                return self.client.send_onchain_tx(transaction, info.pair)
+        vsize = script_path_vsize(leaf, output_size, preimage=True)
+        tx, amount = create_taproot_tx(
+            swap,
+            lockup_rawtx,
+            receive_address,
+            taproot_fees(legacy_fees, vsize, output_size),
+        )
+        transaction = sign_script_path(swap, tx, amount, leaf, privkey_wif, preimage)
+        return self.client.send_onchain_tx(transaction, info.pair)
+
+    async def refund_swap(
+        self,
+        boltz_id: str,
+        privkey_wif: str,
+        lockup_address: str,
+        receive_address: str,
+        swap_tree: dict,
+        boltz_pubkey_hex: str,
+        timeout_block_height: int,
+        cooperative: bool = True,
+        pair: Optional[str] = None,
+    ) -> str:
+        """
+        refund a failed taproot swap by the key path, signed together with boltz,
+        or by the refund leaf once `timeout_block_height` is reached. before it
+        the refusal or invalid partial signature of boltz is raised, the refund
+        leaf would not be final yet
+        """
+        info = self._pair_info(pair)
+        self.client.validate_address(receive_address, info.pair)
+        pubkey_hex = public_key_hex(privkey_wif)
+        leaf = refund_leaf(pubkey_hex, timeout_block_height)
+        swap = self._swap(
+            swap_tree, boltz_pubkey_hex, pubkey_hex, lockup_address, info.pair, leaf
+        )
+        lockup_rawtx = await self.client.wait_for_tx(boltz_id)
+        legacy_fees = self.client.get_fee_estimation_refund(info.pair)
+        output_size = len(get_script_pubkey(receive_address, info.pair))
+        if cooperative:
+            try:
+                transaction = self._key_path_spend(
+                    swap,
+                    lockup_rawtx,
+                    receive_address,
+                    privkey_wif,
+                    taproot_fees(legacy_fees, key_path_vsize(output_size), output_size),
+                    f"/v2/swap/submarine/{boltz_id}/refund",
+                )
+            except (BoltzApiException, BoltzNotFoundException, MusigException):
+                if not await self._timeout_reached(
+                    boltz_id, timeout_block_height, info.pair
+                ):
+                    raise
+            else:
+                return self.client.send_onchain_tx(transaction, info.pair)
+        elif not await self._timeout_reached(boltz_id, timeout_block_height, info.pair):
+            raise BoltzSwapTransactionException(
+                f"swap {boltz_id} can not be refunded before block {timeout_block_height}"
+            )
+        tx, amount = create_taproot_tx(
+            swap,
+            lockup_rawtx,
+            receive_address,
+            taproot_fees(
+                legacy_fees, script_path_vsize(leaf, output_size), output_size
+            ),
+            sequence=REFUND_SEQUENCE,
+            locktime=timeout_block_height,
+        )
+        transaction = sign_script_path(swap, tx, amount, leaf, privkey_wif)
+        return self.client.send_onchain_tx(transaction, info.pair)
+
+    async def _timeout_reached(
+        self, boltz_id: str, timeout_block_height: int, pair: str
+    ) -> bool:
+        """by the chain source of the pair, without one by the eta of boltz"""
+        chain_source = self.client.get_chain_source(pair)
+        if chain_source:
+            return await chain_source.get_block_height() >= timeout_block_height
+        res = await self.client.swap_transaction_async(boltz_id)
+        return not res.timeoutEta
+
+    def _pair_info(self, pair: Optional[str] = None) -> PairInfo:
+        info = self.client.pair_info(pair)
+        if info.liquid:
+            raise BoltzPairException(f"taproot swaps are not supported for {info.pair}")
+        return info
+
+    def _swap(
+        self,
+        swap_tree: dict,
+        boltz_pubkey_hex: str,
+        our_pubkey_hex: str,
+        lockup_address: str,
+        pair: str,
+        *leaves: bytes,
+    ) -> TaprootSwap:
+        """
+        the swap of a swap tree of boltz, it has to contain our `leaves` and its
+        output has to be the one of `lockup_address`
+        """
+        try:
+            tree = SwapTree.from_json(swap_tree)
+            swap = TaprootSwap(boltz_pubkey_hex, our_pubkey_hex, tree)
+        except (KeyError, ValueError, MusigException) as exc:
+            raise BoltzApiException(
+                f"boltz api error: invalid swap tree: {exc}"
+            ) from exc
+        for leaf in leaves:
+            if leaf not in (tree.claim_leaf, tree.refund_leaf):
+                raise BoltzApiException("boltz api error: unexpected swap tree")
+        if swap.address(self.client.pair_info(pair).network) != lockup_address:
+            raise BoltzApiException(
+                "boltz api error: lockup address does not match the swap tree"
+            )
+        return swap
+
+    def _key_path_spend(
+        self,
+        swap: TaprootSwap,
+        lockup_rawtx: str,
+        receive_address: str,
+        privkey_wif: str,
+        fees: int,
+        path: str,
+        **params: str,
+    ) -> str:
+        """
+        the key path spend signed together with boltz at `path`, a refusal of
+        boltz raises its api exception, an invalid answer `MusigException`
+        """
+        tx, amount = create_taproot_tx(swap, lockup_rawtx, receive_address, fees)
+
+        def cosign(pubnonce: bytes, transaction: str) -> tuple[bytes, bytes]:
+            data = self.client.request(
+                "post",
+                path,
+                json={
+                    "index": 0,
+                    "transaction": transaction,
+                    "pubNonce": pubnonce.hex(),
+                    **params,
+                },
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                return (
+                    bytes.fromhex(data["pubNonce"]),
+                    bytes.fromhex(data["partialSignature"]),
+                )
+            except (KeyError, ValueError) as exc:
+                raise MusigException(
+                    f"invalid cosign response of boltz: {exc}"
+                ) from exc
+
+        return sign_key_path(swap, tx, amount, privkey_wif, cosign)
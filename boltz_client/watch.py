@@ -0,0 +1,165 @@
+""" boltz_client swap status watcher """
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, Optional
+
+import websockets
+from websockets.exceptions import WebSocketException
+
+from .boltz import (
+    BoltzApiException,
+    BoltzClient,
+    BoltzNotFoundException,
+    BoltzOfflineException,
+    BoltzSwapStatusException,
+)
+
+# a swap does not change its status anymore after reaching one of those
+FINAL_STATUSES = frozenset(
+    [
+        "invoice.settled",
+        "invoice.expired",
+        "invoice.failedToPay",
+        "transaction.claimed",
+        "transaction.refunded",
+        "transaction.failed",
+        "transaction.lockupFailed",
+        "swap.expired",
+    ]
+)
+
+
+@dataclass
+class SwapStatusEvent:
+    boltz_id: str
+    status: Optional[str]
+    timestamp: float
+    previous: Optional[str] = None
+    failure_reason: Optional[str] = None
+    transaction_id: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def final(self) -> bool:
+        return self.error is not None or self.status in FINAL_STATUSES
+
+    def to_json(self) -> dict:
+        return {
+            "timestamp": datetime.fromtimestamp(
+                self.timestamp, tz=timezone.utc
+            ).isoformat(),
+            "id": self.boltz_id,
+            "status": self.status,
+            "previous": self.previous,
+            "failureReason": self.failure_reason,
+            "transactionId": self.transaction_id,
+            "error": self.error,
+        }
+
+
+def poll_status(
+    client: BoltzClient, boltz_id: str, previous: Optional[str] = None
+) -> Optional[SwapStatusEvent]:
+    """fetch the status of a swap, None if the api is not reachable"""
+    try:
+        status = client.swap_status(boltz_id)
+        transaction = status.transaction or {}
+        return SwapStatusEvent(
+            boltz_id,
+            status.status,
+            time.time(),
+            previous=previous,
+            transaction_id=transaction.get("id"),
+        )
+    except BoltzSwapStatusException as exc:
+        return SwapStatusEvent(
+            boltz_id,
+            exc.status,
+            time.time(),
+            previous=previous,
+            failure_reason=exc.message,
+        )
+    except BoltzNotFoundException as exc:
+        return SwapStatusEvent(
+            boltz_id, None, time.time(), previous=previous, error=str(exc)
+        )
+    except BoltzApiException:
+        return None
+
+
+def status_ws_url(api_url: str) -> str:
+    """the websocket of the status stream, `/v2/ws` next to the api"""
+    scheme, rest = api_url.split("://", 1)
+    return f"{'wss' if scheme == 'https' else 'ws'}://{rest.rstrip('/')}/v2/ws"
+
+
+def status_update_event(
+    update: dict, previous: Optional[str] = None
+) -> SwapStatusEvent:
+    """event of one swap of a `swap.update` message of the status stream"""
+    if "error" in update:
+        return SwapStatusEvent(
+            update["id"], None, time.time(), previous=previous, error=update["error"]
+        )
+    transaction = update.get("transaction") or {}
+    return SwapStatusEvent(
+        update["id"],
+        update.get("status"),
+        time.time(),
+        previous=previous,
+        failure_reason=update.get("failureReason"),
+        transaction_id=transaction.get("id"),
+    )
+
+
+async def watch_swaps(
+    client: BoltzClient,
+    boltz_ids: Iterable[str],
+    interval: float = 3,
+) -> AsyncIterator[SwapStatusEvent]:
+    """
+    subscribe to all swaps on one websocket of the status stream and yield
+    an event for every status transition, a swap is dropped after reaching a
+    final status. a lost connection is opened again after `interval` seconds,
+    on subscribing boltz sends the current status of every swap again
+    """
+    if client.offline:
+        raise BoltzOfflineException("offline mode, not watching swaps")
+    last_status: dict[str, Optional[str]] = dict.fromkeys(boltz_ids)
+    url = status_ws_url(client.router.endpoints[0].url)
+    while last_status:
+        try:
+            async with websockets.connect(url) as ws:
+                await ws.send(_subscription("subscribe", list(last_status)))
+                async for message in ws:
+                    data = json.loads(message)
+                    if data.get("event") != "update":
+                        continue
+                    final = []
+                    for update in data.get("args", []):
+                        if update.get("id") not in last_status:
+                            continue
+                        event = status_update_event(update, last_status[update["id"]])
+                        if event.status == event.previous and not event.final:
+                            continue
+                        if event.final:
+                            del last_status[event.boltz_id]
+                            final.append(event.boltz_id)
+                        else:
+                            last_status[event.boltz_id] = event.status
+                        yield event
+                    if not last_status:
+                        return
+                    if final:
+                        await ws.send(_subscription("unsubscribe", final))
+        except (OSError, WebSocketException):
+            pass
+        await asyncio.sleep(interval)
+
+
+def _subscription(op: str, boltz_ids: list[str]) -> str:
+    return json.dumps({"op": op, "channel": "swap.update", "args": boltz_ids})
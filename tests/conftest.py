@@ -1,11 +1,13 @@
 import asyncio
 
+import pytest
 import pytest_asyncio
 from embit.transaction import Transaction
 
 from boltz_client.boltz import BoltzClient, BoltzConfig
+from boltz_client.pairs_cache import PairsCache
 
-from .helpers import get_invoice
+from .helpers import get_invoice, mock_pairs
 
 config = BoltzConfig(
     pairs=["BTC/BTC", "L-BTC/BTC"],
@@ -35,6 +37,21 @@ async def client_liquid():
     yield client
 
 
+@pytest.fixture
+def client_mock(tmp_path):
+    """client with pairs from a fresh cache, it does not need the regtest api"""
+    pairs_cache_path = str(tmp_path / "pairs.json")
+    PairsCache(pairs_cache_path, config.api_url).save(mock_pairs)
+    mock_config = BoltzConfig(
+        pairs=config.pairs,
+        network=config.network,
+        network_liquid=config.network_liquid,
+        api_url=config.api_url,
+        pairs_cache_path=pairs_cache_path,
+    )
+    yield BoltzClient(mock_config)
+
+
 @pytest_asyncio.fixture(scope="session")
 async def raw_tx_invalid():
     tx = Transaction()
@@ -19,6 +19,36 @@ docker_bitcoin_cli = f"bitcoin-cli -rpcuser={docker_bitcoin_rpc} -rpcpassword={d
 docker_elements = "elementsd"
 docker_elements_cli = f"elements-cli -rpcuser={docker_bitcoin_rpc} -rpcpassword={docker_bitcoin_rpc}"
 
+# `/getpairs` response used by tests running without the regtest api
+mock_pairs = {
+    "BTC/BTC": {
+        "limits": {"minimal": 10000, "maximal": 40294967},
+        "fees": {
+            "percentage": 0.5,
+            "percentageSwapIn": 0.1,
+            "minerFees": {
+                "baseAsset": {
+                    "normal": 340,
+                    "reverse": {"claim": 276, "lockup": 306},
+                }
+            },
+        },
+    },
+    "L-BTC/BTC": {
+        "limits": {"minimal": 10000, "maximal": 40294967},
+        "fees": {
+            "percentage": 0.25,
+            "percentageSwapIn": 0.1,
+            "minerFees": {
+                "baseAsset": {
+                    "normal": 147,
+                    "reverse": {"claim": 152, "lockup": 276},
+                }
+            },
+        },
+    },
+}
+
 
 def run_cmd(cmd: str) -> str:
     return run(cmd, shell=True, capture_output=True).stdout.decode("UTF-8").strip()
@@ -64,3 +94,37 @@ def create_onchain_address(pair: str = "BTC/BTC", address_type: str = "bech32")
 def pay_onchain(address: str, sats: int, pair: str = "BTC/BTC") -> str:
     btc = sats / 10**8
     return run_core_cli_cmd(pair, f"sendtoaddress {address} {btc}")
+
+
+def encode_invoice(
+    amount: str = "500u",
+    prefix: str = "lnbcrt",
+    timestamp: Optional[int] = None,
+    expiry: Optional[int] = None,
+    payment_hash: str = "01" * 32,
+    description: str = "test",
+) -> str:
+    """bolt11 invoice with a dummy signature, enough for local decoding"""
+    from boltz_client.bolt11 import CHARSET, _hrp_expand, _polymod
+
+    def to_groups(value: int, length: int) -> list[int]:
+        return [(value >> 5 * i) & 31 for i in reversed(range(length))]
+
+    def bytes_to_groups(data: bytes) -> list[int]:
+        length = (len(data) * 8 + 4) // 5
+        value = int.from_bytes(data, "big") << (length * 5 - len(data) * 8)
+        return to_groups(value, length)
+
+    def tagged(tag: str, groups: list[int]) -> list[int]:
+        return [CHARSET.index(tag)] + to_groups(len(groups), 2) + groups
+
+    data = to_groups(int(time.time()) if timestamp is None else timestamp, 7)
+    data += tagged("p", bytes_to_groups(bytes.fromhex(payment_hash)))
+    data += tagged("d", bytes_to_groups(description.encode()))
+    if expiry is not None:
+        data += tagged("x", to_groups(expiry, max(1, (expiry.bit_length() + 4) // 5)))
+    data += [0] * 104
+    hrp = prefix + amount
+    polymod = _polymod(_hrp_expand(hrp) + data + [0] * 6) ^ 1
+    data += [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + "1" + "".join(CHARSET[group] for group in data)
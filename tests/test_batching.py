@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import os
+from typing import Optional
+
+import pytest
+from embit import ec, script
+from embit.networks import NETWORKS
+from embit.transaction import Transaction, TransactionInput, TransactionOutput
+
+from boltz_client.batching import ClaimBatcher
+from boltz_client.boltz import BroadcastResult
+from boltz_client.chain import ChainSource
+from boltz_client.onchain import ClaimInput, create_batch_claim_tx, estimate_claim_vsize
+
+net = NETWORKS["regtest"]
+receive_address = "bcrt1q0xcqpzrky6eff2g52qdye53xkk9jxkvrl4xfg5"
+
+
+def create_reverse_swap_claim(amount: int = 50000) -> ClaimInput:
+    """a lockup paying to a reverse swap script, like boltz would send it"""
+    claim_key = ec.PrivateKey(os.urandom(32))
+    refund_key = ec.PrivateKey(os.urandom(32))
+    preimage = os.urandom(32)
+    preimage_hash160 = hashlib.new("ripemd160", hashlib.sha256(preimage).digest()).digest()
+    redeem_script = (
+        bytes([0x82, 0x01, 0x20, 0x87, 0x63, 0xA9, 0x14])
+        + preimage_hash160
+        + bytes([0x88, 0x21])
+        + claim_key.sec()
+        + bytes([0x67, 0x75, 0x03])
+        + (500).to_bytes(3, "little")
+        + bytes([0xB1, 0x75, 0x21])
+        + refund_key.sec()
+        + bytes([0x68, 0xAC])
+    )
+    lockup_script = script.p2wsh(script.Script(redeem_script))
+    lockup_tx = Transaction(
+        vin=[TransactionInput(os.urandom(32), 0)],
+        vout=[TransactionOutput(amount, lockup_script)],
+    )
+    return ClaimInput(
+        lockup_address=lockup_script.address(net),
+        lockup_rawtx=lockup_tx.serialize().hex(),
+        privkey_wif=claim_key.wif(net),
+        preimage_hex=preimage.hex(),
+        redeem_script_hex=redeem_script.hex(),
+    )
+
+
+def vsize(tx: Transaction) -> int:
+    full = len(tx.serialize())
+    stripped = len(Transaction(vin=[TransactionInput(i.txid, i.vout) for i in tx.vin], vout=tx.vout).serialize())
+    return (stripped * 3 + full + 3) // 4
+
+
+def verify_batch(rawtx: str, claims: list[ClaimInput]) -> Transaction:
+    tx = Transaction.parse(bytes.fromhex(rawtx))
+    assert len(tx.vin) == len(claims)
+    for index, claim in enumerate(claims):
+        sig, preimage, redeem_script = tx.vin[index].witness.items
+        assert preimage.hex() == claim.preimage_hex
+        assert redeem_script.hex() == claim.redeem_script_hex
+        sighash = tx.sighash_segwit(index, script.Script(redeem_script), 50000)
+        pubkey = ec.PrivateKey.from_wif(claim.privkey_wif).get_public_key()
+        assert pubkey.verify(ec.Signature.parse(sig[:-1]), sighash)
+    return tx
+
+
+@pytest.mark.parametrize("num_claims", [1, 2, 10])
+def test_create_batch_claim_tx(num_claims):
+    claims = [create_reverse_swap_claim() for _ in range(num_claims)]
+    rawtx = create_batch_claim_tx(claims, receive_address, 1000)
+    tx = verify_batch(rawtx, claims)
+    assert len(tx.vout) == 1
+    assert tx.vout[0].value == 50000 * num_claims - 1000
+    estimate = estimate_claim_vsize([len(claim.redeem_script_hex) // 2 for claim in claims], 22)
+    # signatures may be a byte shorter than assumed
+    assert 0 <= estimate - vsize(tx) <= num_claims
+
+
+def test_create_batch_claim_tx_empty():
+    with pytest.raises(ValueError):
+        create_batch_claim_tx([], receive_address, 1000)
+
+
+class MockChainSource(ChainSource):
+    def __init__(self, height: int):
+        super().__init__("BTC")
+        self.height = height
+
+    async def find_lockup(self, script_pubkey: bytes, zeroconf: bool = True) -> Optional[str]:
+        return None
+
+    async def get_block_height(self) -> int:
+        return self.height
+
+
+@pytest.fixture
+def batcher_client(client_mock, monkeypatch):
+    client_mock.broadcasted = []
+
+    def broadcast_tx(rawtx, pair=None):
+        client_mock.broadcasted.append(rawtx)
+        return BroadcastResult(f"txid{len(client_mock.broadcasted)}", "boltz", 0)
+
+    monkeypatch.setattr(client_mock, "broadcast_tx", broadcast_tx)
+    yield client_mock
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_after_window(batcher_client):
+    batcher = ClaimBatcher(batcher_client, receive_address, window=0.05)
+    claims = [create_reverse_swap_claim() for _ in range(3)]
+    txids = await asyncio.gather(*(batcher.add(claim, 1000) for claim in claims))
+    assert txids == ["txid1"] * 3
+    assert len(batcher_client.broadcasted) == 1
+    verify_batch(batcher_client.broadcasted[0], claims)
+
+    batch = batcher.batches[0]
+    assert batch.claims == 3
+    claim_fee = batcher_client.get_fee_estimation_claim()
+    assert batch.individual_fees == 3 * claim_fee
+    assert 0 < batch.fee < batch.individual_fees
+    assert batcher.fees_saved == batch.fees_saved > 0
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_at_max_claims(batcher_client):
+    batcher = ClaimBatcher(batcher_client, receive_address, window=60, max_claims=2)
+    txids = await asyncio.wait_for(
+        asyncio.gather(*(batcher.add(create_reverse_swap_claim(), 1000) for _ in range(4))),
+        timeout=5,
+    )
+    assert txids[0] == txids[1] != txids[2] == txids[3]
+    assert [batch.claims for batch in batcher.batches] == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_urgent_claims(batcher_client):
+    batcher_client._cfg.chain_sources = [MockChainSource(height=995)]
+    batcher = ClaimBatcher(batcher_client, receive_address, window=60, urgent_blocks=6)
+    waiting = asyncio.ensure_future(batcher.add(create_reverse_swap_claim(), 1100))
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+    # the urgent claim takes the waiting one along
+    txid = await asyncio.wait_for(batcher.add(create_reverse_swap_claim(), 1000), timeout=5)
+    assert txid == await waiting == "txid1"
+    assert batcher.batches[0].claims == 2
+
+
+@pytest.mark.asyncio
+async def test_batcher_passes_errors_to_claims(batcher_client, monkeypatch):
+    def broadcast_tx(rawtx, pair=None):
+        raise ValueError("broadcast failed")
+
+    monkeypatch.setattr(batcher_client, "broadcast_tx", broadcast_tx)
+    batcher = ClaimBatcher(batcher_client, receive_address, window=0.01)
+    with pytest.raises(ValueError, match="broadcast failed"):
+        await batcher.add(create_reverse_swap_claim(), 1000)
+    assert not batcher.batches
+
+
+def test_batcher_is_btc_only(client_mock):
+    with pytest.raises(ValueError):
+        ClaimBatcher(client_mock, receive_address, pair="L-BTC/BTC")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "field, value",
+    [
+        ("preimage_hex", os.urandom(32).hex()),
+        ("privkey_wif", ec.PrivateKey(os.urandom(32)).wif(net)),
+        ("lockup_rawtx", "00"),
+        ("lockup_address", receive_address),
+    ],
+)
+async def test_batcher_rejects_only_invalid_claims(batcher_client, field, value):
+    batcher = ClaimBatcher(batcher_client, receive_address, window=0.01)
+    claims = [create_reverse_swap_claim() for _ in range(3)]
+    setattr(claims[1], field, value)
+    results = await asyncio.gather(*(batcher.add(claim, 1000) for claim in claims), return_exceptions=True)
+    assert results[0] == results[2] == "txid1"
+    assert isinstance(results[1], ValueError)
+    assert len(batcher_client.broadcasted) == 1
+    verify_batch(batcher_client.broadcasted[0], [claims[0], claims[2]])
+    assert batcher.batches[0].claims == 2
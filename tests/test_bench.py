@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from boltz_client import orchestrator
+from boltz_client.bench import job_factory, percentile, run_bench, run_command
+from boltz_client.boltz import (
+    BoltzReverseSwapResponse,
+    BoltzSwapStatusResponse,
+    BroadcastResult,
+)
+
+address = "bcrt1q0xcqpzrky6eff2g52qdye53xkk9jxkvrl4xfg5"
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3
+    assert percentile([], 50) == 0
+
+
+def test_run_command():
+    assert run_command("echo {amount} sats", amount=50000) == "50000 sats"
+
+
+def test_submarine_jobs_need_invoices():
+    with pytest.raises(ValueError):
+        job_factory("submarine", 50000, address)
+    make_job = job_factory("submarine", 50000, address, invoice_command="echo lnbcrt{amount}")
+    assert make_job(0).payment_request == "lnbcrt50000"
+
+
+@pytest.mark.asyncio
+async def test_run_bench(client_mock, monkeypatch):
+    client = client_mock
+    monkeypatch.setattr(
+        client,
+        "_create_reverse_swap",
+        lambda amount, preimage_hash, claim_pubkey_hex, pair: BoltzReverseSwapResponse(
+            id=preimage_hash,
+            invoice="lnbcrt1",
+            redeemScript="00",
+            lockupAddress=address,
+            timeoutBlockHeight=100,
+            onchainAmount=amount,
+        ),
+    )
+    monkeypatch.setattr(
+        client,
+        "swap_status",
+        lambda boltz_id: BoltzSwapStatusResponse(
+            status="transaction.mempool", transaction={"hex": "lockup"}
+        ),
+    )
+    monkeypatch.setattr(
+        client, "broadcast_tx", lambda rawtx, pair=None: BroadcastResult("txid", "boltz", 0)
+    )
+    monkeypatch.setattr(orchestrator, "create_claim_tx", lambda **kwargs: "claim")
+
+    report = await run_bench(
+        client,
+        job_factory("reverse", 50000, address),
+        concurrency=4,
+        duration=0.2,
+        drain_timeout=5,
+        poll_interval=0.001,
+    )
+    assert report.started > 0
+    assert report.completed == report.started
+    assert report.failed == 0
+    assert report.throughput > 0
+    assert [stats.phase for stats in report.phases] == [
+        "create",
+        "wait-for-lockup",
+        "build",
+        "broadcast",
+    ]
+    for stats in report.phases:
+        assert stats.count == report.started
+        assert stats.p50 <= stats.p95 <= stats.p99
+
+    data = json.loads(json.dumps(report.to_json()))
+    assert data["phases"][0]["phase"] == "create"
+    table = report.table()
+    assert "wait-for-lockup" in table
+    assert "swaps/s" in table
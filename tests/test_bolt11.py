@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from boltz_client.bolt11 import CHARSET, _parse_tagged_fields, bech32_decode, decode
+from boltz_client.boltz import BoltzApiException, BoltzInvoiceException, BoltzLimitException
+
+from .helpers import encode_invoice
+
+# from the examples of the bolt11 specification
+spec_invoice = (
+    "lnbc1pvjluezsp5zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zygspp5qqqsyqcyq5rqwzqfqqqsyqcyq5rqw"
+    "zqfqqqsyqcyq5rqwzqfqypqdpl2pkx2ctnv5sxxmmwwd5kgetjypeh2ursdae8g6twvus8g6rfwvs8qun0dfjkxaq9qrsgq357wnc"
+    "5r2ueh7ck6q93dj32dlqnls087fxdwk8qakdyafkq3yap9us6v52vjjsrvywa6rt52cm9r9zqt8r2t7mlcwspyetp5h2tztugp9lfyql"
+)
+
+
+def test_parse_tagged_fields():
+    x, p, unknown = CHARSET.index("x"), CHARSET.index("p"), CHARSET.index("s")
+    # the first expiry counts, a payment hash of the wrong length is skipped
+    data = [x, 0, 1, 5, unknown, 0, 2, 1, 2, p, 0, 1, 3, x, 0, 1, 7]
+    assert _parse_tagged_fields(data) == {"expiry": 5}
+    with pytest.raises(ValueError):
+        _parse_tagged_fields([x, 0, 2, 5])
+
+
+def test_decode_spec_invoice():
+    invoice = decode(spec_invoice)
+    assert invoice.network == "main"
+    assert invoice.amount_msat is None
+    assert invoice.amount_sat is None
+    assert invoice.timestamp == 1496314658
+    assert invoice.payment_hash == "0001020304050607080900010203040506070809000102030405060708090102"
+    assert invoice.description == "Please consider supporting this project"
+    assert invoice.expiry == 3600
+
+
+@pytest.mark.parametrize(
+    "amount, amount_msat",
+    [("", None), ("2500u", 250000000), ("20m", 2000000000), ("1", 100000000000), ("10n", 1000), ("10p", 1)],
+)
+def test_decode_amount(amount, amount_msat):
+    assert decode(encode_invoice(amount=amount)).amount_msat == amount_msat
+
+
+@pytest.mark.parametrize(
+    "prefix, network",
+    [("lnbc", "main"), ("lntb", "test"), ("lntbs", "signet"), ("lnbcrt", "regtest")],
+)
+def test_decode_network(prefix, network):
+    assert decode(encode_invoice(prefix=prefix)).network == network
+
+
+def test_decode_expiry():
+    invoice = decode(encode_invoice(timestamp=1000, expiry=600))
+    assert invoice.expiry == 600
+    assert invoice.expires_at == 1600
+    assert invoice.is_expired(now=1600)
+    assert not invoice.is_expired(now=1599)
+
+
+@pytest.mark.parametrize("payment_request", ["lnbrc1000000", "lnbcrt1p", encode_invoice(amount="1p"), "invalid"])
+def test_decode_invalid(payment_request):
+    with pytest.raises(ValueError):
+        decode(payment_request)
+
+
+def test_decode_invalid_checksum():
+    payment_request = encode_invoice()
+    last = "q" if payment_request[-1] != "q" else "p"
+    with pytest.raises(ValueError, match="checksum"):
+        bech32_decode(payment_request[:-1] + last)
+
+
+def test_decode_is_cached():
+    payment_request = encode_invoice()
+    assert decode(payment_request) is decode(payment_request)
+
+
+def test_check_invoice(client_mock):
+    invoice = client_mock.check_invoice(encode_invoice(amount="500u", payment_hash="ab" * 32))
+    assert invoice.amount_sat == 50000
+    assert invoice.payment_hash == "ab" * 32
+
+
+@pytest.mark.parametrize(
+    "payment_request, exception",
+    [
+        ("invalid", BoltzInvoiceException),
+        (encode_invoice(prefix="lntb"), BoltzInvoiceException),
+        (encode_invoice(amount=""), BoltzInvoiceException),
+        (encode_invoice(timestamp=int(time.time()) - 7200), BoltzInvoiceException),
+        (encode_invoice(amount="1u"), BoltzLimitException),
+    ],
+)
+def test_create_swap_rejects_invoice_locally(client_mock, monkeypatch, payment_request, exception):
+    def request(*args, **kwargs):
+        raise AssertionError("the api must not be called")
+
+    monkeypatch.setattr(client_mock, "request", request)
+    with pytest.raises(exception):
+        client_mock.create_swap(payment_request)
+
+
+def test_invoice_exception_is_api_exception():
+    assert issubclass(BoltzInvoiceException, BoltzApiException)
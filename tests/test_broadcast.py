@@ -0,0 +1,97 @@
+import time
+
+import httpx
+import pytest
+
+from boltz_client import broadcast as broadcast_module
+from boltz_client.boltz import BoltzApiException
+from boltz_client.broadcast import (
+    BoltzBroadcastException,
+    Broadcaster,
+    EsploraBroadcaster,
+    RpcBroadcaster,
+    broadcast,
+)
+
+
+class MockBroadcaster(Broadcaster):
+    def __init__(self, name, delay=0.0, error=None, currency=None):
+        super().__init__(name, currency)
+        self.delay = delay
+        self.error = error
+        self.sent = []
+
+    def send(self, rawtx, currency):
+        self.sent.append(rawtx)
+        time.sleep(self.delay)
+        if self.error:
+            raise ValueError(self.error)
+        return "txid"
+
+
+def test_broadcast_first_success():
+    slow = MockBroadcaster("slow", delay=0.5)
+    failing = MockBroadcaster("failing", error="bad-txns")
+    fast = MockBroadcaster("fast", delay=0.05)
+    start = time.perf_counter()
+    result = broadcast("00", "BTC", [slow, failing, fast])
+    assert time.perf_counter() - start < 0.4
+    assert result.txid == "txid"
+    assert result.backend == "fast"
+    assert result.errors == {"failing": "bad-txns"}
+    assert slow.sent == failing.sent == fast.sent == ["00"]
+    assert fast.average_latency is not None
+    assert failing.failures == 1
+    time.sleep(0.5)
+    assert len(slow.latencies) == 1
+
+
+def test_broadcast_all_fail():
+    backends = [MockBroadcaster("a", error="a failed"), MockBroadcaster("b", error="b failed")]
+    with pytest.raises(BoltzBroadcastException) as exc_info:
+        broadcast("00", "BTC", backends)
+    assert exc_info.value.errors == {"a": "a failed", "b": "b failed"}
+    assert isinstance(exc_info.value, BoltzApiException)
+
+
+def test_broadcast_currency():
+    btc = MockBroadcaster("btc", currency="BTC")
+    lbtc = MockBroadcaster("lbtc", currency="L-BTC")
+    assert broadcast("00", "L-BTC", [btc, lbtc]).backend == "lbtc"
+    assert not btc.sent
+    with pytest.raises(ValueError):
+        broadcast("00", "L-BTC", [btc])
+
+
+def test_esplora_broadcaster(monkeypatch):
+    def mock_req_wrap(funcname, url, **kwargs):
+        assert (funcname, url, kwargs["content"]) == ("post", "http://electrs/tx", "00")
+        return {"text": "txid\n"}
+
+    monkeypatch.setattr(broadcast_module, "req_wrap", mock_req_wrap)
+    assert EsploraBroadcaster("http://electrs/").send("00", "BTC") == "txid"
+
+
+def test_rpc_broadcaster(monkeypatch):
+    def mock_req_wrap(funcname, url, **kwargs):
+        assert kwargs["auth"] == ("boltz", "boltz")
+        assert kwargs["json"]["params"] == ["00"]
+        return {"result": "txid", "error": None}
+
+    monkeypatch.setattr(broadcast_module, "req_wrap", mock_req_wrap)
+    rpc = RpcBroadcaster("http://bitcoind:18443", "boltz", "boltz")
+    assert rpc.send("00", "BTC") == "txid"
+
+
+def test_rpc_broadcaster_error(monkeypatch):
+    def mock_req_wrap(funcname, url, **kwargs):
+        request = httpx.Request("POST", url)
+        response = httpx.Response(
+            500, request=request, json={"result": None, "error": {"message": "bad-txns"}}
+        )
+        response.raise_for_status()
+
+    monkeypatch.setattr(broadcast_module, "req_wrap", mock_req_wrap)
+    rpc = RpcBroadcaster("http://bitcoind:18443", "boltz", "boltz")
+    with pytest.raises(ValueError, match="bad-txns"):
+        rpc.send("00", "BTC")
@@ -0,0 +1,86 @@
+import pytest
+
+from boltz_client import boltz
+from boltz_client.boltz import (
+    BoltzApiException,
+    BoltzInvoiceException,
+    BoltzLimitException,
+    BoltzReverseSwapResponse,
+    BoltzSwapResponse,
+)
+
+from .helpers import encode_invoice
+
+
+def mock_createswap(funcname, url, **kwargs) -> dict:
+    assert funcname == "post"
+    assert url.endswith("/createswap")
+    data = kwargs["json"]
+    if data["type"] == "submarine":
+        if data["invoice"] == "invalid":
+            raise BoltzApiException("boltz api status error: invalid invoice")
+        return {
+            "id": data["invoice"],
+            "bip21": "bitcoin:bcrt1q",
+            "address": "bcrt1q",
+            "redeemScript": "00",
+            "acceptZeroConf": False,
+            "expectedAmount": 50000,
+            "timeoutBlockHeight": 100,
+        }
+    return {
+        "id": str(data["invoiceAmount"]),
+        "invoice": "lnbcrt1",
+        "redeemScript": "00",
+        "lockupAddress": "bcrt1q",
+        "timeoutBlockHeight": 100,
+        "onchainAmount": data["invoiceAmount"],
+    }
+
+
+@pytest.fixture
+def client_bulk(client_mock, monkeypatch):
+    monkeypatch.setattr(boltz, "req_wrap", mock_createswap)
+    yield client_mock
+
+
+def test_create_reverse_swaps(client_bulk):
+    amounts = [20000, 1, 30000, 50000]
+    results = client_bulk.create_reverse_swaps(amounts, max_concurrency=2)
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert [result.request for result in results] == amounts
+    assert isinstance(results[1].error, BoltzLimitException)
+    assert results[1].swap is None
+    for result in (results[0], results[2], results[3]):
+        assert result.error is None
+        assert isinstance(result.swap, BoltzReverseSwapResponse)
+        assert result.swap.id == str(result.request)
+        assert result.privkey_wif and result.preimage_hex
+    assert len({result.preimage_hex for result in results if result.swap}) == 3
+
+
+def test_create_swaps(client_bulk):
+    invoices = [encode_invoice(payment_hash="01" * 32), "invalid", encode_invoice(payment_hash="02" * 32)]
+    results = client_bulk.create_swaps(invoices)
+    assert isinstance(results[1].error, BoltzApiException)
+    assert isinstance(results[0].swap, BoltzSwapResponse)
+    assert results[2].swap and results[2].swap.id == invoices[2]
+    assert results[0].privkey_wif != results[2].privkey_wif
+    assert results[0].payment_hash == "01" * 32
+
+
+def test_create_swaps_checks_invoices_locally(client_bulk):
+    invoices = [
+        encode_invoice(prefix="lnbc"),
+        encode_invoice(amount=""),
+        encode_invoice(timestamp=1000),
+        encode_invoice(amount="1u"),
+    ]
+    results = client_bulk.create_swaps(invoices)
+    for result in results[:3]:
+        assert isinstance(result.error, BoltzInvoiceException)
+    assert isinstance(results[3].error, BoltzLimitException)
+
+
+def test_create_swaps_empty(client_bulk):
+    assert not client_bulk.create_swaps([])
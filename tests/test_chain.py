@@ -0,0 +1,115 @@
+from hashlib import sha256
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+from boltz_client import chain
+from boltz_client.boltz import BoltzApiException
+from boltz_client.chain import ChainSource, EsploraChainSource
+
+lockup_address = "bcrt1qky0es27zfejlr3grpfl4pj47w7yfm0atwqdf3y"
+lockup_script_pubkey = bytes.fromhex("0014b11f982bc24e65f1c5030a7f50cabe77889dbfab")
+
+
+class LocalChainSource(ChainSource):
+    """stand-in for our node, the lockup shows up after some lookups"""
+
+    def __init__(self, rawtx: str, after: int = 0, error: Optional[Exception] = None):
+        super().__init__("BTC")
+        self.rawtx = rawtx
+        self.after = after
+        self.error = error
+        self.lookups = 0
+
+    async def find_lockup(self, script_pubkey: bytes, zeroconf: bool = True) -> Optional[str]:
+        assert script_pubkey == lockup_script_pubkey
+        self.lookups += 1
+        if self.error:
+            raise self.error
+        return self.rawtx if self.lookups > self.after else None
+
+    async def get_block_height(self) -> int:
+        return 100
+
+
+def test_chain_source_is_abstract():
+    with pytest.raises(TypeError):
+        ChainSource("BTC")  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_wait_for_lockup():
+    source = LocalChainSource("rawtx", after=2)
+    assert await source.wait_for_lockup(lockup_script_pubkey, interval=0) == "rawtx"
+    assert source.lookups == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("zeroconf, expected", [(True, "mempool"), (False, "confirmed")])
+async def test_esplora_find_lockup(monkeypatch, zeroconf, expected):
+    scripthash = sha256(lockup_script_pubkey).hexdigest()
+
+    def mock_req_wrap(funcname, url, **kwargs):
+        if url == f"http://electrs/scripthash/{scripthash}/txs":
+            return [
+                {
+                    "txid": "mempool",
+                    "status": {"confirmed": False},
+                    "vout": [{"scriptpubkey": lockup_script_pubkey.hex()}],
+                },
+                {
+                    "txid": "other",
+                    "status": {"confirmed": True},
+                    "vout": [{"scriptpubkey": "0014"}],
+                },
+                {
+                    "txid": "confirmed",
+                    "status": {"confirmed": True},
+                    "vout": [{"scriptpubkey": lockup_script_pubkey.hex()}],
+                },
+            ]
+        assert kwargs["headers"]["Content-Type"] == "text/plain"
+        return {"text": url.split("/")[-2]}
+
+    monkeypatch.setattr(chain, "req_wrap", mock_req_wrap)
+    source = EsploraChainSource("http://electrs/")
+    assert await source.find_lockup(lockup_script_pubkey, zeroconf) == expected
+
+
+@pytest.mark.asyncio
+async def test_client_lockup_from_chain_source(client_mock, monkeypatch):
+    async def swap_status_async(_):
+        raise BoltzApiException("boltz api connection error")
+
+    monkeypatch.setattr(client_mock, "swap_status_async", swap_status_async)
+    client_mock._cfg.chain_sources.append(LocalChainSource("rawtx"))
+    rawtx = await client_mock.wait_for_lockup_tx("id", lockup_address)
+    assert rawtx == "rawtx"
+
+
+@pytest.mark.asyncio
+async def test_client_lockup_chain_source_fails(client_mock, monkeypatch):
+    statuses = 0
+
+    async def swap_status_async(_):
+        nonlocal statuses
+        statuses += 1
+        return SimpleNamespace(status="transaction.mempool", transaction={"hex": "rawtx"})
+
+    monkeypatch.setattr(client_mock, "swap_status_async", swap_status_async)
+    client_mock._cfg.chain_sources.append(LocalChainSource("", error=RuntimeError("node down")))
+    rawtx = await client_mock.wait_for_lockup_tx("id", lockup_address)
+    assert rawtx == "rawtx"
+    assert statuses == 1
+
+
+@pytest.mark.asyncio
+async def test_client_lockup_all_sources_fail(client_mock, monkeypatch):
+    async def swap_status_async(_):
+        raise RuntimeError("status failed")
+
+    monkeypatch.setattr(client_mock, "swap_status_async", swap_status_async)
+    client_mock._cfg.chain_sources.append(LocalChainSource("", error=RuntimeError("node down")))
+    with pytest.raises(RuntimeError):
+        await client_mock.wait_for_lockup_tx("id", lockup_address)
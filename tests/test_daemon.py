@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from boltz_client.boltz import BoltzInvoiceException, BoltzReverseSwapResponse, BoltzSwapStatusResponse
+from boltz_client.daemon import BoltzDaemon, BoltzDaemonException, DaemonClient, is_running
+
+from .helpers import encode_invoice
+
+address = "bcrt1q0xcqpzrky6eff2g52qdye53xkk9jxkvrl4xfg5"
+
+
+@pytest.fixture
+def daemon_client(client_mock, monkeypatch):
+    client_mock.statuses = {}
+    monkeypatch.setattr(
+        client_mock,
+        "_create_reverse_swap",
+        lambda amount, preimage_hash, claim_pubkey_hex, pair: BoltzReverseSwapResponse(
+            id="reverse1",
+            invoice="lnbcrt1",
+            redeemScript="00",
+            lockupAddress=address,
+            timeoutBlockHeight=100,
+            onchainAmount=amount,
+        ),
+    )
+    monkeypatch.setattr(
+        client_mock,
+        "swap_status",
+        lambda boltz_id: BoltzSwapStatusResponse(status=client_mock.statuses.get(boltz_id, "swap.created")),
+    )
+    yield client_mock
+
+
+async def call(socket_path: str, method: str, **params):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, lambda: DaemonClient(socket_path).call(method, **params))
+
+
+@pytest.mark.asyncio
+async def test_daemon(daemon_client, tmp_path):
+    socket_path = str(tmp_path / "daemon.sock")
+    daemon = BoltzDaemon(daemon_client, socket_path, monitor_interval=0.01, pairs_refresh_interval=None)
+    await daemon.start()
+    try:
+        assert is_running(socket_path)
+        assert (await call(socket_path, "ping"))["swaps"] == 0
+        assert await call(socket_path, "get_pairs") == daemon_client.pairs
+
+        remote = DaemonClient(socket_path)
+        loop = asyncio.get_running_loop()
+        privkey_wif, preimage_hex, swap = await loop.run_in_executor(None, remote.create_reverse_swap, 50000)
+        assert swap.id == "reverse1" and swap.onchainAmount == 50000
+
+        record = daemon.store.get("reverse1")
+        assert record and record.kind == "reverse"
+        assert record.data["privkey_wif"] == privkey_wif
+        assert record.data["preimage_hex"] == preimage_hex
+
+        # the monitor follows the stored swaps
+        for status in ("swap.created", "transaction.claimed"):
+            daemon_client.statuses["reverse1"] = status
+            for _ in range(100):
+                if daemon.store.get("reverse1").status == status:
+                    break
+                await asyncio.sleep(0.01)
+            assert daemon.store.get("reverse1").status == status
+        assert await call(socket_path, "list_swaps", pending=True) == []
+    finally:
+        await daemon.stop()
+    assert not is_running(socket_path)
+
+
+@pytest.mark.asyncio
+async def test_daemon_errors(daemon_client, tmp_path):
+    socket_path = str(tmp_path / "daemon.sock")
+    daemon = BoltzDaemon(daemon_client, socket_path, pairs_refresh_interval=None)
+    await daemon.start()
+    try:
+        with pytest.raises(BoltzDaemonException) as exc_info:
+            await call(socket_path, "create_reverse_swap", amount=1)
+        assert exc_info.value.error_type == "BoltzLimitException"
+        with pytest.raises(BoltzDaemonException, match="unknown method"):
+            await call(socket_path, "shutdown")
+        with pytest.raises(BoltzDaemonException):
+            await call(socket_path, "ping", unexpected=1)
+        assert json.loads(json.dumps(await daemon.handle(b"not json")))["error"]["code"] == -32700
+        with pytest.raises(BoltzDaemonException, match="already running"):
+            await BoltzDaemon(daemon_client, socket_path).start()
+    finally:
+        await daemon.stop()
+
+
+@pytest.mark.asyncio
+async def test_daemon_claims_off_the_loop(daemon_client, tmp_path, monkeypatch):
+    async def claim_reverse_swap(**kwargs):
+        # building and broadcasting block the loop they run on
+        time.sleep(0.3)
+        return "txid"
+
+    monkeypatch.setattr(daemon_client, "claim_reverse_swap", claim_reverse_swap)
+    socket_path = str(tmp_path / "daemon.sock")
+    daemon = BoltzDaemon(daemon_client, socket_path, pairs_refresh_interval=None)
+    await daemon.start()
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        claim = asyncio.ensure_future(call(socket_path, "claim_reverse_swap", boltz_id="reverse1"))
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        await call(socket_path, "ping")
+        assert time.monotonic() - start < 0.2
+        assert await claim == "txid"
+    finally:
+        await daemon.stop()
+
+
+@pytest.mark.asyncio
+async def test_daemon_answers_with_pending_claims(daemon_client, tmp_path, monkeypatch):
+    lockup = threading.Event()
+
+    async def claim_reverse_swap(**kwargs):
+        # waits for a lockup, e.g. of an invoice that is never paid
+        while not lockup.is_set():
+            await asyncio.sleep(0.01)
+        return "txid"
+
+    monkeypatch.setattr(daemon_client, "claim_reverse_swap", claim_reverse_swap)
+    socket_path = str(tmp_path / "daemon.sock")
+    daemon = BoltzDaemon(daemon_client, socket_path, pairs_refresh_interval=None, max_workers=2)
+    await daemon.start()
+    loop = asyncio.get_running_loop()
+    remote = ThreadPoolExecutor(max_workers=8)
+    try:
+        claims = [
+            loop.run_in_executor(
+                remote, lambda: DaemonClient(socket_path).call("claim_reverse_swap", boltz_id="reverse1")
+            )
+            for _ in range(6)
+        ]
+        await asyncio.sleep(0.05)
+        ping = loop.run_in_executor(remote, lambda: DaemonClient(socket_path).call("ping"))
+        assert (await asyncio.wait_for(ping, 1))["swaps"] == 0
+        lockup.set()
+        assert await asyncio.gather(*claims) == ["txid"] * 6
+    finally:
+        lockup.set()
+        await daemon.stop()
+        remote.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_daemon_claim_timeout(daemon_client, tmp_path, monkeypatch):
+    async def claim_reverse_swap(**kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(daemon_client, "claim_reverse_swap", claim_reverse_swap)
+    socket_path = str(tmp_path / "daemon.sock")
+    daemon = BoltzDaemon(daemon_client, socket_path, pairs_refresh_interval=None, settle_timeout=0.05)
+    await daemon.start()
+    try:
+        with pytest.raises(BoltzDaemonException) as exc_info:
+            await call(socket_path, "claim_reverse_swap", boltz_id="reverse1")
+        assert exc_info.value.error_type == "TimeoutError"
+    finally:
+        await daemon.stop()
+
+
+def test_daemon_client_decodes_invoices(tmp_path):
+    remote = DaemonClient(str(tmp_path / "daemon.sock"))
+    assert remote.decode_invoice(encode_invoice(payment_hash="ab" * 32)).payment_hash == "ab" * 32
+    with pytest.raises(BoltzInvoiceException):
+        remote.decode_invoice("invalid")
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from boltz_client.endpoints import EndpointRouter
+
+request = httpx.Request("GET", "http://mock")
+
+
+def connect_error():
+    return httpx.ConnectError("unreachable", request=request)
+
+
+def status_error(status_code: int):
+    return httpx.HTTPStatusError(
+        "error", request=request, response=httpx.Response(status_code, request=request)
+    )
+
+
+def test_failover():
+    router = EndpointRouter(["http://down", "http://up"])
+
+    def func(url):
+        if url == "http://down":
+            raise connect_error()
+        return url
+
+    assert router.call(func) == "http://up"
+    down, up = router.endpoints
+    assert down.failures == 1
+    assert up.failures == 0
+    assert up.latency is not None
+    # the measured endpoint is preferred now
+    assert router.ranked()[0] is up
+
+
+def test_client_errors_do_not_fail_over():
+    router = EndpointRouter(["http://a", "http://b"])
+    calls = []
+
+    def func(url):
+        calls.append(url)
+        raise status_error(404)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        router.call(func)
+    assert len(calls) == 1
+    assert router.endpoints[0].failures == 0
+
+
+def test_all_endpoints_down():
+    router = EndpointRouter(["http://a", "http://b"])
+
+    def func(_):
+        raise status_error(502)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        router.call(func)
+    assert [e.failures for e in router.endpoints] == [1, 1]
+
+
+def test_circuit_breaker():
+    router = EndpointRouter(["http://a", "http://b"], failure_threshold=2, cooldown=60)
+    a, b = router.endpoints
+    a.latency, b.latency = 0.1, 0.5
+    router.record_failure(a)
+    assert router.ranked() == [b, a]
+    assert not a.open_until
+    router.record_failure(a)
+    assert router.ranked() == [b, a]
+    assert a.open_until > time.monotonic() + 50
+    router.record_success(a, 0.1)
+    assert not a.open_until
+    assert router.ranked() == [a, b]
+
+
+def test_ewma_latency():
+    router = EndpointRouter(["http://a"], alpha=0.5)
+    endpoint = router.endpoints[0]
+    router.record_success(endpoint, 1.0)
+    router.record_success(endpoint, 0.0)
+    assert endpoint.latency == 0.5
+
+
+def test_hedged_request():
+    router = EndpointRouter(["http://slow", "http://fast"], hedge_after=0.05)
+    router.endpoints[1].latency = 1
+
+    def func(url):
+        if url == "http://slow":
+            time.sleep(0.5)
+        return url
+
+    start = time.perf_counter()
+    assert router.call(func, hedge=True) == "http://fast"
+    assert time.perf_counter() - start < 0.4
+    # not hedged, waits for the preferred endpoint
+    assert router.call(func) in ("http://slow", "http://fast")
+
+
+def test_hedged_request_failover():
+    router = EndpointRouter(["http://down", "http://up"], hedge_after=10)
+
+    def func(url):
+        if url == "http://down":
+            raise connect_error()
+        return url
+
+    start = time.perf_counter()
+    assert router.call(func, hedge=True) == "http://up"
+    assert time.perf_counter() - start < 1
+
+
+def test_hedged_requests_share_the_executor():
+    router = EndpointRouter(
+        ["http://slow", "http://fast"], hedge_after=0.01, hedge_workers=2
+    )
+    router.endpoints[1].latency = 1
+    threads = set()
+
+    def func(url):
+        threads.add(threading.get_ident())
+        if url == "http://slow":
+            time.sleep(0.05)
+        return url
+
+    for _ in range(10):
+        router.call(func, hedge=True)
+    # the abandoned slow requests finish on the two workers of the router
+    assert len(threads) <= 2
+    router.close()
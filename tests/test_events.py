@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from boltz_client.boltz import BoltzSwapStatusResponse
+from boltz_client.events import SwapEvents
+
+
+@pytest.fixture
+def events_client(client_mock, monkeypatch):
+    client_mock.statuses = {}
+    monkeypatch.setattr(
+        client_mock,
+        "swap_status",
+        lambda boltz_id: BoltzSwapStatusResponse(status=client_mock.statuses.get(boltz_id, "swap.created")),
+    )
+    yield client_mock
+
+
+async def wait_for(condition, timeout: float = 5):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+@pytest.mark.asyncio
+async def test_client_on(events_client):
+    seen = []
+    events_client.on("transaction.mempool", lambda event: seen.append((event.boltz_id, event.status)))
+
+    async def on_any(event):
+        seen.append(("*", event.status))
+
+    events_client.on("*", on_any)
+    events = events_client.events
+    events.interval = 0.01
+    events_client.statuses["swap1"] = "transaction.mempool"
+    events.watch("swap1")
+    await wait_for(lambda: len(seen) == 2)
+    events_client.statuses["swap1"] = "invoice.settled"
+    await wait_for(lambda: ("*", "invoice.settled") in seen)
+    await events.join()
+    assert seen.count(("swap1", "transaction.mempool")) == 1
+    # final swaps are not watched anymore
+    assert not events.watched
+    await events.stop()
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_are_isolated(events_client):
+    errors = []
+    seen = []
+    events = SwapEvents(events_client, interval=0.01, on_error=lambda handler, event, exc: errors.append(str(exc)))
+
+    def failing(event):
+        raise ValueError("handler failed")
+
+    events.on("*", failing)
+    events.on("*", lambda event: seen.append(event.status))
+    events.watch("swap1")
+    await wait_for(lambda: seen == ["swap.created"])
+    await events.join()
+    assert errors == ["handler failed"]
+    assert events.watched == {"swap1": "swap.created"}
+    await events.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_handlers_do_not_block_ingestion(events_client):
+    release = asyncio.Event()
+    fast = []
+
+    async def slow(event):
+        await release.wait()
+
+    events = SwapEvents(events_client, interval=0.01, queue_size=2)
+    events.on("*", slow)
+    events.on("*", lambda event: fast.append(event.boltz_id))
+    for i in range(5):
+        events_client.statuses[f"swap{i}"] = "invoice.settled"
+        events.watch(f"swap{i}")
+        await wait_for(lambda: len(fast) == i + 1)
+    slow_queue = events.handlers["*"][0]
+    # the slow handler holds one event, two are queued and the oldest dropped
+    assert slow_queue.dropped == 2
+    release.set()
+    await events.join()
+    await events.stop()
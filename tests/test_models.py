@@ -0,0 +1,62 @@
+from dataclasses import asdict
+
+import pytest
+
+from boltz_client.boltz import (
+    BoltzReverseSwapResponse,
+    BoltzSwapResponse,
+    BoltzSwapStatusResponse,
+    BoltzSwapTransactionResponse,
+)
+
+
+def test_unknown_fields_are_ignored():
+    status = BoltzSwapStatusResponse.from_dict(
+        {"status": "swap.created", "someNewField": True}
+    )
+    assert status == BoltzSwapStatusResponse(status="swap.created")
+    assert not hasattr(status, "someNewField")
+
+
+def test_missing_required_field():
+    with pytest.raises(KeyError):
+        BoltzSwapStatusResponse.from_dict({"failureReason": "no status"})
+
+
+def test_defaults():
+    res = BoltzSwapTransactionResponse.from_dict({})
+    assert asdict(res) == {
+        "transactionId": None,
+        "transactionHex": None,
+        "timeoutEta": None,
+        "timeoutBlockHeight": None,
+        "failureReason": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        BoltzSwapStatusResponse,
+        BoltzSwapTransactionResponse,
+        BoltzSwapResponse,
+        BoltzReverseSwapResponse,
+    ],
+)
+def test_models_are_slotted(model):
+    assert "__dict__" not in dir(model)
+    assert "__slots__" in model.__dict__
+
+
+def test_roundtrip():
+    data = {
+        "id": "abc",
+        "invoice": "lnbcrt1",
+        "redeemScript": "00",
+        "lockupAddress": "bcrt1q",
+        "timeoutBlockHeight": 100,
+        "onchainAmount": 1000,
+        "blindingKey": None,
+        "referralId": None,
+    }
+    assert asdict(BoltzReverseSwapResponse.from_dict(data)) == data
@@ -0,0 +1,68 @@
+import pytest
+
+from boltz_client import boltz
+from boltz_client.boltz import BoltzPairException
+
+from .helpers import mock_pairs
+
+
+def test_pair_infos(client_mock):
+    btc = client_mock.pair_info("BTC/BTC")
+    liquid = client_mock.pair_info("L-BTC/BTC")
+    assert (btc.currency, btc.network, btc.liquid) == ("BTC", "regtest", False)
+    assert (liquid.currency, liquid.network, liquid.liquid) == (
+        "L-BTC",
+        "elementsregtest",
+        True,
+    )
+    # the default pair of the client
+    assert client_mock.pair_info() == btc
+    assert client_mock.network == "regtest"
+
+
+def test_invalid_pair(client_mock):
+    with pytest.raises(BoltzPairException):
+        client_mock.pair_info("ETH/BTC")
+    with pytest.raises(BoltzPairException):
+        client_mock.check_limits(50000, "ETH/BTC")
+
+
+def test_fees_and_limits_per_pair(client_mock):
+    for pair in ("BTC/BTC", "L-BTC/BTC"):
+        assert client_mock.get_fees(pair) == mock_pairs[pair]["fees"]
+        assert client_mock.get_limits(pair) == mock_pairs[pair]["limits"]
+        assert client_mock.get_fee_estimation_claim(pair) == (
+            mock_pairs[pair]["fees"]["minerFees"]["baseAsset"]["reverse"]["claim"]
+        )
+    assert client_mock.fees == mock_pairs["BTC/BTC"]["fees"]
+
+
+def test_create_swaps_on_both_pairs(client_mock, monkeypatch):
+    pair_ids = []
+
+    def mock_req_wrap(funcname, url, **kwargs):
+        assert kwargs["client"] is client_mock.http_client
+        pair_ids.append(kwargs["json"]["pairId"])
+        return {
+            "id": kwargs["json"]["pairId"],
+            "invoice": "lnbcrt1",
+            "redeemScript": "00",
+            "lockupAddress": "bcrt1q",
+            "timeoutBlockHeight": 100,
+            "onchainAmount": 50000,
+        }
+
+    monkeypatch.setattr(boltz, "req_wrap", mock_req_wrap)
+    _, _, swap = client_mock.create_reverse_swap(50000)
+    assert swap.id == "BTC/BTC"
+    _, _, swap = client_mock.create_reverse_swap(50000, pair="L-BTC/BTC")
+    assert swap.id == "L-BTC/BTC"
+    results = client_mock.create_reverse_swaps([50000, 60000], pair="L-BTC/BTC")
+    assert [result.swap.id for result in results] == ["L-BTC/BTC", "L-BTC/BTC"]
+    assert pair_ids == ["BTC/BTC", "L-BTC/BTC", "L-BTC/BTC", "L-BTC/BTC"]
+
+
+def test_client_context_closes_pool(client_mock):
+    with client_mock as client:
+        assert not client.http_client.is_closed
+    assert client_mock.http_client.is_closed
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+from embit import ec
+
+from boltz_client.musig import (
+    MusigException,
+    Session,
+    key_agg,
+    nonce_agg,
+    nonce_gen,
+    pubkey_gen,
+    schnorr_verify,
+)
+
+# bip327 key aggregation vectors
+X = [
+    bytes.fromhex(pubkey)
+    for pubkey in (
+        "02F9308A019258C31049344F85F89D5229B531C845836F99B08601F113BCE036F9",
+        "03DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+        "023590A94E768F8E1815C2F24B4D80A8E3149316C3518CE7B7AD338368D038CA66",
+    )
+]
+
+
+@pytest.mark.parametrize(
+    "indices, expected",
+    [
+        ([0, 1, 2], "90539EEDE565F5D054F32CC0C220126889ED1E5D193BAF15AEF344FE59D4610C"),
+        ([2, 1, 0], "6204DE8B083426DC6EAF9502D27024D53FC826BF7D2012148A0575435DF54B2B"),
+        ([0, 0, 0], "B436E3BAD62B8CD409969A224731C193D051162D8C5AE8B109306127DA3AA935"),
+    ],
+)
+def test_key_agg(indices, expected):
+    assert key_agg([X[i] for i in indices]).xonly.hex().upper() == expected
+
+
+def sign_together(tweak: bytes = b""):
+    secrets = [os.urandom(32), os.urandom(32)]
+    pubkeys = [pubkey_gen(secret) for secret in secrets]
+    ctx = key_agg(pubkeys)
+    if tweak:
+        ctx = ctx.apply_xonly_tweak(tweak)
+    nonces = [nonce_gen(pubkey) for pubkey in pubkeys]
+    msg = os.urandom(32)
+    session = Session(ctx, nonce_agg([pubnonce for _, pubnonce in nonces]), msg)
+    psigs = [session.sign(nonces[i][0], secrets[i]) for i in (0, 1)]
+    for i in (0, 1):
+        assert session.partial_sig_verify(psigs[i], nonces[i][1], pubkeys[i])
+    assert not session.partial_sig_verify(psigs[0], nonces[1][1], pubkeys[1])
+    return ctx, msg, session.partial_sig_agg(psigs)
+
+
+@pytest.mark.parametrize("tweak", [b"", os.urandom(32)])
+def test_sign_and_aggregate(tweak):
+    ctx, msg, sig = sign_together(tweak)
+    assert schnorr_verify(msg, ctx.xonly, sig)
+    pubkey = ec.PublicKey.from_xonly(ctx.xonly)
+    assert pubkey.schnorr_verify(ec.SchnorrSig.parse(sig), msg)
+    assert not schnorr_verify(os.urandom(32), ctx.xonly, sig)
+
+
+def test_nonce_is_used_once():
+    secret = os.urandom(32)
+    pubkey = pubkey_gen(secret)
+    ctx = key_agg([pubkey, pubkey_gen(os.urandom(32))])
+    secnonce, pubnonce = nonce_gen(pubkey)
+    session = Session(ctx, nonce_agg([pubnonce, nonce_gen(pubkey)[1]]), b"\x00" * 32)
+    session.sign(secnonce, secret)
+    with pytest.raises(MusigException):
+        session.sign(secnonce, secret)
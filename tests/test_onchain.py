@@ -1,6 +1,26 @@
+import os
+
 import pytest
+from embit import script
+from embit.transaction import Transaction, TransactionInput, TransactionOutput
+
+from boltz_client.onchain import find_lockup_output, validate_address
+
+lockup_address = "bcrt1qky0es27zfejlr3grpfl4pj47w7yfm0atwqdf3y"
+
 
-from boltz_client.onchain import validate_address
+def create_lockup_tx(num_outputs: int, lockup_index: int, witness: bool = True) -> Transaction:
+    vin = TransactionInput(os.urandom(32), 1)
+    if witness:
+        vin.witness = script.Witness(items=[os.urandom(72), os.urandom(33)])
+    vout = [
+        TransactionOutput(1000 + i, script.Script(bytes([0, 32]) + os.urandom(32)))
+        for i in range(num_outputs)
+    ]
+    vout[lockup_index] = TransactionOutput(
+        50000, script.address_to_scriptpubkey(lockup_address)
+    )
+    return Transaction(vin=[vin], vout=vout, locktime=123)
 
 
 @pytest.mark.asyncio
@@ -30,3 +50,28 @@ async def test_invalid_address(addr, network):
 )
 async def test_valid_address(addr, network):
     validate_address(addr, network, "BTC/BTC")
+
+
+@pytest.mark.parametrize(
+    "num_outputs, lockup_index, witness",
+    [(1, 0, True), (2, 1, True), (300, 150, True), (300, 299, False), (3, 0, False)],
+)
+def test_find_lockup_output(num_outputs, lockup_index, witness):
+    tx = create_lockup_tx(num_outputs, lockup_index, witness)
+    script_pubkey = script.address_to_scriptpubkey(lockup_address).data
+    txid, vout, amount = find_lockup_output(tx.serialize().hex(), script_pubkey)
+    assert txid == tx.txid()
+    assert vout == lockup_index
+    assert amount == 50000
+
+
+def test_find_lockup_output_no_match():
+    tx = create_lockup_tx(3, 0)
+    with pytest.raises(ValueError, match="No matching vout"):
+        find_lockup_output(tx.serialize().hex(), bytes.fromhex("0014" + "00" * 20))
+
+
+@pytest.mark.parametrize("rawtx", ["", "zz", "0200000001", Transaction().serialize().hex()[:-2]])
+def test_find_lockup_output_invalid(rawtx):
+    with pytest.raises(ValueError):
+        find_lockup_output(rawtx, bytes.fromhex("0014" + "00" * 20))
@@ -1,8 +1,12 @@
+import os
+import secrets
+import tracemalloc
+
 import pytest
 import wallycore as wally
 
 from boltz_client.onchain_wally import NETWORKS, get_address_network, Network, is_possible_confidential_address, \
-    decode_address
+    decode_address, create_liquid_tx, lockup_output_cache, unblinded_output_cache, LiquidTxStats
 
 
 @pytest.mark.parametrize(
@@ -67,3 +71,177 @@ def test_decode_address(address: str, blinding_pubkey: str, script_pubkey: str)
     blinding, script = decode_address(wally, NETWORKS[2], address)
     assert blinding.hex() == blinding_pubkey
     assert script.hex() == script_pubkey
+
+
+def create_confidential_address(script_pubkey: bytes, blinding_key: bytes) -> str:
+    address = wally.addr_segwit_from_bytes(script_pubkey, "ert", 0)
+    blinding_pubkey = wally.ec_public_key_from_private_key(blinding_key)
+    return wally.confidential_addr_from_addr_segwit(address, "ert", "el", blinding_pubkey)
+
+
+class LiquidSwap:
+    """a blinded regtest lockup of a swap, built locally without elementsd"""
+
+    def __init__(self, amount: int = 100000):
+        self.amount = amount
+        self.claim_key = os.urandom(32)
+        self.claim_pubkey = wally.ec_public_key_from_private_key(self.claim_key)
+        self.privkey_wif = wally.wif_from_bytes(
+            self.claim_key, wally.WALLY_ADDRESS_VERSION_WIF_TESTNET, wally.WALLY_WIF_FLAG_COMPRESSED
+        )
+        # <pubkey> OP_CHECKSIG is enough to be signed by create_liquid_tx
+        self.redeem_script = bytes([0x21]) + self.claim_pubkey + bytes([0xAC])
+        self.lockup_script = wally.witness_program_from_bytes(self.redeem_script, wally.WALLY_SCRIPT_SHA256)
+        self.blinding_key = os.urandom(32)
+        self.lockup_address = create_confidential_address(self.lockup_script, self.blinding_key)
+        self.receive_address = create_confidential_address(bytes([0, 20]) + os.urandom(20), os.urandom(32))
+        self.lockup_rawtx = self.create_lockup_tx()
+
+    def create_lockup_tx(self, fee: int = 500) -> str:
+        asset_tag = bytearray([1]) + NETWORKS[2].lbtc_asset
+        psbt = wally.psbt_init(wally.WALLY_PSBT_VERSION_2, 1, 2, 0, wally.WALLY_PSBT_INIT_PSET)
+        wally.psbt_add_tx_input_at(psbt, 0, 0, wally.tx_input_init(os.urandom(32), 0, 0xFFFFFFFF, None, None))
+        funding_value = wally.tx_confidential_value_from_satoshi(self.amount + fee)
+        funding = wally.tx_elements_output_init(bytes([0, 20]) + os.urandom(20), asset_tag, funding_value, None)
+        wally.psbt_set_input_witness_utxo(psbt, 0, funding)
+        value = wally.tx_confidential_value_from_satoshi(self.amount)
+        lockup = wally.tx_elements_output_init(self.lockup_script, asset_tag, value, None)
+        wally.psbt_add_tx_output_at(psbt, 0, 0, lockup)
+        blinding_pubkey = wally.ec_public_key_from_private_key(self.blinding_key)
+        wally.psbt_set_output_blinding_public_key(psbt, 0, blinding_pubkey)
+        wally.psbt_set_output_blinder_index(psbt, 0, 0)
+        fee_value = wally.tx_confidential_value_from_satoshi(fee)
+        wally.psbt_add_tx_output_at(psbt, 1, 0, wally.tx_elements_output_init(None, asset_tag, fee_value))
+        values, vbfs, assets, abfs = [wally.map_init(1, None) for _ in range(4)]
+        wally.map_add_integer(values, 0, funding_value)
+        wally.map_add_integer(vbfs, 0, bytes(32))
+        wally.map_add_integer(assets, 0, NETWORKS[2].lbtc_asset)
+        wally.map_add_integer(abfs, 0, bytes(32))
+        wally.psbt_blind(psbt, values, vbfs, assets, abfs, secrets.token_bytes(5 * 32), 0, 0)
+        # the funding input is not checked, any witness finalizes it
+        stack = wally.tx_witness_stack_init(1)
+        wally.tx_witness_stack_add(stack, os.urandom(64))
+        wally.psbt_set_input_final_witness(psbt, 0, stack)
+        return wally.tx_to_hex(wally.psbt_extract(psbt, 0), wally.WALLY_TX_FLAG_USE_WITNESS)
+
+    def claim(self, fees: int = 300, **kwargs) -> str:
+        return create_liquid_tx(
+            lockup_rawtx=self.lockup_rawtx,
+            lockup_address=self.lockup_address,
+            receive_address=self.receive_address,
+            privkey_wif=self.privkey_wif,
+            redeem_script_hex=self.redeem_script.hex(),
+            fees=fees,
+            preimage_hex="00" * 32,
+            blinding_key=self.blinding_key.hex(),
+            **kwargs,
+        )
+
+    def verify_claim(self, rawtx: str) -> None:
+        tx = wally.tx_from_hex(rawtx, wally.WALLY_TX_FLAG_USE_ELEMENTS | wally.WALLY_TX_FLAG_USE_WITNESS)
+        assert wally.tx_get_num_inputs(tx) == 1
+        assert wally.tx_get_num_outputs(tx) == 2
+        lockup = wally.tx_from_hex(self.lockup_rawtx, wally.WALLY_TX_FLAG_USE_ELEMENTS)
+        sighash = wally.tx_get_elements_signature_hash(
+            tx, 0, self.redeem_script, wally.tx_get_output_value(lockup, 0), wally.WALLY_SIGHASH_ALL,
+            wally.WALLY_TX_FLAG_USE_WITNESS,
+        )
+        witness = wally.tx_get_input_witness(tx, 0, 0)
+        signature = wally.ec_sig_from_der(witness[:-1])
+        wally.ec_sig_verify(self.claim_pubkey, sighash, wally.EC_FLAG_ECDSA, signature)
+
+
+@pytest.fixture
+def liquid_swap():
+    lockup_output_cache.clear()
+    unblinded_output_cache.clear()
+    yield LiquidSwap()
+
+
+def test_create_liquid_tx(liquid_swap):
+    liquid_swap.verify_claim(liquid_swap.claim())
+
+
+def test_create_liquid_tx_cached(liquid_swap, monkeypatch):
+    calls = []
+
+    def counted(name):
+        func = getattr(wally, name)
+
+        def wrapper(*args):
+            calls.append(name)
+            return func(*args)
+
+        monkeypatch.setattr(wally, name, wrapper)
+
+    counted("tx_from_hex")
+    counted("asset_unblind")
+    first_claim = liquid_swap.claim()
+    assert calls == ["tx_from_hex", "asset_unblind"]
+    # fee bump of the same lockup
+    second_claim = liquid_swap.claim(fees=600)
+    assert calls == ["tx_from_hex", "asset_unblind"]
+    liquid_swap.verify_claim(first_claim)
+    liquid_swap.verify_claim(second_claim)
+
+
+def test_create_liquid_tx_wrong_blinding_key(liquid_swap):
+    liquid_swap.claim()
+    liquid_swap.blinding_key = os.urandom(32)
+    with pytest.raises(ValueError):
+        liquid_swap.claim()
+
+
+LIQUID_TX_PHASES = [
+    "decode_addresses",
+    "parse_lockup",
+    "unblind",
+    "build_pset",
+    "blind",
+    "sign",
+    "base64_roundtrip",
+    "extract",
+]
+
+
+def test_create_liquid_tx_stats(liquid_swap):
+    stats = LiquidTxStats()
+    liquid_swap.verify_claim(liquid_swap.claim(stats=stats))
+    assert [phase.name for phase in stats.phases] == LIQUID_TX_PHASES
+    assert all(phase.seconds > 0 and phase.allocated is None for phase in stats.phases)
+    assert stats.seconds == pytest.approx(sum(stats.as_dict().values()))
+
+
+def test_create_liquid_tx_stats_allocations(liquid_swap):
+    assert not tracemalloc.is_tracing()
+    stats = LiquidTxStats(trace_allocations=True)
+    liquid_swap.verify_claim(liquid_swap.claim(stats=stats))
+    assert [phase.name for phase in stats.phases] == LIQUID_TX_PHASES
+    assert all(phase.allocated is not None and phase.allocated >= 0 for phase in stats.phases)
+    # tracing is left as it was found
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.asyncio
+async def test_client_reports_liquid_tx_stats(client_mock, liquid_swap, monkeypatch):
+    reported = []
+    client_mock._cfg.liquid_tx_stats = reported.append
+
+    async def wait_for_lockup_tx(*args):
+        return liquid_swap.lockup_rawtx
+
+    monkeypatch.setattr(client_mock, "wait_for_lockup_tx", wait_for_lockup_tx)
+    monkeypatch.setattr(client_mock, "send_onchain_tx", lambda rawtx, pair=None: rawtx)
+    rawtx = await client_mock.claim_reverse_swap(
+        boltz_id="swap",
+        lockup_address=liquid_swap.lockup_address,
+        receive_address=liquid_swap.receive_address,
+        privkey_wif=liquid_swap.privkey_wif,
+        preimage_hex="00" * 32,
+        redeem_script_hex=liquid_swap.redeem_script.hex(),
+        blinding_key=liquid_swap.blinding_key.hex(),
+        pair="L-BTC/BTC",
+    )
+    liquid_swap.verify_claim(rawtx)
+    assert len(reported) == 1
+    assert [phase.name for phase in reported[0].phases] == LIQUID_TX_PHASES
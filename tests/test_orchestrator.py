@@ -0,0 +1,310 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from boltz_client import orchestrator
+from boltz_client.boltz import (
+    BoltzApiException,
+    BoltzInvoiceException,
+    BoltzReverseSwapResponse,
+    BoltzSwapResponse,
+    BoltzSwapStatusException,
+    BoltzSwapStatusResponse,
+    BoltzSwapTransactionException,
+    BoltzSwapTransactionResponse,
+    BroadcastResult,
+)
+from boltz_client.chain import ChainSource
+from boltz_client.orchestrator import (
+    ReverseSwapJob,
+    SubmarineSwapJob,
+    SwapOrchestrator,
+    SwapState,
+)
+
+from .helpers import encode_invoice
+
+address = "bcrt1q0xcqpzrky6eff2g52qdye53xkk9jxkvrl4xfg5"
+
+
+class Concurrency:
+    """counts the calls in flight and remembers the maximum"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.max = 0
+        self.calls = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.calls += 1
+            self.max = max(self.max, self.current)
+        time.sleep(0.005)
+
+    def __exit__(self, *args):
+        with self.lock:
+            self.current -= 1
+
+
+@pytest.fixture
+def client_orchestrated(client_mock, monkeypatch):
+    client = client_mock
+    client.api = Concurrency()
+    client.broadcasts = Concurrency()
+    client.fail_first = set()
+
+    def create_reverse_swap(amount, preimage_hash, claim_pubkey_hex, pair):
+        with client.api:
+            if amount in client.fail_first:
+                client.fail_first.remove(amount)
+                raise BoltzApiException("boltz api connection error")
+            return BoltzReverseSwapResponse(
+                id=str(amount),
+                invoice="lnbcrt1",
+                redeemScript="00",
+                lockupAddress=address,
+                timeoutBlockHeight=100,
+                onchainAmount=amount,
+            )
+
+    def swap_status(boltz_id):
+        with client.api:
+            return BoltzSwapStatusResponse(
+                status="transaction.mempool",
+                transaction={"hex": f"lockup{boltz_id}"},
+            )
+
+    def broadcast_tx(rawtx, pair=None):
+        with client.broadcasts:
+            return BroadcastResult(f"txid-{rawtx}", "boltz", 0.005)
+
+    monkeypatch.setattr(client, "_create_reverse_swap", create_reverse_swap)
+    monkeypatch.setattr(client, "swap_status", swap_status)
+    monkeypatch.setattr(client, "broadcast_tx", broadcast_tx)
+    monkeypatch.setattr(
+        orchestrator, "create_claim_tx", lambda **kwargs: kwargs["lockup_rawtx"]
+    )
+    yield client
+
+
+@pytest.mark.asyncio
+async def test_reverse_swaps_with_limits(client_orchestrated):
+    client = client_orchestrated
+    jobs = [ReverseSwapJob(amount=50000 + i, receive_address=address) for i in range(60)]
+    transitions = []
+    swap_orchestrator = SwapOrchestrator(
+        client,
+        max_jobs=20,
+        queue_size=5,
+        api_concurrency=4,
+        broadcast_concurrency=2,
+        retry_delay=0.001,
+        poll_interval=0.001,
+        on_transition=lambda job: transitions.append(job.state),
+    )
+    await swap_orchestrator.run(jobs)
+
+    assert all(job.state == SwapState.done for job in jobs)
+    assert [job.txid for job in jobs] == [f"txid-lockup{50000 + i}" for i in range(60)]
+    assert client.api.max <= 4
+    assert client.broadcasts.max <= 2
+    assert client.broadcasts.calls == 60
+    assert transitions.count(SwapState.done) == 60
+    for job in jobs:
+        assert set(job.timings) == {
+            SwapState.create,
+            SwapState.wait_lockup,
+            SwapState.build,
+            SwapState.broadcast,
+        }
+        assert job.preimage_hex and job.privkey_wif
+
+
+@pytest.mark.parametrize("final_status", ["invoice.expired", None])
+@pytest.mark.asyncio
+async def test_reverse_swap_without_lockup_fails(
+    client_orchestrated, monkeypatch, final_status
+):
+    # the invoice is never paid, boltz expires the swap or keeps it created
+    status = final_status or "swap.created"
+    monkeypatch.setattr(
+        client_orchestrated,
+        "swap_status",
+        lambda boltz_id: BoltzSwapStatusResponse(status=status),
+    )
+    job = ReverseSwapJob(amount=50000, receive_address=address)
+    await SwapOrchestrator(
+        client_orchestrated, poll_interval=0.001, reverse_lockup_timeout=0.05
+    ).run([job])
+    assert job.state == SwapState.failed
+    assert job.attempts[SwapState.wait_lockup] == 1
+    assert job.transaction is None
+    if final_status:
+        assert isinstance(job.error, BoltzSwapStatusException)
+        assert job.error.status == "invoice.expired"
+    else:
+        assert isinstance(job.error, BoltzSwapTransactionException)
+
+
+@pytest.mark.asyncio
+async def test_retries_per_state(client_orchestrated):
+    client = client_orchestrated
+    client.fail_first = {50000}
+    job = ReverseSwapJob(amount=50000, receive_address=address)
+    await SwapOrchestrator(client, retry_delay=0.001, poll_interval=0.001).run([job])
+    assert job.state == SwapState.done
+    assert job.attempts[SwapState.create] == 2
+
+    client.fail_first = {50001}
+    job = ReverseSwapJob(amount=50001, receive_address=address)
+    await SwapOrchestrator(
+        client,
+        state_retries={SwapState.create: 0},
+        retry_delay=0.001,
+        poll_interval=0.001,
+    ).run([job])
+    assert job.state == SwapState.failed
+    assert isinstance(job.error, BoltzApiException)
+
+
+@pytest.mark.asyncio
+async def test_invalid_job_fails_without_retry(client_orchestrated):
+    job = ReverseSwapJob(amount=1, receive_address=address)
+    await SwapOrchestrator(client_orchestrated, retry_delay=0.001).run([job])
+    assert job.state == SwapState.failed
+    assert job.attempts == {SwapState.create: 1}
+    assert client_orchestrated.api.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_submit_waits_for_queue(client_orchestrated):
+    swap_orchestrator = SwapOrchestrator(
+        client_orchestrated, max_jobs=1, queue_size=1, poll_interval=0.001
+    )
+    async with swap_orchestrator:
+        # the worker takes the first job, the second fills the queue
+        await swap_orchestrator.submit(ReverseSwapJob(50000, address))
+        await swap_orchestrator.submit(ReverseSwapJob(50001, address))
+        third = asyncio.ensure_future(
+            swap_orchestrator.submit(ReverseSwapJob(50002, address))
+        )
+        await asyncio.sleep(0)
+        assert not third.done()
+        await swap_orchestrator.join()
+        assert third.done()
+
+
+class HeightChainSource(ChainSource):
+    """the chain grows by one block per height lookup"""
+
+    def __init__(self, height: int):
+        super().__init__("BTC")
+        self.height = height
+
+    async def find_lockup(self, script_pubkey, zeroconf=True):
+        return None
+
+    async def get_block_height(self) -> int:
+        self.height += 1
+        return self.height
+
+
+@pytest.fixture
+def client_submarine(client_mock, monkeypatch):
+    client = client_mock
+    client.statuses = iter(["invoice.set", "transaction.mempool"])
+    client.final_status = "invoice.failedToPay"
+    client.transactions = []
+
+    def swap_status(boltz_id):
+        status = next(client.statuses, None)
+        if status is None:
+            raise BoltzSwapStatusException("swap failed", client.final_status)
+        return BoltzSwapStatusResponse(status=status)
+
+    def swap_transaction(boltz_id):
+        if not client.transactions:
+            raise BoltzApiException("boltz api status error")
+        return client.transactions.pop(0)
+
+    monkeypatch.setattr(
+        client,
+        "_create_swap",
+        lambda payment_request, refund_pubkey_hex, pair: BoltzSwapResponse(
+            id="swap",
+            bip21="bitcoin:",
+            address=address,
+            redeemScript="00",
+            acceptZeroConf=False,
+            expectedAmount=50000,
+            timeoutBlockHeight=100,
+        ),
+    )
+    monkeypatch.setattr(client, "swap_status", swap_status)
+    monkeypatch.setattr(client, "swap_transaction", swap_transaction)
+    monkeypatch.setattr(
+        client, "broadcast_tx", lambda rawtx, pair=None: BroadcastResult("txid", "boltz", 0)
+    )
+    monkeypatch.setattr(
+        orchestrator,
+        "create_refund_tx",
+        lambda **kwargs: f"refund-{kwargs['timeout_block_height']}",
+    )
+    yield client
+
+
+@pytest.mark.asyncio
+async def test_submarine_swap_refund(client_submarine):
+    # the first response still has an eta, the refund waits for the timeout
+    client_submarine.transactions = [
+        BoltzSwapTransactionResponse(transactionHex="lockup", timeoutEta="1700000000"),
+        BoltzSwapTransactionResponse(transactionHex="lockup", timeoutEta="1700000000"),
+        BoltzSwapTransactionResponse(transactionHex="lockup"),
+    ]
+    job = SubmarineSwapJob(payment_request=encode_invoice(), refund_address=address)
+    await SwapOrchestrator(client_submarine, poll_interval=0.001).run([job])
+    assert job.state == SwapState.done
+    assert job.status == "invoice.failedToPay"
+    assert job.transaction == "refund-100"
+    assert SwapState.wait_status in job.timings
+    assert SwapState.wait_timeout in job.timings
+    assert not client_submarine.transactions
+
+
+@pytest.mark.asyncio
+async def test_submarine_swap_refund_waits_for_height(client_submarine):
+    chain_source = HeightChainSource(height=95)
+    client_submarine._cfg.chain_sources.append(chain_source)
+    client_submarine.transactions = [BoltzSwapTransactionResponse(transactionHex="lockup")]
+    job = SubmarineSwapJob(payment_request=encode_invoice(), refund_address=address)
+    await SwapOrchestrator(client_submarine, poll_interval=0.001).run([job])
+    assert job.state == SwapState.done
+    assert chain_source.height == 100
+
+
+@pytest.mark.asyncio
+async def test_expired_swap_without_lockup_fails(client_submarine):
+    client_submarine.statuses = iter([])
+    client_submarine.final_status = "swap.expired"
+    job = SubmarineSwapJob(payment_request=encode_invoice(), refund_address=address)
+    await SwapOrchestrator(
+        client_submarine, poll_interval=0.001, lockup_timeout=0.05
+    ).run([job])
+    assert job.state == SwapState.failed
+    assert job.status == "swap.expired"
+    assert isinstance(job.error, BoltzSwapTransactionException)
+    assert job.attempts[SwapState.wait_lockup] == 1
+    assert job.transaction is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_invoice_fails_without_retry(client_submarine):
+    job = SubmarineSwapJob(payment_request=encode_invoice(expiry=1, timestamp=1), refund_address=address)
+    await SwapOrchestrator(client_submarine, retry_delay=0.001).run([job])
+    assert job.state == SwapState.failed
+    assert isinstance(job.error, BoltzInvoiceException)
+    assert job.attempts == {SwapState.create: 1}
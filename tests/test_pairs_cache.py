@@ -0,0 +1,58 @@
+import json
+import time
+
+import pytest
+
+from boltz_client.boltz import BoltzClient, BoltzConfig, BoltzOfflineException
+from boltz_client.pairs_cache import PairsCache
+
+from .helpers import mock_pairs as pairs
+
+api_url = "http://localhost:9001"
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "boltz" / "pairs.json")
+
+
+def test_pairs_cache_roundtrip(cache_path):
+    cache = PairsCache(cache_path, api_url)
+    assert cache.load() is None
+    cache.save(pairs)
+    assert cache.load() == pairs
+    assert cache.load(max_age=60) == pairs
+
+
+def test_pairs_cache_stale(cache_path):
+    cache = PairsCache(cache_path, api_url)
+    cache.save(pairs)
+    with open(cache_path, encoding="utf-8") as file:
+        data = json.load(file)
+    data["timestamp"] = time.time() - 120
+    with open(cache_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    assert cache.load(max_age=60) is None
+    assert cache.load() == pairs
+
+
+def test_pairs_cache_other_api(cache_path):
+    PairsCache(cache_path, api_url).save(pairs)
+    assert PairsCache(cache_path, "https://boltz.exchange/api").load() is None
+
+
+def test_offline_client_from_cache(cache_path):
+    PairsCache(cache_path, api_url).save(pairs)
+    config = BoltzConfig(network="regtest", api_url=api_url, pairs_cache_path=cache_path)
+    client = BoltzClient(config, offline=True)
+    assert client.limits == pairs["BTC/BTC"]["limits"]
+    assert client.substract_swap_fees(100000) == 99560
+    assert client.add_reverse_swap_fees(100000) == 101088
+    with pytest.raises(BoltzOfflineException):
+        client.swap_status("INVALID")
+
+
+def test_offline_client_without_cache(cache_path):
+    config = BoltzConfig(network="regtest", api_url=api_url, pairs_cache_path=cache_path)
+    with pytest.raises(BoltzOfflineException):
+        BoltzClient(config, offline=True)
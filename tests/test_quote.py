@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from boltz_client import quote as quote_module
+from boltz_client.boltz import BoltzClient, BoltzLimitException, BoltzPairException
+
+amounts = [0, 1, 9999, 10000, 10001, 40294967, 40294968, 10**9] + [
+    random.randint(1, 10**8) for _ in range(5000)
+]
+
+
+def is_valid(client: BoltzClient, amount: int, pair: str) -> bool:
+    try:
+        client.check_limits(amount, pair)
+        return True
+    except BoltzLimitException:
+        return False
+
+
+def assert_matches_scalar(client: BoltzClient, quotes: dict) -> None:
+    assert set(quotes) == {"BTC/BTC", "L-BTC/BTC"}
+    for pair, pair_quote in quotes.items():
+        assert list(pair_quote.reverse_amounts) == [
+            client.add_reverse_swap_fees(amount, pair) for amount in amounts
+        ]
+        assert list(pair_quote.swap_amounts) == [
+            client.substract_swap_fees(amount, pair) for amount in amounts
+        ]
+        assert list(pair_quote.valid) == [
+            is_valid(client, amount, pair) for amount in amounts
+        ]
+        assert list(pair_quote.reverse_valid) == [
+            is_valid(client, client.add_reverse_swap_fees(amount, pair), pair)
+            for amount in amounts
+        ]
+
+
+def test_quote_numpy(client_mock):
+    np = pytest.importorskip("numpy")
+    quotes = client_mock.quote(np.array(amounts))
+    assert quotes["BTC/BTC"].reverse_amounts.dtype == np.int64
+    assert_matches_scalar(client_mock, quotes)
+
+
+def test_quote_without_numpy(client_mock, monkeypatch):
+    monkeypatch.setattr(quote_module, "np", None)
+    quotes = client_mock.quote(amounts)
+    assert isinstance(quotes["BTC/BTC"].reverse_amounts, list)
+    assert_matches_scalar(client_mock, quotes)
+
+
+def test_quote_pairs(client_mock):
+    assert list(client_mock.quote([50000], pairs=["L-BTC/BTC"])) == ["L-BTC/BTC"]
+
+
+def test_quote_unknown_pair(client_mock):
+    with pytest.raises(BoltzPairException):
+        client_mock.quote([50000], pairs=["BTC/LTC"])
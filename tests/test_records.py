@@ -0,0 +1,185 @@
+import asyncio
+import io
+import json
+from functools import partial
+
+import pytest
+
+from boltz_client.cli import settle_file
+from boltz_client.records import (
+    ENCRYPTED_PREFIX,
+    SecretBox,
+    claim_record,
+    export_records,
+    import_records,
+    iter_records,
+    refund_record,
+    settle_in_executor,
+    settle_many,
+)
+from boltz_client.store import MemorySwapStore, SqliteSwapStore, SwapRecord
+
+address = "bcrt1q0xcqpzrky6eff2g52qdye53xkk9jxkvrl4xfg5"
+
+
+def record(i: int, kind: str = "reverse") -> SwapRecord:
+    return SwapRecord(
+        f"swap{i}",
+        kind,
+        "BTC/BTC",
+        data={
+            "privkey_wif": f"wif{i}",
+            "preimage_hex": f"{i:064x}",
+            "lockup_address": address,
+            "redeem_script_hex": "00",
+            "timeout_block_height": 100,
+            "receive_address": address,
+            "refund_address": address,
+        },
+    )
+
+
+def test_secret_box():
+    box = SecretBox("passphrase")
+    encrypted = box.encrypt("secret")
+    assert encrypted.startswith(ENCRYPTED_PREFIX)
+    assert encrypted != box.encrypt("secret")
+    assert SecretBox("passphrase").decrypt(encrypted) == "secret"
+    with pytest.raises(ValueError, match="passphrase"):
+        SecretBox("wrong").decrypt(encrypted)
+
+
+def test_export_and_import_encrypted(tmp_path):
+    records = [record(i) for i in range(5)]
+    file = io.StringIO()
+    assert export_records(iter(records), file, passphrase="passphrase") == 5
+    text = file.getvalue()
+    assert "wif1" not in text and records[1].data["preimage_hex"] not in text
+    assert json.loads(text.splitlines()[1])["data"]["lockup_address"] == address
+
+    with pytest.raises(ValueError, match="encrypted"):
+        next(iter_records(io.StringIO(text)))
+    store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+    assert import_records(io.StringIO(text), store, passphrase="passphrase") == 5
+    assert [store.get(f"swap{i}") for i in range(5)] == records
+    assert list(store.iter_records(batch_size=2)) == records
+    store.close()
+
+
+def test_export_redacted():
+    file = io.StringIO()
+    export_records([record(1)], file, redact=True)
+    data = json.loads(file.getvalue())["data"]
+    assert data["privkey_wif"] is None and data["preimage_hex"] is None
+    with pytest.raises(ValueError):
+        export_records([record(1)], io.StringIO())
+
+
+def test_iter_records_is_lazy():
+    def lines():
+        file = io.StringIO()
+        export_records([record(0), record(1)], file, redact=True)
+        yield from file.getvalue().splitlines()
+        raise AssertionError("read past the records that were asked for")
+
+    records = iter_records(lines())
+    assert next(records).boltz_id == "swap0"
+    assert next(records).boltz_id == "swap1"
+
+
+@pytest.mark.asyncio
+async def test_settle_many_bounds_concurrency():
+    pulled = 0
+    running = 0
+    max_running = 0
+
+    def records():
+        nonlocal pulled
+        for i in range(20):
+            pulled += 1
+            # never more records pulled than slots plus the finished ones
+            assert pulled - finished <= 3
+            yield record(i)
+
+    finished = 0
+
+    async def settle(swap: SwapRecord) -> str:
+        nonlocal running, max_running, finished
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        finished += 1
+        if swap.boltz_id == "swap3":
+            raise ValueError("failed")
+        return f"tx-{swap.boltz_id}"
+
+    results = [result async for result in settle_many(records(), settle, max_concurrency=3)]
+    assert max_running == 3
+    assert len(results) == 20
+    errors = [swap.boltz_id for swap, _, error in results if error]
+    assert errors == ["swap3"]
+    assert {txid for _, txid, _ in results if txid} == {f"tx-swap{i}" for i in range(20) if i != 3}
+
+
+@pytest.mark.asyncio
+async def test_claim_and_refund_record(client_mock, monkeypatch):
+    calls = []
+
+    async def claim_reverse_swap(**kwargs):
+        calls.append(kwargs)
+        return "claim"
+
+    async def refund_swap(**kwargs):
+        calls.append(kwargs)
+        return "refund"
+
+    monkeypatch.setattr(client_mock, "claim_reverse_swap", claim_reverse_swap)
+    monkeypatch.setattr(client_mock, "refund_swap", refund_swap)
+    assert await claim_record(client_mock, record(1), "bcrt1qother") == "claim"
+    assert calls[0]["receive_address"] == "bcrt1qother"
+    assert calls[0]["preimage_hex"] == record(1).data["preimage_hex"]
+    assert await refund_record(client_mock, record(2, "submarine")) == "refund"
+    assert calls[1]["receive_address"] == address
+    with pytest.raises(ValueError):
+        await claim_record(client_mock, record(3, "submarine"))
+    store = MemorySwapStore()
+    store.add(record(4))
+    assert [swap.boltz_id for swap in store.iter_records()] == ["swap4"]
+
+
+@pytest.mark.asyncio
+async def test_settle_in_executor(client_mock, monkeypatch):
+    loop = asyncio.get_running_loop()
+
+    async def refund_swap(**kwargs):
+        # runs on its own loop, off the one of the caller
+        assert asyncio.get_running_loop() is not loop
+        return "refund"
+
+    async def unfunded(**kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(client_mock, "refund_swap", refund_swap)
+    swap = record(1, "submarine")
+    assert await settle_in_executor(partial(refund_record, client_mock, swap), 1) == "refund"
+    monkeypatch.setattr(client_mock, "refund_swap", unfunded)
+    with pytest.raises(TimeoutError):
+        await settle_in_executor(partial(refund_record, client_mock, swap), 0.05)
+
+
+def test_refund_many_reports_timeouts(client_mock, monkeypatch, capsys):
+    async def refund_swap(**kwargs):
+        if kwargs["boltz_id"] == "swap1":
+            await asyncio.sleep(10)
+        return "refund"
+
+    monkeypatch.setattr(client_mock, "refund_swap", refund_swap)
+    file = io.StringIO()
+    export_records([record(1, "submarine"), record(2, "submarine")], file, "passphrase")
+    file.seek(0)
+    with pytest.raises(SystemExit):
+        settle_file(file, "submarine", partial(refund_record, client_mock), "passphrase", 2, 0.1)
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert {"id": "swap2", "txid": "refund"} in lines
+    assert {"id": "swap1", "error": "TimeoutError: not settled after 0.1s"} in lines
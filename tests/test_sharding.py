@@ -0,0 +1,220 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from boltz_client.boltz import BoltzApiException, BoltzSwapStatusResponse, BoltzSwapTransactionResponse
+from boltz_client.sharding import HashRing, SwapWorker
+from boltz_client.store import SqliteSwapStore, SwapRecord
+
+address = "bcrt1q0xcqpzrky6eff2g52qdye53xkk9jxkvrl4xfg5"
+
+
+def test_hash_ring():
+    keys = [f"swap{i}" for i in range(1000)]
+    ring = HashRing(["worker1", "worker2", "worker3"])
+    owners = {key: ring.node_for(key) for key in keys}
+    counts = Counter(owners.values())
+    assert set(counts) == {"worker1", "worker2", "worker3"}
+    assert min(counts.values()) > 200
+
+    # only the keys of the removed node move
+    smaller = HashRing(["worker1", "worker3"])
+    for key, owner in owners.items():
+        if owner != "worker2":
+            assert smaller.node_for(key) == owner
+    assert HashRing([]).node_for("swap1") is None
+
+
+@pytest.fixture
+def worker_client(client_mock, monkeypatch):
+    client_mock.statuses = {}
+    client_mock.claimed = []
+    monkeypatch.setattr(
+        client_mock,
+        "swap_status",
+        lambda boltz_id: BoltzSwapStatusResponse(status=client_mock.statuses.get(boltz_id, "swap.created")),
+    )
+
+    async def claim_reverse_swap(boltz_id, **kwargs):
+        client_mock.claimed.append(boltz_id)
+        return f"claim-{boltz_id}"
+
+    monkeypatch.setattr(client_mock, "claim_reverse_swap", claim_reverse_swap)
+    yield client_mock
+
+
+def reverse_record(boltz_id: str) -> SwapRecord:
+    return SwapRecord(
+        boltz_id,
+        "reverse",
+        "BTC/BTC",
+        data={
+            "privkey_wif": "wif",
+            "preimage_hex": "00",
+            "lockup_address": address,
+            "redeem_script_hex": "00",
+            "timeout_block_height": 100,
+            "receive_address": address,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_workers_share_the_swaps(worker_client, tmp_path):
+    store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+    for i in range(30):
+        store.add(reverse_record(f"swap{i}"))
+    workers = [SwapWorker(worker_client, store, worker_id=f"worker{i}", lease_ttl=10) for i in range(3)]
+    # a first round to register every worker, the second one rebalances
+    for _ in range(2):
+        for worker in workers:
+            await worker.run_once()
+    owned = [worker.owned for worker in workers]
+    assert all(owned)
+    assert sum(len(swaps) for swaps in owned) == 30
+    assert not owned[0] & owned[1] and not owned[1] & owned[2] and not owned[0] & owned[2]
+
+    # boltz sent the lockup of every swap, each is claimed exactly once
+    for i in range(30):
+        worker_client.statuses[f"swap{i}"] = "transaction.mempool"
+    for worker in workers:
+        await worker.run_once()
+        await worker.join()
+    assert sorted(worker_client.claimed) == sorted(f"swap{i}" for i in range(30))
+    assert store.get("swap0").txid == "claim-swap0"
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_swaps_of_a_dead_worker_are_taken_over(worker_client, tmp_path):
+    store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+    for i in range(10):
+        store.add(reverse_record(f"swap{i}"))
+    dead = SwapWorker(worker_client, store, worker_id="dead", interval=0.01, lease_ttl=0.1)
+    alive = SwapWorker(worker_client, store, worker_id="alive", interval=0.01, lease_ttl=10)
+    for _ in range(2):
+        await dead.run_once()
+        await alive.run_once()
+    assert dead.owned and len(alive.owned) < 10
+
+    # the dead worker stops heartbeating without releasing its leases
+    await asyncio.sleep(0.2)
+    await alive.run_once()
+    assert len(alive.owned) == 10
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_settlement_longer_than_the_lease(worker_client, tmp_path, monkeypatch):
+    async def claim_reverse_swap(boltz_id, **kwargs):
+        worker_client.claimed.append(boltz_id)
+        await asyncio.sleep(0.5)
+        return f"claim-{boltz_id}"
+
+    monkeypatch.setattr(worker_client, "claim_reverse_swap", claim_reverse_swap)
+    store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+    store.add(reverse_record("swap1"))
+    worker_client.statuses["swap1"] = "transaction.mempool"
+    worker = SwapWorker(worker_client, store, worker_id="worker1", interval=0.02, lease_ttl=0.1)
+    task = asyncio.ensure_future(worker.run())
+    await asyncio.sleep(0.05)
+    assert worker_client.claimed == ["swap1"]
+    # rounds go on while the claim runs, the heartbeat keeps its lease
+    other = SwapWorker(worker_client, store, worker_id="worker2", interval=0.02, lease_ttl=0.1)
+    for _ in range(10):
+        await other.run_once()
+        assert not other.owned
+        await asyncio.sleep(0.03)
+    worker.stop()
+    await asyncio.wait_for(task, timeout=5)
+    assert worker_client.claimed == ["swap1"]
+    assert store.get("swap1").txid == "claim-swap1"
+    worker.close()
+    other.close()
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_stopped_worker_leaves_the_ring(worker_client, tmp_path):
+    store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+    store.add(reverse_record("swap1"))
+    worker = SwapWorker(worker_client, store, worker_id="worker1", interval=0.01, lease_ttl=10)
+    task = asyncio.ensure_future(worker.run())
+    await asyncio.sleep(0.05)
+    assert worker.owned == {"swap1"}
+    worker.stop()
+    await asyncio.wait_for(task, timeout=5)
+    assert store.live_workers() == []
+    assert store.acquire("swap1", "worker2", 10)
+    worker.close()
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_reports_errors(worker_client, tmp_path, monkeypatch):
+    async def claim_reverse_swap(boltz_id, **kwargs):
+        raise ValueError("claim failed")
+
+    monkeypatch.setattr(worker_client, "claim_reverse_swap", claim_reverse_swap)
+    errors = []
+    store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+    store.add(reverse_record("swap1"))
+    worker_client.statuses["swap1"] = "transaction.confirmed"
+    worker = SwapWorker(worker_client, store, worker_id="worker1", on_error=lambda record, exc: errors.append(exc))
+    await worker.run_once()
+    await worker.join()
+    assert [str(error) for error in errors] == ["claim failed"]
+    assert store.get("swap1").txid is None
+    store.close()
+
+
+def submarine_record(boltz_id: str) -> SwapRecord:
+    return SwapRecord(
+        boltz_id,
+        "submarine",
+        "BTC/BTC",
+        status="swap.expired",
+        data={
+            "privkey_wif": "wif",
+            "lockup_address": address,
+            "redeem_script_hex": "00",
+            "timeout_block_height": 100,
+            "refund_address": address,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_skips_and_bounds_refunds(worker_client, tmp_path, monkeypatch):
+    lockups = {"funded": "lockup"}
+
+    def swap_transaction(boltz_id):
+        if boltz_id not in lockups:
+            raise BoltzApiException("boltz api status error: could not find onchain transaction")
+        return BoltzSwapTransactionResponse(transactionHex=lockups[boltz_id])
+
+    async def refund_swap(boltz_id, **kwargs):
+        # like wait_for_tx for a lockup that never confirms
+        await asyncio.sleep(10)
+
+    worker_client.statuses = {"funded": "swap.expired", "unfunded": "swap.expired"}
+    monkeypatch.setattr(worker_client, "swap_transaction", swap_transaction)
+    monkeypatch.setattr(worker_client, "refund_swap", refund_swap)
+    errors = []
+    store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+    store.add(submarine_record("funded"))
+    store.add(submarine_record("unfunded"))
+    worker = SwapWorker(
+        worker_client,
+        store,
+        worker_id="worker1",
+        settle_timeout=0.1,
+        on_error=lambda record, exc: errors.append((record.boltz_id, exc)),
+    )
+    await asyncio.wait_for(worker.run_once(), timeout=5)
+    await asyncio.wait_for(worker.join(), timeout=5)
+    assert [(boltz_id, type(exc)) for boltz_id, exc in errors] == [("funded", TimeoutError)]
+    assert store.get("funded").txid is None
+    worker.close()
+    store.close()
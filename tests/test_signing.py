@@ -0,0 +1,134 @@
+import os
+import random
+
+import pytest
+import wallycore as wally
+from embit import ec, script
+from embit.transaction import SIGHASH, Transaction, TransactionInput, TransactionOutput
+
+from boltz_client import signing
+from boltz_client.onchain import create_batch_claim_tx
+from boltz_client.signing import Bip143Sighasher, EmbitBackend, WallyBackend, WallySighasher
+
+from .test_batching import create_reverse_swap_claim, receive_address, verify_batch
+
+
+@pytest.fixture
+def restore_backend():
+    backend = signing._backend
+    yield
+    signing._backend = backend
+
+
+def sample_claim() -> tuple[Transaction, bytes, bytes]:
+    """unsigned one input claim, its script code and a key to sign it with"""
+    secret = os.urandom(32)
+    script_code = bytes(ec.PrivateKey(secret).sec()) + bytes([0xAC])
+    tx = Transaction(
+        vin=[TransactionInput(os.urandom(32), 0)],
+        vout=[TransactionOutput(49000, script.Script(bytes([0, 20]) + os.urandom(20)))],
+    )
+    return tx, script_code, secret
+
+
+def wally_sighash(tx: Transaction, index: int, script_code: bytes, value: int) -> bytes:
+    wally_tx = wally.tx_from_bytes(tx.serialize(), wally.WALLY_TX_FLAG_USE_WITNESS)
+    flags = wally.WALLY_TX_FLAG_USE_WITNESS
+    return bytes(wally.tx_get_btc_signature_hash(wally_tx, index, script_code, value, wally.WALLY_SIGHASH_ALL, flags))
+
+
+def test_backends_are_identical():
+    embit_backend, wally_backend = EmbitBackend(), WallyBackend()
+    for _ in range(20):
+        tx, script_code, secret = sample_claim()
+        sighash = tx.sighash_segwit(0, script.Script(script_code), 50000)
+        assert embit_backend.sighasher(tx).sighash(0, script_code, 50000) == sighash
+        assert wally_backend.sighasher(tx).sighash(0, script_code, 50000) == sighash
+        assert wally_backend.sign(secret, sighash) == embit_backend.sign(secret, sighash)
+
+
+@pytest.mark.parametrize("name", ["embit", "wally"])
+def test_claim_with_backend(name, restore_backend):
+    claims = [create_reverse_swap_claim() for _ in range(3)]
+    signing.set_backend("embit")
+    expected = create_batch_claim_tx(claims, receive_address, 1000)
+    assert signing.set_backend(name).name == name
+    rawtx = create_batch_claim_tx(claims, receive_address, 1000)
+    assert rawtx == expected
+    verify_batch(rawtx, claims)
+
+
+def test_preferred_backend_is_selected(restore_backend, monkeypatch):
+    signing._backend = None
+    assert signing.get_backend().name == "wally"
+    assert signing.get_backend() is signing.get_backend()
+
+    def no_wally():
+        raise ImportError("`wallycore` is not installed")
+
+    signing._backend = None
+    monkeypatch.setitem(signing.BACKENDS, "wally", no_wally)
+    assert signing.get_backend().name == "embit"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        signing.set_backend("openssl")
+
+
+@pytest.mark.parametrize("num_inputs", [1, 3, 50])
+def test_bip143_sighasher(num_inputs):
+    tx = Transaction(
+        vin=[
+            TransactionInput(
+                os.urandom(32), random.randint(0, 5), sequence=random.choice([0xFFFFFFFF, 0xFFFFFFFE])
+            )
+            for _ in range(num_inputs)
+        ],
+        vout=[
+            TransactionOutput(random.randint(1000, 10**8), script.Script(bytes([0, 20]) + os.urandom(20)))
+            for _ in range(2)
+        ],
+        locktime=random.randint(0, 800000),
+    )
+    sighasher = Bip143Sighasher(tx)
+    for index in range(num_inputs):
+        # script codes above 252 bytes have a 3 byte length prefix
+        script_code = os.urandom(random.choice([25, 107, 300]))
+        value = random.randint(1, 21 * 10**14)
+        sighash = sighasher.sighash(index, script_code, value)
+        assert sighash == tx.sighash_segwit(index, script.Script(script_code), value)
+        assert sighash == wally_sighash(tx, index, script_code, value)
+
+
+def test_wally_sighasher_matches_midstate():
+    tx = Transaction(
+        vin=[TransactionInput(os.urandom(32), index, sequence=0xFFFFFFFE) for index in range(5)],
+        vout=[TransactionOutput(5000, script.Script(bytes([0, 20]) + os.urandom(20)))],
+        locktime=800000,
+    )
+    sighasher = WallyBackend().sighasher(tx)
+    assert isinstance(sighasher, WallySighasher)
+    midstate = Bip143Sighasher(tx)
+    for index in range(5):
+        script_code = os.urandom(random.choice([25, 107, 300]))
+        value = random.randint(1, 21 * 10**14)
+        assert sighasher.sighash(index, script_code, value) == midstate.sighash(index, script_code, value)
+
+
+def test_batch_signatures_match_embit():
+    claims = [create_reverse_swap_claim() for _ in range(20)]
+    rawtx = create_batch_claim_tx(claims, receive_address, 1000)
+
+    # the same transaction signed input by input with embit alone
+    tx = Transaction.parse(bytes.fromhex(rawtx))
+    for vin in tx.vin:
+        vin.witness = script.Witness()
+    for index, claim in enumerate(claims):
+        redeem_script = bytes.fromhex(claim.redeem_script_hex)
+        sighash = tx.sighash_segwit(index, script.Script(redeem_script), 50000)
+        sig = ec.PrivateKey.from_wif(claim.privkey_wif).sign(sighash).serialize()
+        tx.vin[index].witness = script.Witness(
+            items=[sig + bytes([SIGHASH.ALL]), bytes.fromhex(claim.preimage_hex), redeem_script]
+        )
+    assert tx.serialize().hex() == rawtx
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from boltz_client import boltz
+from boltz_client.helpers import SingleFlight
+
+
+def test_singleflight_shares_call():
+    flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def func():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"status": "swap.created"}
+
+    def run(_):
+        barrier.wait()
+        return flight.do("key", func)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(run, range(8)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    # nothing is cached without ttl
+    flight.do("key", func)
+    assert len(calls) == 2
+
+
+def test_singleflight_shares_exception():
+    flight = SingleFlight()
+    barrier = threading.Barrier(4)
+
+    def func():
+        time.sleep(0.1)
+        raise ValueError("failed")
+
+    def run(_):
+        barrier.wait()
+        with pytest.raises(ValueError):
+            flight.do("key", func)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(run, range(4)))
+
+
+def test_singleflight_ttl():
+    flight = SingleFlight(ttl=0.2)
+    calls = []
+
+    def func():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", func) == 1
+    assert flight.do("key", func) == 1
+    assert flight.do("other", func) == 2
+    time.sleep(0.25)
+    assert flight.do("key", func) == 3
+
+
+def test_client_coalesces_swap_status(client_mock, monkeypatch):
+    calls = []
+
+    def mock_req_wrap(funcname, url, **kwargs):
+        calls.append((funcname, url, kwargs["json"]["id"]))
+        time.sleep(0.1)
+        return {"status": "swap.created"}
+
+    monkeypatch.setattr(boltz, "req_wrap", mock_req_wrap)
+    barrier = threading.Barrier(6)
+
+    def run(index):
+        barrier.wait()
+        return client_mock.swap_status("a" if index % 2 else "b")
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        statuses = list(executor.map(run, range(6)))
+    assert {status.status for status in statuses} == {"swap.created"}
+    assert sorted(call[2] for call in calls) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_singleflight_shares_call_of_coroutines():
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"status": "swap.created"}
+
+    results = await asyncio.gather(*(flight.do_async("key", func) for _ in range(8)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_singleflight_cancelled_coroutine_does_not_cancel_call():
+    flight = SingleFlight()
+
+    def func():
+        time.sleep(0.1)
+        return 1
+
+    first = asyncio.ensure_future(flight.do_async("key", func))
+    second = asyncio.ensure_future(flight.do_async("key", func))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == 1
+
+
+@pytest.mark.asyncio
+async def test_client_coalesces_swap_status_of_coroutines(client_mock, monkeypatch):
+    calls = []
+
+    def mock_req_wrap(funcname, url, **kwargs):
+        calls.append((funcname, url, kwargs["json"]["id"]))
+        time.sleep(0.1)
+        return {"status": "swap.created"}
+
+    monkeypatch.setattr(boltz, "req_wrap", mock_req_wrap)
+    statuses = await asyncio.gather(
+        *(client_mock.swap_status_async("a" if index % 2 else "b") for index in range(6))
+    )
+    assert {status.status for status in statuses} == {"swap.created"}
+    assert sorted(call[2] for call in calls) == ["a", "b"]
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from boltz_client.store import MemorySwapStore, SqliteSwapStore, SwapRecord
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemorySwapStore()
+    else:
+        store = SqliteSwapStore(str(tmp_path / "swaps.sqlite"))
+        yield store
+        store.close()
+
+
+def test_swap_store(store):
+    store.add(SwapRecord("swap1", "submarine", "BTC/BTC", data={"privkey_wif": "wif"}))
+    store.add(SwapRecord("swap2", "reverse", "BTC/BTC"))
+    record = store.get("swap1")
+    assert record
+    record.data["privkey_wif"] = "changed"
+    assert store.get("swap1").data["privkey_wif"] == "wif"
+    updated = store.update("swap2", status="invoice.settled", txid="txid")
+    assert updated.status == "invoice.settled" and updated.txid == "txid"
+    assert [record.boltz_id for record in store.records(pending=True)] == ["swap1"]
+    assert [record.boltz_id for record in store.records()] == ["swap1", "swap2"]
+    assert SwapRecord.from_json(store.get("swap1").to_json()) == store.get("swap1")
+    with pytest.raises(KeyError):
+        store.update("unknown", status="swap.created")
+    assert store.get("unknown") is None
+
+
+def test_swap_store_pending_refunds(store):
+    store.add(SwapRecord("swap1", "submarine", "BTC/BTC", status="swap.expired", data={"refund_address": "bcrt1q"}))
+    store.add(SwapRecord("swap2", "submarine", "BTC/BTC", status="swap.expired"))
+    assert [record.boltz_id for record in store.records(pending=True)] == ["swap1"]
+    store.update("swap1", txid="refund")
+    assert store.records(pending=True) == []
+
+
+def test_swap_store_leases(store):
+    store.add(SwapRecord("swap1", "reverse", "BTC/BTC"))
+    assert not store.acquire("unknown", "worker1", 10)
+    assert store.acquire("swap1", "worker1", 10)
+    assert store.acquire("swap1", "worker1", 10)
+    assert not store.acquire("swap1", "worker2", 10)
+    store.release("swap1", "worker2")
+    assert not store.acquire("swap1", "worker2", 10)
+    store.release("swap1", "worker1")
+    assert store.acquire("swap1", "worker2", 0.05)
+    time.sleep(0.1)
+    # the lease of worker2 expired
+    assert store.acquire("swap1", "worker1", 10)
+
+
+def test_swap_store_heartbeat(store):
+    store.add(SwapRecord("swap1", "reverse", "BTC/BTC"))
+    store.heartbeat("worker2", 10)
+    store.heartbeat("worker1", 0.05)
+    assert store.live_workers() == ["worker1", "worker2"]
+    assert store.acquire("swap1", "worker1", 0.05)
+    store.heartbeat("worker1", 0.05)
+    time.sleep(0.1)
+    assert store.live_workers() == ["worker2"]
+    assert store.acquire("swap1", "worker2", 10)
+
+
+def test_sqlite_swap_store_is_shared(tmp_path):
+    path = str(tmp_path / "swaps.sqlite")
+    store1, store2 = SqliteSwapStore(path), SqliteSwapStore(path)
+    store1.add(SwapRecord("swap1", "reverse", "BTC/BTC", data={"preimage_hex": "00"}))
+    assert store2.get("swap1").data == {"preimage_hex": "00"}
+    assert store1.acquire("swap1", "worker1", 10)
+    assert not store2.acquire("swap1", "worker2", 10)
+    store1.close()
+    store2.close()
@@ -0,0 +1,356 @@
+import os
+from math import ceil
+from typing import Optional
+
+import pytest
+from embit import ec, script
+from embit.hashes import hash160, tagged_hash
+from embit.networks import NETWORKS
+from embit.transaction import Transaction, TransactionInput, TransactionOutput
+
+from boltz_client import boltz
+from boltz_client.bolt11 import decode
+from boltz_client.boltz import (
+    BoltzApiException,
+    BoltzPairException,
+    BoltzSwapTransactionException,
+    BoltzSwapTransactionResponse,
+)
+from boltz_client.musig import (
+    G,
+    MusigException,
+    Session,
+    lift_x,
+    nonce_agg,
+    nonce_gen,
+    point_add,
+    point_mul,
+)
+from boltz_client.onchain import create_key_pair
+from boltz_client.taproot import (
+    REFUND_SEQUENCE,
+    SwapTree,
+    TaprootSwap,
+    claim_leaf,
+    key_path_vsize,
+    refund_leaf,
+    script_path_vsize,
+    tap_branch_hash,
+    tap_leaf_hash,
+    taproot_sighash,
+)
+from boltz_client.taproot_swaps import BoltzTaprootReverseSwapResponse
+
+from .helpers import encode_invoice
+
+LOCKUP_AMOUNT = 100000
+TIMEOUT = 300
+
+
+class MockBoltz:
+    """the v2 api of boltz, it signs cooperatively unless told otherwise"""
+
+    def __init__(self, cooperative: bool = True, tamper: bool = False):
+        self.privkey_wif, self.pubkey_hex = create_key_pair("regtest", "BTC/BTC")
+        self.cooperative = cooperative
+        self.tamper = tamper
+        self.swaps: dict[str, TaprootSwap] = {}
+        self.lockups: dict[str, str] = {}
+        self.paths: list[str] = []
+        # reported until the timeout block height is reached
+        self.timeout_eta: Optional[str] = None
+
+    def req_wrap(self, funcname, url, **kwargs) -> dict:
+        assert funcname == "post"
+        path = url.split("/v2/swap/")[1]
+        self.paths.append(path)
+        data = kwargs["json"]
+        if path == "reverse":
+            tree = SwapTree(
+                claim_leaf(
+                    bytes.fromhex(data["preimageHash"]),
+                    data["claimPublicKey"],
+                    reverse=True,
+                ),
+                refund_leaf(self.pubkey_hex, TIMEOUT),
+            )
+            swap = self.add_swap(f"r{len(self.swaps)}", data["claimPublicKey"], tree)
+            return {
+                "id": swap,
+                "invoice": "lnbcrt1",
+                "swapTree": self.swaps[swap].tree.to_json(),
+                "lockupAddress": self.swaps[swap].address("regtest"),
+                "refundPublicKey": self.pubkey_hex,
+                "timeoutBlockHeight": TIMEOUT,
+                "onchainAmount": LOCKUP_AMOUNT,
+            }
+        if path == "submarine":
+            payment_hash = decode(data["invoice"]).payment_hash
+            tree = SwapTree(
+                claim_leaf(bytes.fromhex(payment_hash), self.pubkey_hex),
+                refund_leaf(data["refundPublicKey"], TIMEOUT),
+            )
+            swap = self.add_swap(f"s{len(self.swaps)}", data["refundPublicKey"], tree)
+            return {
+                "id": swap,
+                "bip21": "bitcoin:",
+                "address": self.swaps[swap].address("regtest"),
+                "swapTree": self.swaps[swap].tree.to_json(),
+                "claimPublicKey": self.pubkey_hex,
+                "acceptZeroConf": False,
+                "expectedAmount": LOCKUP_AMOUNT,
+                "timeoutBlockHeight": TIMEOUT,
+            }
+        if not self.cooperative:
+            raise BoltzApiException("boltz api status error: not cooperating")
+        boltz_id = path.split("/")[1]
+        swap = self.swaps[boltz_id]
+        if path.endswith("/claim"):
+            assert hash160(bytes.fromhex(data["preimage"])) in swap.tree.claim_leaf
+        tx = Transaction.parse(bytes.fromhex(data["transaction"]))
+        msg = taproot_sighash(tx, data["index"], [swap.script_pubkey], [LOCKUP_AMOUNT])
+        if self.tamper:
+            msg = os.urandom(32)
+        secnonce, pubnonce = nonce_gen(swap.boltz_pubkey)
+        session = Session(
+            swap.tweaked, nonce_agg([pubnonce, bytes.fromhex(data["pubNonce"])]), msg
+        )
+        secret = ec.PrivateKey.from_wif(self.privkey_wif).secret
+        return {
+            "pubNonce": pubnonce.hex(),
+            "partialSignature": session.sign(secnonce, secret).hex(),
+        }
+
+    def add_swap(self, boltz_id: str, pubkey_hex: str, tree: SwapTree) -> str:
+        swap = TaprootSwap(self.pubkey_hex, pubkey_hex, tree)
+        self.swaps[boltz_id] = swap
+        lockup = Transaction(
+            vin=[TransactionInput(os.urandom(32), 0)],
+            vout=[TransactionOutput(LOCKUP_AMOUNT, script.Script(swap.script_pubkey))],
+        )
+        self.lockups[boltz_id] = bytes.hex(lockup.serialize())
+        return boltz_id
+
+
+@pytest.fixture
+def mock_boltz(client_mock, monkeypatch):
+    mock = MockBoltz()
+    monkeypatch.setattr(boltz, "req_wrap", mock.req_wrap)
+    sent = []
+
+    async def wait_for_lockup_tx(boltz_id, *args):
+        return mock.lockups[boltz_id]
+
+    async def wait_for_tx(boltz_id):
+        return mock.lockups[boltz_id]
+
+    def send_onchain_tx(rawtx, pair=None):
+        sent.append(Transaction.from_string(rawtx))
+        return "txid"
+
+    async def swap_transaction_async(boltz_id):
+        return BoltzSwapTransactionResponse(timeoutEta=mock.timeout_eta)
+
+    monkeypatch.setattr(client_mock, "wait_for_lockup_tx", wait_for_lockup_tx)
+    monkeypatch.setattr(client_mock, "wait_for_tx", wait_for_tx)
+    monkeypatch.setattr(client_mock, "send_onchain_tx", send_onchain_tx)
+    monkeypatch.setattr(client_mock, "swap_transaction_async", swap_transaction_async)
+    yield client_mock, mock, sent
+
+
+def receive_address() -> str:
+    pubkey = ec.PrivateKey(os.urandom(32)).get_public_key()
+    return script.p2wpkh(pubkey).address(NETWORKS["regtest"])
+
+
+def vsize(tx: Transaction) -> int:
+    witnesses = [vin.witness for vin in tx.vin]
+    for vin in tx.vin:
+        vin.witness = script.Witness()
+    base = len(tx.serialize())
+    for vin, witness in zip(tx.vin, witnesses):
+        vin.witness = witness
+    return ceil((base * 3 + len(tx.serialize())) / 4)
+
+
+def check_script_path(swap: TaprootSwap, tx: Transaction, pubkey_xonly: bytes):
+    """the signature of the leaf key and the commitment of the control block"""
+    items = tx.vin[0].witness.items
+    leaf, control_block = items[-2], items[-1]
+    msg = taproot_sighash(tx, 0, [swap.script_pubkey], [LOCKUP_AMOUNT], leaf)
+    assert ec.PublicKey.from_xonly(pubkey_xonly).schnorr_verify(
+        ec.SchnorrSig.parse(items[0]), msg
+    )
+    internal = control_block[1:33]
+    merkle_root = tap_branch_hash(tap_leaf_hash(leaf), control_block[33:])
+    tweak = int.from_bytes(tagged_hash("TapTweak", internal + merkle_root), "big")
+    output = point_add(lift_x(int.from_bytes(internal, "big")), point_mul(G, tweak))
+    assert output and output[0].to_bytes(32, "big") == swap.output_key
+    assert control_block[0] & 1 == output[1] & 1
+
+
+def test_sighash_matches_embit():
+    _, pubkey_hex = create_key_pair("regtest", "BTC/BTC")
+    tree = SwapTree(b"\x51", b"\x52")
+    swap = TaprootSwap(pubkey_hex, create_key_pair("regtest", "BTC/BTC")[1], tree)
+    tx = Transaction(
+        vin=[TransactionInput(os.urandom(32), 1, sequence=REFUND_SEQUENCE)],
+        vout=[
+            TransactionOutput(5000, script.address_to_scriptpubkey(receive_address()))
+        ],
+        locktime=TIMEOUT,
+    )
+    expected = tx.sighash_taproot(0, [script.Script(swap.script_pubkey)], [6000])
+    assert taproot_sighash(tx, 0, [swap.script_pubkey], [6000]) == expected
+
+
+def test_leaves():
+    preimage_hash = bytes(32)
+    pubkey_hex = "02" + "11" * 32
+    leaf = claim_leaf(preimage_hash, pubkey_hex, reverse=True)
+    assert leaf.hex().startswith("82012088a914")
+    assert leaf.hex().endswith("8820" + "11" * 32 + "ac")
+    assert claim_leaf(preimage_hash, pubkey_hex).hex().startswith("a914")
+    assert refund_leaf(pubkey_hex, 800000).hex() == "20" + "11" * 32 + "ad0300350cb1"
+    assert refund_leaf(pubkey_hex, 128).hex().endswith("ad028000b1")
+
+
+def test_key_path_is_smaller():
+    tree = SwapTree(claim_leaf(bytes(32), "02" + "11" * 32, True), b"\x51")
+    assert key_path_vsize(22) < script_path_vsize(tree.claim_leaf, 22, preimage=True)
+
+
+@pytest.mark.asyncio
+async def test_cooperative_claim(mock_boltz):
+    client, mock, sent = mock_boltz
+    privkey_wif, preimage_hex, swap = client.taproot.create_reverse_swap(50000)
+    assert isinstance(swap, BoltzTaprootReverseSwapResponse)
+    address = receive_address()
+    await client.taproot.claim_reverse_swap(
+        boltz_id=swap.id,
+        lockup_address=swap.lockupAddress,
+        receive_address=address,
+        privkey_wif=privkey_wif,
+        preimage_hex=preimage_hex,
+        swap_tree=swap.swapTree,
+        boltz_pubkey_hex=swap.refundPublicKey,
+    )
+    assert mock.paths == ["reverse", f"reverse/{swap.id}/claim"]
+    tx = sent[0]
+    taproot_swap = mock.swaps[swap.id]
+    [sig] = tx.vin[0].witness.items
+    msg = tx.sighash_taproot(
+        0, [script.Script(taproot_swap.script_pubkey)], [LOCKUP_AMOUNT]
+    )
+    pubkey = ec.PublicKey.from_xonly(taproot_swap.output_key)
+    assert pubkey.schnorr_verify(ec.SchnorrSig.parse(sig), msg)
+    fees = LOCKUP_AMOUNT - tx.vout[0].value
+    assert fees < client.get_fee_estimation_claim()
+    assert vsize(tx) <= key_path_vsize(22)
+
+
+@pytest.mark.parametrize("tamper", [False, True])
+@pytest.mark.asyncio
+async def test_claim_falls_back_to_script_path(mock_boltz, tamper):
+    client, mock, sent = mock_boltz
+    privkey_wif, preimage_hex, swap = client.taproot.create_reverse_swap(50000)
+    # boltz refuses to sign or sends an invalid partial signature
+    mock.cooperative = tamper
+    mock.tamper = tamper
+    await client.taproot.claim_reverse_swap(
+        boltz_id=swap.id,
+        lockup_address=swap.lockupAddress,
+        receive_address=receive_address(),
+        privkey_wif=privkey_wif,
+        preimage_hex=preimage_hex,
+        swap_tree=swap.swapTree,
+        boltz_pubkey_hex=swap.refundPublicKey,
+    )
+    assert mock.paths[-1] == f"reverse/{swap.id}/claim"
+    tx = sent[0]
+    taproot_swap = mock.swaps[swap.id]
+    items = tx.vin[0].witness.items
+    assert len(items) == 4
+    assert items[1] == bytes.fromhex(preimage_hex)
+    assert items[2] == taproot_swap.tree.claim_leaf
+    check_script_path(taproot_swap, tx, taproot_swap.our_pubkey[1:])
+    assert tx.locktime == 0
+    assert vsize(tx) <= script_path_vsize(items[2], 22, preimage=True)
+
+
+@pytest.mark.parametrize("cooperative", [True, False])
+@pytest.mark.asyncio
+async def test_refund(mock_boltz, cooperative):
+    client, mock, sent = mock_boltz
+    privkey_wif, swap = client.taproot.create_swap(encode_invoice())
+    mock.cooperative = cooperative
+    await client.taproot.refund_swap(
+        boltz_id=swap.id,
+        privkey_wif=privkey_wif,
+        lockup_address=swap.address,
+        receive_address=receive_address(),
+        swap_tree=swap.swapTree,
+        boltz_pubkey_hex=swap.claimPublicKey,
+        timeout_block_height=swap.timeoutBlockHeight,
+    )
+    tx = sent[0]
+    taproot_swap = mock.swaps[swap.id]
+    items = tx.vin[0].witness.items
+    if cooperative:
+        assert len(items) == 1
+        assert tx.locktime == 0
+        return
+    assert len(items) == 3
+    assert items[1] == taproot_swap.tree.refund_leaf
+    assert tx.locktime == TIMEOUT
+    assert tx.vin[0].sequence == REFUND_SEQUENCE
+    check_script_path(taproot_swap, tx, taproot_swap.our_pubkey[1:])
+
+
+def test_unexpected_swap_tree(mock_boltz, monkeypatch):
+    client, mock, _ = mock_boltz
+    # boltz claims with another preimage hash than the one of the invoice
+    monkeypatch.setattr(
+        boltz,
+        "req_wrap",
+        lambda funcname, url, **kwargs: mock.req_wrap(
+            funcname, url, **{**kwargs, "json": {**kwargs["json"], "invoice": other}}
+        ),
+    )
+    other = encode_invoice(payment_hash="02" * 32)
+    with pytest.raises(BoltzApiException):
+        client.taproot.create_swap(encode_invoice())
+
+
+def test_liquid_is_not_supported(client_mock):
+    with pytest.raises(BoltzPairException):
+        client_mock.taproot.create_reverse_swap(50000, pair="L-BTC/BTC")
+
+
+@pytest.mark.parametrize(
+    "cooperative, tamper, expected",
+    [
+        (True, False, BoltzApiException),
+        (True, True, MusigException),
+        (False, False, BoltzSwapTransactionException),
+    ],
+)
+@pytest.mark.asyncio
+async def test_no_script_path_refund_before_timeout(mock_boltz, cooperative, tamper, expected):
+    client, mock, sent = mock_boltz
+    privkey_wif, swap = client.taproot.create_swap(encode_invoice())
+    mock.cooperative = tamper
+    mock.tamper = tamper
+    mock.timeout_eta = "1700000000"
+    with pytest.raises(expected):
+        await client.taproot.refund_swap(
+            boltz_id=swap.id,
+            privkey_wif=privkey_wif,
+            lockup_address=swap.address,
+            receive_address=receive_address(),
+            swap_tree=swap.swapTree,
+            boltz_pubkey_hex=swap.claimPublicKey,
+            timeout_block_height=swap.timeoutBlockHeight,
+            cooperative=cooperative,
+        )
+    assert not sent
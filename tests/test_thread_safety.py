@@ -0,0 +1,102 @@
+import copy
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from boltz_client.boltz import BoltzClient, BoltzConfig, BoltzLimitException
+
+from .helpers import mock_pairs
+
+
+class MockApi:
+    """boltz api answering from memory, counts the requests per path"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: dict[str, int] = {}
+        self.pairs = mock_pairs
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.replace("/api", "", 1)
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+        if path == "/getpairs":
+            return httpx.Response(200, json={"pairs": self.pairs})
+        data = json.loads(request.content)
+        if path == "/swapstatus":
+            return httpx.Response(200, json={"status": "swap.created"})
+        if path == "/createswap":
+            return httpx.Response(
+                200,
+                json={
+                    "id": data["pairId"],
+                    "invoice": "lnbcrt1",
+                    "redeemScript": "00",
+                    "lockupAddress": "bcrt1q",
+                    "timeoutBlockHeight": 100,
+                    "onchainAmount": data["invoiceAmount"],
+                },
+            )
+        return httpx.Response(404, json={"error": "not found"})
+
+
+@pytest.fixture
+def mock_api():
+    return MockApi()
+
+
+@pytest.fixture
+def client_threaded(mock_api):
+    client = BoltzClient(
+        BoltzConfig(
+            network="regtest",
+            network_liquid="elementsregtest",
+            api_url="http://boltz.test/api",
+        ),
+        http_client=httpx.Client(transport=httpx.MockTransport(mock_api.handler)),
+    )
+    yield client
+    client.close()
+
+
+def test_client_from_many_threads(client_threaded, mock_api):
+    client = client_threaded
+    pairs = ["BTC/BTC", "L-BTC/BTC"]
+
+    def work(index: int) -> str:
+        pair = pairs[index % 2]
+        kind = index % 4
+        if kind == 0:
+            assert client.swap_status(f"swap{index % 10}").status == "swap.created"
+        elif kind == 1:
+            _, _, swap = client.create_reverse_swap(50000 + index, pair=pair)
+            assert swap.id == pair
+        elif kind == 2:
+            client.refresh_pairs()
+        else:
+            client.check_limits(50000, pair)
+            with pytest.raises(BoltzLimitException):
+                client.check_limits(1, pair)
+        return pair
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        assert len(list(executor.map(work, range(800)))) == 800
+    assert mock_api.requests["/createswap"] == 200
+    assert mock_api.requests["/swapstatus"] <= 200
+    assert mock_api.requests["/getpairs"] <= 201
+
+
+def test_refresh_swaps_pairs_snapshot(client_threaded, mock_api):
+    client = client_threaded
+    snapshot = client.pairs
+    new_pairs = copy.deepcopy(mock_pairs)
+    new_pairs["BTC/BTC"]["limits"]["minimal"] = 20000
+    mock_api.pairs = new_pairs
+
+    client.refresh_pairs()
+    assert client.get_limits()["minimal"] == 20000
+    # a reader holding the old snapshot still sees consistent data
+    assert snapshot["BTC/BTC"]["limits"]["minimal"] == mock_pairs["BTC/BTC"]["limits"]["minimal"]
@@ -0,0 +1,100 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+from boltz_client.endpoints import EndpointRouter
+from boltz_client.watch import status_ws_url, watch_swaps
+
+
+class MockStatusStream:
+    """
+    the status stream of boltz, every connection sends its list of updates
+    after the subscription. all but the last connection are closed afterwards
+    """
+
+    def __init__(self, connections: list):
+        self.connections = connections
+        self.subscriptions: list = []
+        self.unsubscriptions: list = []
+
+    async def handler(self, ws, *args):
+        subscription = json.loads(await ws.recv())
+        assert subscription["op"] == "subscribe"
+        assert subscription["channel"] == "swap.update"
+        self.subscriptions.append(subscription["args"])
+        updates = self.connections[len(self.subscriptions) - 1]
+        await ws.send(json.dumps({"event": "subscribe", "channel": "swap.update"}))
+        for update in updates:
+            message = {"event": "update", "channel": "swap.update", "args": [update]}
+            await ws.send(json.dumps(message))
+        if len(self.subscriptions) < len(self.connections):
+            await ws.close()
+            return
+        try:
+            async for message in ws:
+                self.unsubscriptions.append(json.loads(message)["args"])
+        except ConnectionClosed:
+            pass
+
+
+def test_status_ws_url():
+    assert status_ws_url("https://api.boltz.exchange/") == "wss://api.boltz.exchange/v2/ws"
+    assert status_ws_url("http://localhost:9001") == "ws://localhost:9001/v2/ws"
+
+
+@pytest.mark.asyncio
+async def test_watch_swaps():
+    stream = MockStatusStream(
+        [
+            [
+                {"id": "reverse", "status": "swap.created"},
+                {"id": "swap", "status": "invoice.set"},
+                {"id": "unknown", "error": "could not find swap"},
+                {"id": "other", "status": "swap.created"},
+            ],
+            [
+                {"id": "reverse", "status": "swap.created"},
+                {
+                    "id": "swap",
+                    "status": "transaction.lockupFailed",
+                    "failureReason": "onchain too little",
+                },
+                {
+                    "id": "reverse",
+                    "status": "transaction.mempool",
+                    "transaction": {"id": "txid", "hex": "00"},
+                },
+                {"id": "reverse", "status": "invoice.settled"},
+            ],
+        ]
+    )
+    async with websockets.serve(stream.handler, "localhost", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        client = SimpleNamespace(
+            offline=False, router=EndpointRouter([f"http://localhost:{port}"])
+        )
+        events = [
+            event
+            async for event in watch_swaps(client, ["reverse", "swap", "unknown"], 0)  # type: ignore
+        ]
+    transitions = [(event.boltz_id, event.previous, event.status) for event in events]
+    assert transitions == [
+        ("reverse", None, "swap.created"),
+        ("swap", None, "invoice.set"),
+        ("unknown", None, None),
+        ("swap", "invoice.set", "transaction.lockupFailed"),
+        ("reverse", "swap.created", "transaction.mempool"),
+        ("reverse", "transaction.mempool", "invoice.settled"),
+    ]
+    assert events[2].error == "could not find swap"
+    assert events[3].failure_reason == "onchain too little"
+    assert events[4].transaction_id == "txid"
+    # one subscription per connection, final swaps are not subscribed again
+    assert stream.subscriptions == [["reverse", "swap", "unknown"], ["reverse", "swap"]]
+    assert stream.unsubscriptions == [["swap"]]
+    line = events[0].to_json()
+    assert line["id"] == "reverse"
+    assert line["timestamp"].endswith("+00:00")